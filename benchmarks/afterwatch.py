@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Per-save cost of after_save_watch for a large watched folder
+#
+# Compares the scan-and-diff fallback (full scan before and after the delay)
+# with the event-driven inotify backend
+#
+# Usage: python benchmarks/afterwatch.py [--files 10000] [--saves 5]
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bootstrap import importModule
+
+files = importModule('ftpsyncfiles')
+filewatcher = importModule('ftpsyncfilewatcher')
+
+
+# ==== Content =============================================================================
+
+# Creates a watched folder with {count} files spread over subfolders
+def createTree(root, count, perFolder=100):
+	for i in range(count):
+		folder = os.path.join(root, 'assets', 'part' + str(i // perFolder))
+		if not os.path.exists(folder):
+			os.makedirs(folder)
+
+		with open(os.path.join(folder, 'style' + str(i) + '.css'), 'w') as f:
+			f.write('body {}\n')
+
+
+# Touches a single file as a build tool would, with mtime in the future
+def touch(path):
+	with open(path, 'a') as f:
+		f.write('/* changed */\n')
+
+	future = time.time() + 5
+	os.utime(path, (future, future))
+
+
+def benchScan(root, changed):
+	folder = os.path.join(root, 'assets')
+
+	started = time.time()
+	before = files.gatherMetafiles('*.css', folder)
+	touch(changed)
+	after = files.gatherMetafiles('*.css', folder)
+	result = files.getChangedFiles(before, after)
+
+	return time.time() - started, len(result)
+
+
+def benchEvents(root, changed):
+	started = time.time()
+	watch = filewatcher.InotifyWatch(root, [['assets', '*.css']], 60)
+	setup = time.time() - started
+
+	touch(changed)
+
+	# the delay window, events are delivered meanwhile - not part of the cost
+	deadline = time.time() + 5
+	while changed not in watch.changed and time.time() < deadline:
+		time.sleep(0.01)
+
+	started = time.time()
+	watch.close()
+	result = watch.getChangedFiles()
+
+	return setup + time.time() - started, len(result)
+
+
+def report(name, timings, found):
+	timings = sorted(timings)
+	print("{0:<8} median {1:8.2f} ms   max {2:8.2f} ms   changed found: {3}".format(name, timings[len(timings) // 2] * 1000, timings[-1] * 1000, found))
+
+
+def main():
+	parser = argparse.ArgumentParser(description='after_save_watch per-save cost')
+	parser.add_argument('--files', type=int, default=10000)
+	parser.add_argument('--saves', type=int, default=5)
+	args = parser.parse_args()
+
+	root = tempfile.mkdtemp(prefix='ftpsync-bench-')
+
+	try:
+		createTree(root, args.files)
+		changed = os.path.join(root, 'assets', 'part0', 'style0.css')
+		print("Watched files: {0}, saves: {1}".format(args.files, args.saves))
+
+		timings = []
+		for i in range(args.saves):
+			cost, found = benchScan(root, changed)
+			timings.append(cost)
+		report('scan', timings, found)
+
+		if filewatcher.isEventWatchAvailable():
+			timings = []
+			for i in range(args.saves):
+				cost, found = benchEvents(root, changed)
+				timings.append(cost)
+			report('inotify', timings, found)
+		else:
+			print("inotify    not available on this platform")
+	finally:
+		shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Makes FTPSync modules importable outside of Sublime Text
+#
+# Under Python 3 the modules import each other as FTPSync.*, so the package
+# folder is registered under that name regardless of where it's checked out
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import os
+import sys
+
+
+# ==== Content =============================================================================
+
+# Folder of the FTPSync package
+packageRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Registers the package so that FTPSync modules can be imported
+def loadPackage():
+	if sys.version < '3':
+		if packageRoot not in sys.path:
+			sys.path.insert(0, packageRoot)
+		return
+
+	if 'FTPSync' in sys.modules:
+		return
+
+	import importlib.util
+
+	spec = importlib.util.spec_from_file_location('FTPSync', os.path.join(packageRoot, '__init__.py'), submodule_search_locations=[packageRoot])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules['FTPSync'] = module
+	spec.loader.exec_module(module)
+
+
+# Imports a FTPSync module by its file name
+#
+# @type name: string
+# @param name: module name, eg. ftpsyncfiles
+#
+# @return module
+def importModule(name):
+	loadPackage()
+
+	if sys.version < '3':
+		return __import__(name)
+
+	import importlib
+	return importlib.import_module('FTPSync.' + name)
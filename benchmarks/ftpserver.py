@@ -0,0 +1,734 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# In-process stand-in FTP server for benchmarks
+#
+# Serves an in-memory filesystem on loopback, can add artificial latency to every
+# control channel reply and cap bandwidth of data connections. Counts received
+# commands so that round-trips of client operations can be measured.
+#
+# Implements only what FTPSync uses: PASV/EPSV data connections, LIST, NLST,
+# STAT, RETR, STOR, APPE, SIZE, MDTM, MLST, MFMT, HASH, XCRC, MKD, RMD, DELE, RNFR/RNTO,
+# SITE CHMOD, MODE S/Z. No TLS.
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import hashlib
+import posixpath
+import socket
+import threading
+import time
+import zlib
+
+try:
+	import socketserver
+except ImportError:
+	import SocketServer as socketserver
+
+
+# ==== Initialization and optimization =====================================================
+
+# size of chunks sent over data connections
+chunkSize = 65536
+
+# how long [s] to wait for the client to open a data connection
+dataTimeout = 10
+
+# whether PORT is accepted (needed for FXP)
+activeMode = True
+
+# advertised in FEAT
+features = ['EPSV', 'HASH SHA-256*;SHA-1;MD5', 'MDTM', 'MFMT', 'MLST type*;size*;modify*;UNIX.mode*;', 'MODE Z', 'PASV', 'REST STREAM', 'SIZE', 'UTF8', 'XCRC']
+
+
+# ==== Content =============================================================================
+
+# File or folder of the in-memory filesystem
+class Node(object):
+
+	def __init__(self, isDir, data=b'', size=None):
+		self.isDir = isDir
+		self.data = data
+		# size without materialized content, see MemoryFilesystem.addFile
+		self.size = size
+		self.mtime = time.time()
+		self.permissions = 'rwxr-xr-x' if isDir else 'rw-r--r--'
+		self.children = {} if isDir else None
+
+	def getSize(self):
+		if self.size is not None:
+			return self.size
+
+		return len(self.data)
+
+	def getData(self):
+		if self.size is not None:
+			return b'\0' * self.size
+
+		return self.data
+
+
+# Tree of Nodes addressed by absolute posix paths
+class MemoryFilesystem(object):
+
+	def __init__(self):
+		self.root = Node(True)
+		self.lock = threading.Lock()
+
+	# Splits a normalized absolute path into parent path and name
+	def _split(self, path):
+		path = posixpath.normpath(path)
+		return posixpath.dirname(path), posixpath.basename(path)
+
+	# Returns node for the path or None
+	def get(self, path):
+		node = self.root
+		for part in posixpath.normpath(path).split('/'):
+			if part == '' or part == '.':
+				continue
+
+			if node.children is None or part not in node.children:
+				return None
+
+			node = node.children[part]
+
+		return node
+
+	# Returns node of an existing parent folder or None
+	def getParent(self, path):
+		parent, name = self._split(path)
+		node = self.get(parent)
+
+		if node is None or node.isDir is False or name == '':
+			return None
+
+		return node
+
+	def mkdir(self, path):
+		with self.lock:
+			parent = self.getParent(path)
+			if parent is None or self._split(path)[1] in parent.children:
+				return False
+
+			parent.children[self._split(path)[1]] = Node(True)
+			return True
+
+	# Creates folder including parents
+	def makedirs(self, path):
+		node = self.root
+		for part in posixpath.normpath(path).split('/'):
+			if part == '' or part == '.':
+				continue
+
+			if part not in node.children:
+				node.children[part] = Node(True)
+
+			node = node.children[part]
+
+		return node
+
+	def write(self, path, data):
+		with self.lock:
+			parent = self.getParent(path)
+			if parent is None:
+				return False
+
+			existing = parent.children.get(self._split(path)[1])
+			if existing is not None and existing.isDir:
+				return False
+
+			parent.children[self._split(path)[1]] = Node(False, data)
+			return True
+
+	def append(self, path, data):
+		with self.lock:
+			parent = self.getParent(path)
+			if parent is None:
+				return False
+
+			existing = parent.children.get(self._split(path)[1])
+			if existing is None:
+				parent.children[self._split(path)[1]] = Node(False, data)
+			elif existing.isDir:
+				return False
+			else:
+				existing.data = existing.getData() + data
+				existing.size = None
+				existing.mtime = time.time()
+
+			return True
+
+	# Adds a file of given size without storing its content, for large fixtures
+	def addFile(self, path, size):
+		parent = self.makedirs(posixpath.dirname(path))
+		parent.children[posixpath.basename(path)] = Node(False, size=size)
+
+	def remove(self, path, isDir):
+		with self.lock:
+			parent = self.getParent(path)
+			name = self._split(path)[1]
+			if parent is None or name not in parent.children:
+				return False
+
+			node = parent.children[name]
+			if node.isDir is not isDir or (isDir and len(node.children) > 0):
+				return False
+
+			del parent.children[name]
+			return True
+
+	def rename(self, source, target):
+		with self.lock:
+			sourceParent = self.getParent(source)
+			targetParent = self.getParent(target)
+			sourceName = self._split(source)[1]
+			if sourceParent is None or targetParent is None or sourceName not in sourceParent.children:
+				return False
+
+			targetParent.children[self._split(target)[1]] = sourceParent.children.pop(sourceName)
+			return True
+
+	# Counts files and folders below the path
+	def count(self, path='/'):
+		node = self.get(path)
+		if node is None or node.isDir is False:
+			return 0
+
+		total = 0
+		for name, child in node.children.items():
+			total += 1
+			if child.isDir:
+				total += self.count(posixpath.join(path, name))
+
+		return total
+
+
+# Formats a LIST line like a unix server does
+#
+# @type name: string
+# @type node: Node
+#
+# @return string
+def formatListLine(name, node):
+	if time.time() - node.mtime < 180 * 24 * 3600:
+		stamp = time.strftime('%b %d %H:%M', time.localtime(node.mtime))
+	else:
+		stamp = time.strftime('%b %d  %Y', time.localtime(node.mtime))
+
+	kind = 'd' if node.isDir else '-'
+	return "{0}{1} 1 ftp ftp {2:>12} {3} {4}".format(kind, node.permissions, node.getSize(), stamp, name)
+
+
+# Returns octal mode of symbolic permissions, e.g. rw-r--r-- => 0644
+def formatMode(permissions):
+	mode = 0
+	for character in permissions:
+		mode = mode * 2 + (0 if character == '-' else 1)
+
+	return "0{0:o}".format(mode)
+
+
+# Single control connection
+class Session(socketserver.StreamRequestHandler):
+
+	# replies are small writes, avoid delayed ACK stalls skewing timings
+	disable_nagle_algorithm = True
+
+	def setup(self):
+		socketserver.StreamRequestHandler.setup(self)
+		self.cwd = '/'
+		self.renameFrom = None
+		self.passive = None
+		# (host, port) given by PORT
+		self.active = None
+		# S = stream, Z = deflated stream
+		self.mode = 'S'
+		self.answered = False
+
+	def reply(self, line):
+		if self.answered is False:
+			self.answered = True
+			if self.server.latency > 0:
+				time.sleep(self.server.latency)
+
+		self.wfile.write((line + "\r\n").encode('utf-8'))
+		self.wfile.flush()
+
+	def resolve(self, path):
+		if path is None or path == '':
+			return self.cwd
+
+		return posixpath.normpath(posixpath.join(self.cwd, path))
+
+	def handle(self):
+		self.reply("220 FTPSync benchmark server ready")
+
+		while True:
+			line = self.rfile.readline()
+			if not line:
+				break
+
+			line = line.decode('utf-8', 'replace').rstrip("\r\n")
+			verb, arg = (line.split(" ", 1) + [None])[:2]
+			verb = verb.upper()
+
+			self.answered = False
+			self.server.record(verb)
+
+			handler = getattr(self, 'ftp_' + verb, None)
+			try:
+				if handler is None:
+					self.reply("502 Command not implemented")
+				elif handler(arg) is False:
+					break
+			except (socket.error, IOError):
+				break
+
+		self.closePassive()
+
+	# --- data connections -----------------------------------------------------------------
+
+	def closePassive(self):
+		if self.passive is not None:
+			self.passive.close()
+			self.passive = None
+
+	def openPassive(self):
+		self.closePassive()
+		self.passive = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.passive.bind(('127.0.0.1', 0))
+		self.passive.listen(1)
+		self.passive.settimeout(dataTimeout)
+		return self.passive.getsockname()[1]
+
+	def acceptData(self):
+		if self.active is not None:
+			address = self.active
+			self.active = None
+			self.reply("150 Opening data connection")
+			try:
+				return socket.create_connection(address, dataTimeout)
+			except socket.error:
+				self.reply("425 Can't open data connection")
+				return None
+
+		if self.passive is None:
+			self.reply("425 Use PASV first")
+			return None
+
+		self.reply("150 Opening data connection")
+		try:
+			conn = self.passive.accept()[0]
+		except socket.timeout:
+			self.reply("425 Can't open data connection")
+			return None
+		finally:
+			self.closePassive()
+
+		return conn
+
+	def sendData(self, conn, data):
+		if self.mode == 'Z':
+			data = zlib.compress(data)
+
+		started = time.time()
+		sent = 0
+		try:
+			while sent < len(data):
+				chunk = data[sent:sent + chunkSize]
+				conn.sendall(chunk)
+				sent += len(chunk)
+				self.server.throttle(sent, started)
+		finally:
+			conn.close()
+
+		self.server.record(None, sent=sent)
+		self.reply("226 Transfer complete")
+
+	def receiveData(self, conn):
+		started = time.time()
+		chunks = []
+		received = 0
+		try:
+			while True:
+				chunk = conn.recv(chunkSize)
+				if not chunk:
+					break
+				chunks.append(chunk)
+				received += len(chunk)
+				self.server.throttle(received, started)
+		finally:
+			conn.close()
+
+		self.server.record(None, received=received)
+		if self.mode == 'Z':
+			return zlib.decompress(b''.join(chunks))
+
+		return b''.join(chunks)
+
+	# --- commands -------------------------------------------------------------------------
+
+	def ftp_USER(self, arg):
+		self.reply("331 Password required")
+
+	def ftp_PASS(self, arg):
+		self.reply("230 Logged in")
+
+	def ftp_QUIT(self, arg):
+		self.reply("221 Bye")
+		return False
+
+	def ftp_NOOP(self, arg):
+		self.reply("200 NOOP ok")
+
+	def ftp_SYST(self, arg):
+		self.reply("215 UNIX Type: L8")
+
+	def ftp_FEAT(self, arg):
+		self.reply("211-Features:")
+		for feature in features:
+			self.reply(" " + feature)
+		self.reply("211 End")
+
+	def ftp_OPTS(self, arg):
+		self.reply("200 OK")
+
+	def ftp_MODE(self, arg):
+		mode = str(arg).upper()
+		if mode == 'S' or (mode == 'Z' and 'MODE Z' in features):
+			self.mode = mode
+			self.reply("200 MODE set to " + mode)
+		else:
+			self.reply("504 Unsupported MODE")
+
+	def ftp_TYPE(self, arg):
+		self.reply("200 Type set to " + str(arg))
+
+	def ftp_PWD(self, arg):
+		self.reply('257 "' + self.cwd + '" is current directory')
+
+	def ftp_CWD(self, arg):
+		path = self.resolve(arg)
+		node = self.server.fs.get(path)
+		if node is None or node.isDir is False:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+		else:
+			self.cwd = path
+			self.reply("250 CWD command successful")
+
+	def ftp_CDUP(self, arg):
+		return self.ftp_CWD('..')
+
+	def ftp_PASV(self, arg):
+		port = self.openPassive()
+		self.reply("227 Entering Passive Mode (127,0,0,1,{0},{1})".format(port >> 8, port & 0xFF))
+
+	def ftp_PORT(self, arg):
+		if activeMode is False:
+			self.reply("500 PORT not allowed")
+			return
+
+		numbers = [int(number) for number in str(arg).split(',')]
+		self.closePassive()
+		self.active = ('.'.join([str(number) for number in numbers[0:4]]), numbers[4] * 256 + numbers[5])
+		self.reply("200 PORT command successful")
+
+	def ftp_EPSV(self, arg):
+		port = self.openPassive()
+		self.reply("229 Entering Extended Passive Mode (|||{0}|)".format(port))
+
+	# Returns LIST lines of a path (options are ignored) or None if not found
+	def listLines(self, arg):
+		path = arg
+		if path is not None:
+			parts = [part for part in path.split(" ") if part.startswith('-') is False]
+			path = " ".join(parts)
+
+		node = self.server.fs.get(self.resolve(path))
+		if node is None:
+			return None
+
+		if node.isDir:
+			lines = [formatListLine('.', node), formatListLine('..', node)]
+			for name, child in sorted(node.children.items()):
+				lines.append(formatListLine(name, child))
+		else:
+			lines = [formatListLine(posixpath.basename(self.resolve(path)), node)]
+
+		return lines
+
+	def ftp_LIST(self, arg):
+		lines = self.listLines(arg)
+		if lines is None:
+			self.closePassive()
+			self.reply("450 " + str(arg) + ": No such file or directory")
+			return
+
+		conn = self.acceptData()
+		if conn is not None:
+			self.sendData(conn, ("\r\n".join(lines) + "\r\n").encode('utf-8'))
+
+	# listing over the control connection
+	def ftp_STAT(self, arg):
+		if not arg:
+			self.reply("211 Bench server status OK")
+			return
+
+		lines = self.listLines(arg)
+		if lines is None:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+			return
+
+		self.reply("213-Status of " + str(arg) + ":")
+		for line in lines:
+			self.reply(" " + line)
+		self.reply("213 End of status")
+
+	def ftp_NLST(self, arg):
+		node = self.server.fs.get(self.resolve(arg))
+		if node is None or node.isDir is False:
+			self.closePassive()
+			self.reply("450 No such file or directory")
+			return
+
+		conn = self.acceptData()
+		if conn is not None:
+			self.sendData(conn, ("\r\n".join(sorted(node.children.keys())) + "\r\n").encode('utf-8'))
+
+	def ftp_RETR(self, arg):
+		node = self.server.fs.get(self.resolve(arg))
+		if node is None or node.isDir:
+			self.closePassive()
+			self.reply("550 " + str(arg) + ": No such file or directory")
+			return
+
+		conn = self.acceptData()
+		if conn is not None:
+			self.sendData(conn, node.getData())
+
+	def ftp_STOR(self, arg):
+		path = self.resolve(arg)
+		if self.server.fs.getParent(path) is None:
+			self.closePassive()
+			self.reply("553 " + str(arg) + ": No such file or directory")
+			return
+
+		conn = self.acceptData()
+		if conn is None:
+			return
+
+		if self.server.fs.write(path, self.receiveData(conn)):
+			self.reply("226 Transfer complete")
+		else:
+			self.reply("553 Could not create file")
+
+	def ftp_APPE(self, arg):
+		path = self.resolve(arg)
+		if self.server.fs.getParent(path) is None:
+			self.closePassive()
+			self.reply("553 " + str(arg) + ": No such file or directory")
+			return
+
+		conn = self.acceptData()
+		if conn is None:
+			return
+
+		if self.server.fs.append(path, self.receiveData(conn)):
+			self.reply("226 Transfer complete")
+		else:
+			self.reply("553 Could not create file")
+
+	def ftp_HASH(self, arg):
+		node = self.server.fs.get(self.resolve(arg))
+		if node is None or node.isDir:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+			return
+
+		data = node.getData()
+		self.reply("213 SHA-256 0-{0} {1} {2}".format(len(data) - 1, hashlib.sha256(data).hexdigest(), arg))
+
+	def ftp_XCRC(self, arg):
+		node = self.server.fs.get(self.resolve(arg))
+		if node is None or node.isDir:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+			return
+
+		self.reply("250 {0:08X}".format(zlib.crc32(node.getData()) & 0xffffffff))
+
+	def ftp_SIZE(self, arg):
+		node = self.server.fs.get(self.resolve(arg))
+		if node is None or node.isDir:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+		else:
+			self.reply("213 " + str(node.getSize()))
+
+	def ftp_MDTM(self, arg):
+		node = self.server.fs.get(self.resolve(arg))
+		if node is None:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+		else:
+			self.reply("213 " + time.strftime('%Y%m%d%H%M%S', time.gmtime(node.mtime)))
+
+	def ftp_MLST(self, arg):
+		path = self.resolve(arg)
+		node = self.server.fs.get(path)
+		if node is None:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+			return
+
+		facts = "type={0};size={1};modify={2};UNIX.mode={3};".format('dir' if node.isDir else 'file', node.getSize(), time.strftime('%Y%m%d%H%M%S', time.gmtime(node.mtime)), formatMode(node.permissions))
+		self.reply("250-Listing " + path)
+		self.reply(" " + facts + " " + path)
+		self.reply("250 End")
+
+	def ftp_MFMT(self, arg):
+		stamp, path = (arg or '').split(" ", 1) if arg and " " in arg else (arg, None)
+		node = self.server.fs.get(self.resolve(path))
+		if node is None:
+			self.reply("550 " + str(path) + ": No such file or directory")
+			return
+
+		try:
+			node.mtime = time.mktime(time.strptime(stamp, '%Y%m%d%H%M%S'))
+		except ValueError:
+			self.reply("501 Invalid time")
+			return
+
+		self.reply("213 Modify=" + stamp + "; " + path)
+
+	def ftp_SITE(self, arg):
+		parts = (arg or '').split(" ", 2)
+		if len(parts) == 3 and parts[0].upper() == 'CHMOD':
+			node = self.server.fs.get(self.resolve(parts[2]))
+			if node is None:
+				self.reply("550 " + parts[2] + ": No such file or directory")
+			else:
+				self.reply("200 SITE CHMOD command successful")
+		else:
+			self.reply("500 Unknown SITE command")
+
+	def ftp_MKD(self, arg):
+		path = self.resolve(arg)
+		if self.server.fs.mkdir(path):
+			self.reply('257 "' + path + '" created')
+		else:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+
+	def ftp_RMD(self, arg):
+		if self.server.fs.remove(self.resolve(arg), True):
+			self.reply("250 RMD command successful")
+		else:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+
+	def ftp_DELE(self, arg):
+		if self.server.fs.remove(self.resolve(arg), False):
+			self.reply("250 DELE command successful")
+		else:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+
+	def ftp_RNFR(self, arg):
+		path = self.resolve(arg)
+		if self.server.fs.get(path) is None:
+			self.reply("550 " + str(arg) + ": No such file or directory")
+		else:
+			self.renameFrom = path
+			self.reply("350 File or directory exists, ready for destination name")
+
+	def ftp_RNTO(self, arg):
+		if self.renameFrom is None:
+			self.reply("503 Bad sequence of commands")
+		elif self.server.fs.rename(self.renameFrom, self.resolve(arg)):
+			self.reply("250 Rename successful")
+		else:
+			self.reply("550 Rename failed")
+
+		self.renameFrom = None
+
+
+# Threaded server with shared filesystem and counters
+class BenchServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+
+	daemon_threads = True
+	allow_reuse_address = True
+
+	# @type latency: float
+	# @param latency: delay [s] added to each command reply
+	# @type bandwidth: int|None
+	# @param bandwidth: cap [bytes/s] of each data connection, None = unlimited
+	def __init__(self, latency=0, bandwidth=None, fs=None):
+		socketserver.TCPServer.__init__(self, ('127.0.0.1', 0), Session)
+		self.latency = latency
+		self.bandwidth = bandwidth
+		self.fs = fs or MemoryFilesystem()
+		self.statsLock = threading.Lock()
+		self.resetStats()
+		self.thread = None
+
+	def getPort(self):
+		return self.server_address[1]
+
+	def start(self):
+		self.thread = threading.Thread(target=self.serve_forever)
+		self.thread.daemon = True
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+	def resetStats(self):
+		with self.statsLock:
+			self.commands = {}
+			self.bytesSent = 0
+			self.bytesReceived = 0
+
+	# Counts a command (round-trip) and/or transferred bytes
+	def record(self, verb, sent=0, received=0):
+		with self.statsLock:
+			if verb is not None:
+				self.commands[verb] = self.commands.get(verb, 0) + 1
+			self.bytesSent += sent
+			self.bytesReceived += received
+
+	# Returns total number of commands received
+	def getRoundTrips(self):
+		with self.statsLock:
+			return sum(self.commands.values())
+
+	# Sleeps so that {transferred} bytes since {started} keep under the bandwidth cap
+	def throttle(self, transferred, started):
+		if not self.bandwidth:
+			return
+
+		expected = float(transferred) / self.bandwidth
+		elapsed = time.time() - started
+		if expected > elapsed:
+			time.sleep(expected - elapsed)
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Transfer benchmarks against a local stand-in FTP server
+#
+# Drives FTPSConnection, Worker and the engine's SyncCommand* classes through
+# typical workloads and reports throughput, latency percentiles and round-trips
+# (commands sent) per operation
+#
+# Usage: python benchmarks/transfers.py [scenario ...] [--latency 0.02] [--bandwidth 10000000]
+#   scenarios: large, small, deep, list, fanout, upload-command, download-command,
+#   delete-command (default: all)
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bootstrap import importModule, packageRoot
+from ftpserver import BenchServer
+
+wrapper = importModule('ftpsyncwrapper')
+worker = importModule('ftpsyncworker')
+engine = importModule('ftpsyncengine')
+adapter = importModule('ftpsyncadapter')
+
+
+# ==== Content =============================================================================
+
+# Name of the connection used in configs
+connectionName = 'bench'
+
+
+# Returns a config as FTPSync.loadConfig would, pointed to the local server
+#
+# @type port: int
+# @type root: string
+# @param root: local folder acting as the folder with ftpsync.settings
+#
+# @return dict
+def makeConfig(port, root):
+	with open(os.path.join(packageRoot, 'FTPSync.sublime-settings')) as f:
+		settings = json.load(f)
+
+	connection = dict(settings['project_defaults'])
+	connection.update({
+		'host': '127.0.0.1',
+		'port': port,
+		'username': 'bench',
+		'password': 'bench',
+		'path': '/',
+		'file_path': os.path.join(root, 'ftpsync.settings'),
+		'default_local_permissions': None
+	})
+
+	return {
+		'connections': { connectionName: connection },
+		'ascii_extensions': settings['ascii_extensions'],
+		'ftp_retry_limit': settings['ftp_retry_limit'],
+		'ftp_retry_delay': settings['ftp_retry_delay'],
+		'debug_verbose': False
+	}
+
+
+# Writes ftpsync.settings into {root} and configures the engine like plugin_loaded
+#
+# Offline queue and capability cache are off so that nothing outside {root} is touched
+#
+# @type port: int
+# @type root: string
+#
+# @return string path of the config file
+def configureEngine(port, root):
+	config_file_path = os.path.join(root, 'ftpsync.settings')
+	with open(config_file_path, 'w') as f:
+		json.dump({ connectionName: {
+			'host': '127.0.0.1',
+			'port': port,
+			'username': 'bench',
+			'password': 'bench',
+			'path': '/'
+		}}, f)
+
+	settings = engine.parseJson(os.path.join(packageRoot, 'FTPSync.sublime-settings'))
+	settings['debug'] = False
+	settings['debug_verbose'] = False
+	settings['offline_queue'] = False
+	settings['capability_cache'] = False
+
+	engine.setAdapter(adapter.ConsoleAdapter(stream=open(os.devnull, 'w')))
+	engine.configure(settings)
+
+	return config_file_path
+
+
+# Runs a SyncCommand over given connections, as Worker does for the plugin
+#
+# @type command: SyncCommand
+# @type connections: list<FTPSConnection>
+def runCommand(command, connections):
+	command.setConnection(connections)
+	command.execute()
+
+
+# Opens a logged-in connection, like FTPSync.makeConnection
+def connect(config):
+	connection = wrapper.CreateConnection(config, connectionName)
+	connection.connect()
+	connection.authenticate()
+	connection.login()
+
+	return connection
+
+
+# Writes {count} files of {size} bytes into {folder}, returns their paths
+def createFiles(folder, count, size, prefix='file'):
+	if not os.path.exists(folder):
+		os.makedirs(folder)
+
+	content = b'x' * size
+	paths = []
+	for i in range(count):
+		path = os.path.join(folder, prefix + str(i) + '.txt')
+		with open(path, 'wb') as f:
+			f.write(content)
+		paths.append(path)
+
+	return paths
+
+
+# Returns percentile of a sorted list
+def percentile(ordered, percent):
+	if len(ordered) == 0:
+		return 0
+
+	return ordered[int(round((len(ordered) - 1) * percent / 100.0))]
+
+
+# Collected measurements of one scenario
+class Result(object):
+
+	def __init__(self, name, server):
+		self.name = name
+		self.server = server
+		self.timings = []
+		self.transferred = 0
+		self.started = None
+		self.finished = None
+
+	def __enter__(self):
+		self.server.resetStats()
+		self.started = time.time()
+		return self
+
+	def __exit__(self, type, value, traceback):
+		self.finished = time.time()
+		self.roundTrips = self.server.getRoundTrips()
+		self.commands = dict(self.server.commands)
+		return False
+
+	# Measures a single operation
+	def measure(self, operation, size=0):
+		started = time.time()
+		operation()
+		self.timings.append(time.time() - started)
+		self.transferred += size
+
+	def report(self):
+		elapsed = self.finished - self.started
+		operations = max(1, len(self.timings))
+		ordered = sorted(self.timings)
+
+		print("{0}".format(self.name))
+		print("  operations {0:>10}   total {1:10.2f} s   {2:10.1f} ops/s".format(len(self.timings), elapsed, len(self.timings) / elapsed))
+
+		if self.transferred > 0:
+			print("  transferred {0:>9.2f} MB   throughput {1:8.2f} MB/s".format(self.transferred / 1048576.0, self.transferred / 1048576.0 / elapsed))
+
+		print("  latency    p50 {0:8.2f} ms   p95 {1:8.2f} ms   p99 {2:8.2f} ms   max {3:8.2f} ms".format(
+			percentile(ordered, 50) * 1000, percentile(ordered, 95) * 1000, percentile(ordered, 99) * 1000, percentile(ordered, 100) * 1000))
+
+		print("  round-trips {0:>9}   per operation {1:8.2f}".format(self.roundTrips, float(self.roundTrips) / operations))
+
+		top = sorted(self.commands.items(), key=lambda item: -item[1])
+		print("  commands   " + ", ".join([verb + " " + str(count) for verb, count in top]))
+		print("")
+
+
+# One large file uploaded and downloaded back
+def benchLarge(server, root, args):
+	config = makeConfig(server.getPort(), root)
+	connection = connect(config)
+	size = args.large_size * 1048576
+	path = createFiles(os.path.join(root, 'large'), 1, size, 'large')[0]
+
+	with Result('large: upload {0} MB'.format(args.large_size), server) as result:
+		result.measure(lambda: connection.put(path), size)
+	result.report()
+
+	os.unlink(path)
+	with Result('large: download {0} MB'.format(args.large_size), server) as result:
+		result.measure(lambda: connection.get(path, None), size)
+	result.report()
+
+	connection.close()
+
+
+# Many small files uploaded one by one over a single connection
+def benchSmall(server, root, args):
+	config = makeConfig(server.getPort(), root)
+	connection = connect(config)
+	paths = createFiles(os.path.join(root, 'small'), args.small_count, args.small_size)
+
+	with Result('small: upload {0} x {1} B'.format(args.small_count, args.small_size), server) as result:
+		for path in paths:
+			result.measure(lambda: connection.put(path), args.small_size)
+	result.report()
+
+	connection.close()
+
+
+# Files in a deep folder structure not yet existing remotely
+def benchDeep(server, root, args):
+	config = makeConfig(server.getPort(), root)
+	connection = connect(config)
+
+	paths = []
+	folder = os.path.join(root, 'deep')
+	for level in range(args.depth):
+		folder = os.path.join(folder, 'level' + str(level))
+		paths.extend(createFiles(folder, args.deep_files, args.small_size))
+
+	with Result('deep: upload {0} files in {1} levels'.format(len(paths), args.depth), server) as result:
+		for path in paths:
+			result.measure(lambda: connection.put(path), args.small_size)
+	result.report()
+
+	connection.close()
+
+
+# Listing of a single huge remote folder
+def benchList(server, root, args):
+	for i in range(args.list_entries):
+		server.fs.addFile('/huge/entry' + str(i) + '.txt', i % 4096)
+
+	config = makeConfig(server.getPort(), root)
+	connection = connect(config)
+
+	found = []
+	with Result('list: {0} entries x {1}'.format(args.list_entries, args.repeat), server) as result:
+		for i in range(args.repeat):
+			result.measure(lambda: found.append(len(connection.list('/huge', True))))
+	result.report()
+
+	if found and found[-1] != args.list_entries:
+		print("  WARNING: listed {0} entries, expected {1}".format(found[-1], args.list_entries))
+
+	connection.close()
+
+
+# Upload command for Worker, mirrors SyncCommandUpload's contract
+class UploadCommand(object):
+
+	def __init__(self, path, result, size):
+		self.path = path
+		self.result = result
+		self.size = size
+		self.connections = None
+		self.running = True
+
+	def setConnection(self, connections):
+		self.connections = connections
+
+	def execute(self):
+		try:
+			self.result.measure(lambda: self.connections[0].put(self.path), self.size)
+		finally:
+			self.running = False
+
+	def isRunning(self):
+		return self.running
+
+
+# Small files spread over a pool of connections by Worker
+def benchFanout(server, root, args):
+	config = makeConfig(server.getPort(), root)
+	paths = createFiles(os.path.join(root, 'fanout'), args.fanout_count, args.small_size)
+
+	def factory(config, hash, handleExceptions):
+		return [connect(config)]
+
+	pool = worker.Worker(args.connections, factory, lambda config: config)
+
+	with Result('fanout: upload {0} files over {1} connections'.format(len(paths), args.connections), server) as result:
+		for path in paths:
+			pool.addCommand(UploadCommand(path, result, args.small_size), config)
+
+		while pool.isEmpty() is False:
+			time.sleep(0.01)
+	result.report()
+
+	for connections in pool.connections:
+		for connection in connections:
+			connection.close()
+	pool.connections = []
+
+
+# Small files uploaded one by one through SyncCommandUpload
+#
+# Adds the engine's own cost (config lookup, ignore rules, overwrite checks,
+# messages) on top of what "small" measures
+def benchUploadCommand(server, root, args):
+	config_file_path = configureEngine(server.getPort(), root)
+	config = engine.loadConfig(config_file_path)
+	connections = engine.getConnection(engine.getFilepathHash(config_file_path), config, False)
+	paths = createFiles(os.path.join(root, 'commands'), args.command_count, args.small_size)
+
+	with Result('upload-command: {0} x {1} B'.format(len(paths), args.small_size), server) as result:
+		for path in paths:
+			result.measure(lambda: runCommand(engine.SyncCommandUpload(path, config_file_path), connections), args.small_size)
+	result.report()
+
+	for connection in connections:
+		connection.close()
+
+
+# Small files downloaded one by one through SyncCommandDownload
+def benchDownloadCommand(server, root, args):
+	config_file_path = configureEngine(server.getPort(), root)
+	config = engine.loadConfig(config_file_path)
+	connections = engine.getConnection(engine.getFilepathHash(config_file_path), config, False)
+	content = b'x' * args.small_size
+	server.fs.makedirs('/commands')
+
+	paths = []
+	for i in range(args.command_count):
+		server.fs.write('/commands/file' + str(i) + '.txt', content)
+		paths.append(os.path.join(root, 'commands', 'file' + str(i) + '.txt'))
+	os.makedirs(os.path.join(root, 'commands'))
+
+	with Result('download-command: {0} x {1} B'.format(len(paths), args.small_size), server) as result:
+		for path in paths:
+			result.measure(lambda: runCommand(engine.SyncCommandDownload(path, config_file_path).setForced(), connections), args.small_size)
+	result.report()
+
+	for connection in connections:
+		connection.close()
+
+
+# Remote files deleted one by one through SyncCommandDelete
+def benchDeleteCommand(server, root, args):
+	config_file_path = configureEngine(server.getPort(), root)
+	config = engine.loadConfig(config_file_path)
+	connections = engine.getConnection(engine.getFilepathHash(config_file_path), config, False)
+	paths = createFiles(os.path.join(root, 'commands'), args.command_count, args.small_size)
+
+	server.fs.makedirs('/commands')
+	for path in paths:
+		server.fs.write('/commands/' + os.path.basename(path), b'x' * args.small_size)
+
+	with Result('delete-command: {0} files'.format(len(paths)), server) as result:
+		for path in paths:
+			result.measure(lambda: runCommand(engine.SyncCommandDelete(path, config_file_path), connections))
+	result.report()
+
+	for connection in connections:
+		connection.close()
+
+
+scenarios = {
+	'large': benchLarge,
+	'small': benchSmall,
+	'deep': benchDeep,
+	'list': benchList,
+	'fanout': benchFanout,
+	'upload-command': benchUploadCommand,
+	'download-command': benchDownloadCommand,
+	'delete-command': benchDeleteCommand
+}
+
+
+def main():
+	parser = argparse.ArgumentParser(description='FTPSync transfer benchmarks')
+	parser.add_argument('scenario', nargs='*', choices=sorted(scenarios.keys()) + [[]], default=[])
+	parser.add_argument('--latency', type=float, default=0, help='added to each reply [s]')
+	parser.add_argument('--bandwidth', type=int, default=0, help='per data connection [bytes/s], 0 = unlimited')
+	parser.add_argument('--large-size', type=int, default=64, help='[MB]')
+	parser.add_argument('--small-count', type=int, default=10000)
+	parser.add_argument('--small-size', type=int, default=1024, help='[B]')
+	parser.add_argument('--depth', type=int, default=20)
+	parser.add_argument('--deep-files', type=int, default=5, help='files per level')
+	parser.add_argument('--list-entries', type=int, default=50000)
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--fanout-count', type=int, default=1000)
+	parser.add_argument('--connections', type=int, default=4)
+	parser.add_argument('--command-count', type=int, default=1000, help='files per *-command scenario')
+	args = parser.parse_args()
+
+	selected = args.scenario or ['large', 'small', 'deep', 'list', 'fanout', 'upload-command', 'download-command', 'delete-command']
+	print("Latency: {0} ms, bandwidth: {1}\n".format(args.latency * 1000, str(args.bandwidth) + " B/s" if args.bandwidth else "unlimited"))
+
+	for name in selected:
+		root = tempfile.mkdtemp(prefix='ftpsync-bench-')
+		server = BenchServer(args.latency, args.bandwidth or None).start()
+
+		try:
+			scenarios[name](server, root, args)
+		finally:
+			server.stop()
+			shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+	main()
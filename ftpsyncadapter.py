@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Doc comment syntax inspired by http://stackoverflow.com/a/487203/387503
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import getpass
+import sys
+import threading
+import time
+
+
+# ==== Initialization and optimization =====================================================
+
+# minimal interval [s] between status lines when the output is not a terminal
+consoleStatusInterval = 1.0
+
+
+# ==== Content =============================================================================
+
+# Interface the engine uses to talk to the user
+#
+# Implemented by SublimeAdapter (FTPSync.py) in the editor and by ConsoleAdapter
+# for the command line
+class UiAdapter(object):
+
+	# Runs a callback after a delay
+	#
+	# @type callback: callback()
+	# @type delay: int
+	# @param delay: [ms]
+	def setTimeout(self, callback, delay):
+		raise NotImplementedError("Abstract method")
+
+	# Shows a short-lived status message (progress etc.)
+	#
+	# @type text: string
+	def statusMessage(self, text):
+		raise NotImplementedError("Abstract method")
+
+	# Writes a message to the log / console
+	#
+	# @type text: string
+	def log(self, text):
+		raise NotImplementedError("Abstract method")
+
+	# Offers a list of choices, callback receives chosen index or -1 when cancelled
+	#
+	# @type items: list<list<string>>|list<string>
+	# @param items: choices, each either a string or a list of lines
+	# @type callback: callback(index)|None
+	# @type window: object|None
+	# @param window: editor window if any
+	def showQuickPanel(self, items, callback, window=None):
+		raise NotImplementedError("Abstract method")
+
+	# Asks for a text input, callback receives the value
+	#
+	# @type caption: string
+	# @type initial: string
+	# @type callback: callback(value)
+	# @type window: object|None
+	# @param window: editor window if any
+	def showInputPanel(self, caption, initial, callback, window=None):
+		raise NotImplementedError("Abstract method")
+
+	# Reloads a file that got downloaded if it's opened
+	#
+	# @type file_path: string
+	def reloadFile(self, file_path):
+		raise NotImplementedError("Abstract method")
+
+
+# Adapter for running outside of the editor
+class ConsoleAdapter(UiAdapter):
+
+	# @type assumeYes: bool
+	# @param assumeYes: pick the first choice of every prompt (eg. overwrite)
+	# @type interactive: bool|None
+	# @param interactive: ask on stdin, None = only when it's a terminal
+	# @type verbose: bool
+	# @param verbose: print log messages
+	# @type stream: file
+	# @param stream: output for status and log messages
+	def __init__(self, assumeYes=False, interactive=None, verbose=False, stream=None):
+		self.assumeYes = assumeYes
+		self.stream = stream or sys.stderr
+		self.verbose = verbose
+		self.lock = threading.Lock()
+		self.lastStatus = None
+		self.lastStatusTime = 0
+		self.statusWidth = 0
+
+		if interactive is None:
+			interactive = hasattr(sys.stdin, 'isatty') and sys.stdin.isatty()
+		self.interactive = interactive
+
+	def setTimeout(self, callback, delay):
+		timer = threading.Timer(float(delay) / 1000, callback)
+		timer.daemon = True
+		timer.start()
+
+	def _isTerminal(self):
+		return hasattr(self.stream, 'isatty') and self.stream.isatty()
+
+	def statusMessage(self, text):
+		with self.lock:
+			if text == self.lastStatus:
+				return
+
+			if self._isTerminal():
+				self.stream.write("\r" + text.ljust(self.statusWidth))
+				self.statusWidth = len(text)
+			elif time.time() - self.lastStatusTime >= consoleStatusInterval:
+				self.stream.write(text + "\n")
+				self.lastStatusTime = time.time()
+			else:
+				return
+
+			self.stream.flush()
+			self.lastStatus = text
+
+	# Ends a line of status message so that other output doesn't get mixed in
+	def _breakStatus(self):
+		if self.statusWidth > 0:
+			self.stream.write("\n")
+			self.statusWidth = 0
+
+	def log(self, text):
+		if self.verbose is False:
+			return
+
+		with self.lock:
+			self._breakStatus()
+			self.stream.write(text + "\n")
+			self.stream.flush()
+
+	def showQuickPanel(self, items, callback, window=None):
+		if callback is None:
+			with self.lock:
+				self._breakStatus()
+				for item in items:
+					self._writeItem(None, item)
+			return
+
+		if self.assumeYes:
+			return callback(0)
+
+		if self.interactive is False:
+			return callback(-1)
+
+		with self.lock:
+			self._breakStatus()
+			for index, item in enumerate(items):
+				self._writeItem(index, item)
+
+		try:
+			choice = int(self._input("Choose [0-" + str(len(items) - 1) + "]: "))
+		except (ValueError, EOFError):
+			choice = -1
+
+		if choice < 0 or choice >= len(items):
+			choice = -1
+
+		callback(choice)
+
+	def _writeItem(self, index, item):
+		if type(item) is not list:
+			item = [item]
+
+		lines = [line for line in item if line]
+		if len(lines) == 0:
+			return
+
+		prefix = ""
+		if index is not None:
+			prefix = "[" + str(index) + "] "
+
+		self.stream.write(prefix + lines[0] + "\n")
+		for line in lines[1:]:
+			self.stream.write(" " * len(prefix) + "    " + line + "\n")
+		self.stream.flush()
+
+	def _input(self, prompt):
+		if sys.version < '3':
+			return raw_input(prompt)
+
+		return input(prompt)
+
+	def showInputPanel(self, caption, initial, callback, window=None):
+		if self.interactive is False:
+			self.stream.write("FTPSync > cannot ask for input when not interactive: " + caption + "\n")
+			return
+
+		with self.lock:
+			self._breakStatus()
+
+		try:
+			if caption.lower().find('password') != -1:
+				value = getpass.getpass(caption + " ")
+			else:
+				value = self._input(caption + " ") or initial
+		except EOFError:
+			return
+
+		callback(value)
+
+	def reloadFile(self, file_path):
+		pass
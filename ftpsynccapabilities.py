@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import os
+import sys
+import threading
+import time
+
+# FTPSync libraries
+if sys.version < '3':
+	import lib2.simplejson as json
+
+	from ftpsyncfiles import replace
+else:
+	import FTPSync.lib3.simplejson as json
+
+	from FTPSync.ftpsyncfiles import replace
+
+
+# ==== Initialization and optimization =====================================================
+
+# how long [s] learned capabilities are trusted before being probed again
+capabilitiesTtl = 86400
+
+
+# ==== Content =============================================================================
+
+# Returns key of a server in the capability cache
+#
+# @type config: dict
+# @param config: connection config
+#
+# @return string
+def getCapabilityKey(config):
+	return str(config.get('username')) + "@" + str(config['host']) + ":" + str(config['port'])
+
+
+# What servers support, kept on disk across sessions
+#
+# Spares FEAT and other probing round-trips on the first operations of every session.
+# Values of a server keep being used after they expire, isStale tells when
+# they should be probed again (in background)
+class Capabilities(object):
+
+	_instance = None
+
+	@staticmethod
+	def instance():
+		if Capabilities._instance is None:
+			Capabilities._instance = Capabilities()
+
+		return Capabilities._instance
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.file_path = None
+		self.ttl = capabilitiesTtl
+		# key => { 'time': float, 'values': dict }
+		self.servers = {}
+
+	# Enables the cache stored in given file, None disables it
+	#
+	# @type file_path: string|None
+	# @type ttl: int|None
+	# @param ttl: [s]
+	def configure(self, file_path, ttl=None):
+		with self.lock:
+			self.file_path = file_path
+			self.servers = {}
+
+			if ttl is not None:
+				self.ttl = int(ttl)
+
+			if file_path is not None and os.path.exists(file_path):
+				try:
+					with open(file_path, 'r') as cache:
+						servers = json.loads(cache.read())
+
+					if type(servers) is dict:
+						self.servers = servers
+				except (IOError, OSError, ValueError):
+					self.servers = {}
+
+	# Whether capabilities are being cached
+	#
+	# @return bool
+	def isEnabled(self):
+		return self.file_path is not None
+
+	# Returns a cached value
+	#
+	# @type key: string
+	# @param key: see getCapabilityKey
+	# @type name: string
+	# @type default: mixed
+	#
+	# @return mixed
+	def get(self, key, name, default=None):
+		with self.lock:
+			if key not in self.servers:
+				return default
+
+			return self.servers[key]['values'].get(name, default)
+
+	# Stores a value, written to disk when changed
+	#
+	# @type key: string
+	# @type name: string
+	# @type value: mixed
+	# @param value: JSON serializable
+	def set(self, key, name, value):
+		with self.lock:
+			if self.file_path is None:
+				return
+
+			if key not in self.servers:
+				self.servers[key] = { 'time': time.time(), 'values': {} }
+
+			if self.servers[key]['values'].get(name) == value and name in self.servers[key]['values']:
+				return
+
+			self.servers[key]['values'][name] = value
+			self._save()
+
+	# Whether the values of a server are due to be probed again
+	#
+	# @type key: string
+	#
+	# @return bool
+	def isStale(self, key):
+		with self.lock:
+			if self.file_path is None or key not in self.servers:
+				return False
+
+			return self.servers[key]['time'] + self.ttl < time.time()
+
+	# Drops values of a server and starts its lifetime anew
+	#
+	# @type key: string
+	# @type values: dict
+	# @param values: freshly probed values
+	def renew(self, key, values):
+		with self.lock:
+			if self.file_path is None:
+				return
+
+			self.servers[key] = { 'time': time.time(), 'values': dict(values) }
+			self._save()
+
+	def _save(self):
+		try:
+			directory = os.path.dirname(self.file_path)
+			if directory and os.path.exists(directory) is False:
+				os.makedirs(directory)
+
+			temporary = self.file_path + '.tmp'
+			with open(temporary, 'w') as cache:
+				cache.write(json.dumps(self.servers, indent=1, sort_keys=True))
+
+			replace(temporary, self.file_path)
+		except (IOError, OSError) as e:
+			print("FTPSync > Failed to save capability cache [Exception: " + str(e) + "]")
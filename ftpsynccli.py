@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Command line interface
+#
+# Runs FTPSync transfers outside of Sublime Text, using the same ftpsync.settings files
+#
+# Usage: python ftpsynccli.py [options] upload|download|mirror|list PATH [PATH ...]
+#   upload    uploads files and folders to all their connections
+#   download  downloads files and folders from the remote
+#   mirror    uploads only files that are missing or outdated on the remote,
+#             files and folders renamed or moved since the last mirror are moved on the remote
+#   list      lists remote contents of folders
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+
+
+# ==== Initialization and optimization =====================================================
+
+# Folder of the FTPSync package
+packageRoot = os.path.dirname(os.path.abspath(__file__))
+
+# global settings shipped with the package
+settingsName = 'FTPSync.sublime-settings'
+
+
+# ==== Content =============================================================================
+
+# Registers the package so that FTPSync modules can be imported
+#
+# Under Python 3 the modules import each other as FTPSync.*, so the package
+# folder is registered under that name regardless of where it's checked out
+def loadPackage():
+	if sys.version < '3':
+		if packageRoot not in sys.path:
+			sys.path.insert(0, packageRoot)
+		return
+
+	if 'FTPSync' in sys.modules:
+		return
+
+	import importlib.util
+
+	spec = importlib.util.spec_from_file_location('FTPSync', os.path.join(packageRoot, '__init__.py'), submodule_search_locations=[packageRoot])
+	module = importlib.util.module_from_spec(spec)
+	sys.modules['FTPSync'] = module
+	spec.loader.exec_module(module)
+
+
+# Imports a FTPSync module by its file name
+#
+# @type name: string
+# @param name: module name, eg. ftpsyncengine
+#
+# @return module
+def importModule(name):
+	loadPackage()
+
+	if sys.version < '3':
+		return __import__(name)
+
+	import importlib
+	return importlib.import_module('FTPSync.' + name)
+
+
+# Returns global settings, user file merged over the package defaults
+#
+# @type engine: module
+# @type file_path: string|None
+# @param file_path: user settings in the FTPSync.sublime-settings format
+#
+# @return dict
+def loadSettings(engine, file_path):
+	settings = engine.parseJson(os.path.join(packageRoot, settingsName))
+
+	if file_path is not None:
+		user = engine.parseJson(file_path)
+		for key in user:
+			if type(user[key]) is dict and type(settings.get(key)) is dict:
+				settings[key].update(user[key])
+			else:
+				settings[key] = user[key]
+
+	return settings
+
+
+# Returns whether the path is ignored globally or by the connection
+#
+# @type engine: module
+# @type file_path: string
+# @type config: dict
+# @param config: connection config
+#
+# @return bool
+def isIgnored(engine, file_path, config):
+	if engine.re_ignore is not None and engine.re_ignore.search(file_path) is not None:
+		return True
+
+	return config['ignore'] is not None and re.search(config['ignore'], file_path) is not None
+
+
+# Returns files that are missing or outdated on the connection
+#
+# Compares with one LIST per folder instead of checking each file,
+# files with a newer and different remote version are left out
+#
+# @type engine: module
+# @type connection: AbstractConnection
+# @type root: string
+# @param root: local folder to mirror
+# @type config: dict
+# @param config: connection config
+#
+# @return list<string>
+def getOutdatedFiles(engine, connection, root, config):
+	check = engine.FreshnessCheck(connection)
+	files = []
+
+	for folder, dirnames, filenames in os.walk(root):
+		dirnames[:] = [name for name in dirnames if isIgnored(engine, os.path.join(folder, name), config) is False]
+
+		for name in filenames:
+			file_path = os.path.join(folder, name)
+			if isIgnored(engine, file_path, config) is False:
+				files.append(file_path)
+				check.add(file_path)
+
+	check.run()
+	outdated = []
+
+	for file_path in files:
+		entry = check.getMetafile(file_path)
+
+		if entry is None:
+			outdated.append(file_path)
+		elif check.isNewerThan(file_path) and check.isDifferentSizeThan(file_path):
+			engine.printMessage("Skipping {" + os.path.relpath(file_path, root) + "}, remote version is newer")
+		elif check.isDifferentSizeThan(file_path):
+			outdated.append(file_path)
+		elif os.path.getmtime(file_path) >= entry.getLastModified() + check.getPrecision(file_path):
+			outdated.append(file_path)
+
+	return outdated
+
+
+# Uploads missing or outdated files of given folders
+#
+# @type engine: module
+# @type paths: list<string>
+# @type forced: bool
+# @param forced: upload everything
+def mirror(engine, paths, forced):
+	for path in paths:
+		path = os.path.abspath(path)
+		config_file_path = engine.getConfigFile(path)
+		if config_file_path is None:
+			engine.printMessage("Config not found for: " + path, status=True)
+			engine.metrics.increment(engine.globalScope, 'transfer_failures')
+			continue
+
+		config = engine.loadConfig(config_file_path)
+		connections = engine.getConnection(engine.getFilepathHash(config_file_path), config)
+
+		index = -1
+		for name in config['connections']:
+			index += 1
+
+			syncIndex = importModule('ftpsyncindex').SyncIndex(path, config_file_path + "|" + name)
+			current = syncIndex.scan(lambda file_path: isIgnored(engine, file_path, config['connections'][name]))
+
+			if forced:
+				outdated = [file_path for file_path, found in engine.gatherFiles([path]) if os.path.isfile(file_path)]
+			else:
+				if syncIndex.load():
+					engine.applyMoves(connections[index], path, syncIndex.findMoves(current), name)
+
+				outdated = getOutdatedFiles(engine, connections[index], path, config['connections'][name])
+
+			try:
+				syncIndex.save(current)
+			except (IOError, OSError) as e:
+				engine.printMessage("Failed to save sync index [Exception: " + engine.stringifyException(e) + "]", name)
+
+			engine.printMessage("Outdated files: " + str(len(outdated)), name, status=True)
+
+			if len(outdated) > 0:
+				files = [[file_path, config_file_path] for file_path in outdated]
+				engine.RemoteSyncCall(files, None, False, whitelistConnections=[name], checkNewer=False).run()
+
+
+# Prints remote contents of given folders
+#
+# @type engine: module
+# @type paths: list<string>
+# @type stream: file
+def listRemote(engine, paths, stream):
+	for path in paths:
+		path = os.path.abspath(path)
+		config_file_path = engine.getConfigFile(path)
+		if config_file_path is None:
+			engine.printMessage("Config not found for: " + path, status=True)
+			engine.metrics.increment(engine.globalScope, 'transfer_failures')
+			continue
+
+		config = engine.loadConfig(config_file_path)
+		connections = engine.getConnection(engine.getFilepathHash(config_file_path), config)
+
+		index = -1
+		for name in config['connections']:
+			index += 1
+
+			try:
+				contents = connections[index].list(path)
+			except Exception as e:
+				engine.printMessage("Listing failed [Exception: " + engine.stringifyException(e) + "]", name, status=True)
+				engine.metrics.increment(engine.globalScope, 'transfer_failures')
+				continue
+
+			stream.write("[" + name + "] " + path + "\n")
+			for entry in sorted(contents, key=lambda entry: (not entry.isDirectory(), entry.getName())):
+				if entry.isDirectory():
+					size = "<dir>"
+				else:
+					size = entry.getHumanFilesize()
+
+				stream.write("  " + entry.getLastModifiedFormatted().ljust(18) + size.rjust(12) + "  " + entry.getName() + "\n")
+
+
+# Waits until all spawned transfers finish
+def waitForThreads():
+	current = threading.current_thread()
+
+	while True:
+		running = [thread for thread in threading.enumerate() if thread is not current and thread.daemon is False]
+		if len(running) == 0:
+			return
+
+		for thread in running:
+			thread.join()
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="FTPSync command line interface, uses ftpsync.settings of given paths")
+	parser.add_argument('command', choices=['upload', 'download', 'mirror', 'list'])
+	parser.add_argument('paths', nargs='+', metavar='PATH')
+	parser.add_argument('--settings', help="global settings file, merged over the package " + settingsName)
+	parser.add_argument('--threads', type=int, help="max_threads override")
+	parser.add_argument('--force', action='store_true', help="upload, download: overwrite newer files, mirror: upload everything")
+	parser.add_argument('--yes', action='store_true', help="answer all prompts with the first choice")
+	parser.add_argument('--verbose', action='store_true', help="print all messages")
+	parser.add_argument('--stats', action='store_true', help="print transfer statistics at the end")
+	args = parser.parse_args(argv)
+
+	adapterModule = importModule('ftpsyncadapter')
+	engine = importModule('ftpsyncengine')
+
+	engine.setAdapter(adapterModule.ConsoleAdapter(assumeYes=args.yes, verbose=args.verbose))
+
+	settings = loadSettings(engine, args.settings)
+	if args.threads is not None:
+		settings['max_threads'] = args.threads
+	# failures are reported by the exit code, the queue belongs to the editor
+	settings['offline_queue'] = False
+	engine.configure(settings)
+
+	paths = [os.path.abspath(path) for path in args.paths]
+	failuresBefore = engine.metrics.getCounter(engine.globalScope, 'transfer_failures') + engine.metrics.getCounter(engine.globalScope, 'connection_failures')
+
+	def execute(files):
+		if args.command == 'upload':
+			engine.RemoteSyncCall(files, None, False, checkNewer=args.force is False).run()
+		elif args.command == 'download':
+			engine.RemoteSyncDownCall(files, None, forced=args.force).run()
+
+	if args.command == 'upload':
+		files = engine.gatherFiles(paths)
+	else:
+		files = [[path, engine.getConfigFile(path)] for path in paths]
+
+	missing = [file_path for file_path, config_file_path in files if config_file_path is None]
+	for file_path in missing:
+		sys.stderr.write("FTPSync > Config not found for: " + file_path + "\n")
+	if len(missing) > 0:
+		return 2
+
+	started = time.time()
+
+	try:
+		if args.command == 'mirror':
+			engine.fillPasswords(files, lambda files: mirror(engine, paths, args.force), None)
+		elif args.command == 'list':
+			engine.fillPasswords(files, lambda files: listRemote(engine, paths, sys.stdout), None)
+		else:
+			engine.fillPasswords(files, execute, None)
+
+		waitForThreads()
+	except KeyboardInterrupt:
+		sys.stderr.write("\nFTPSync > Interrupted\n")
+		return 130
+	finally:
+		engine.closeAllConnections()
+		engine.profiler.snapshot(forced=True)
+
+	if args.stats:
+		sys.stderr.write("\n")
+		for lines in engine.metrics.getSummary():
+			sys.stderr.write("\n".join(lines) + "\n\n")
+
+	failures = engine.metrics.getCounter(engine.globalScope, 'transfer_failures') + engine.metrics.getCounter(engine.globalScope, 'connection_failures') - failuresBefore
+	sys.stderr.write("\nFTPSync > " + args.command + " finished in " + engine.formatDuration(time.time() - started) + (", " + str(failures) + " failed" if failures > 0 else "") + "\n")
+
+	if failures > 0:
+		return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
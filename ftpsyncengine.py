@@ -0,0 +1,3878 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Doc comment syntax inspired by http://stackoverflow.com/a/487203/387503
+
+# Transfer engine - configs, connections and synchronization commands
+#
+# Independent of Sublime Text, talks to the user through a UiAdapter (ftpsyncadapter.py),
+# so that it can be driven by the plugin (FTPSync.py) as well as from the command line (ftpsynccli.py)
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import hashlib
+import math
+import os
+import re
+import shutil
+import socket
+import sys
+import threading
+import time
+import traceback
+from time import sleep
+
+# FTPSync libraries
+if sys.version < '3':
+	import lib2.simplejson as json
+
+	from ftpsyncadapter import ConsoleAdapter
+	from ftpsynccapabilities import Capabilities, getCapabilityKey
+	from ftpsyncwrapper import CreateConnection, TargetAlreadyExists, FTPSConnection, ConnectionClosedException
+	from ftpsyncprogress import Progress, ProgressReporter
+	from ftpsyncfiles import getFolders, findFile, formatTimestamp, gatherMetafiles, replace
+	from ftpsyncworker import Worker
+	from ftpsyncfilewatcher import FileWatcher, createEventWatch
+	from ftpsyncmetrics import Metrics, globalScope
+	from ftpsynctrace import Tracer
+	from ftpsyncprofile import Profiler, countInstances
+	from ftpsyncjournal import Journal
+	from ftpsyncfreshness import FreshnessCheck
+	from ftpsyncpubsub import Pubsub
+	from ftpsyncindex import SyncIndex, isInside
+	# exceptions
+	from ftpsyncexceptions import FileNotFoundException, TransferCancelledException, HostUnavailableException
+else:
+	import FTPSync.lib3.simplejson as json
+
+	from FTPSync.ftpsyncadapter import ConsoleAdapter
+	from FTPSync.ftpsynccapabilities import Capabilities, getCapabilityKey
+	from FTPSync.ftpsyncwrapper import CreateConnection, TargetAlreadyExists, FTPSConnection, ConnectionClosedException
+	from FTPSync.ftpsyncprogress import Progress, ProgressReporter
+	from FTPSync.ftpsyncfiles import getFolders, findFile, formatTimestamp, gatherMetafiles, replace
+	from FTPSync.ftpsyncworker import Worker
+	from FTPSync.ftpsyncfilewatcher import FileWatcher, createEventWatch
+	from FTPSync.ftpsyncmetrics import Metrics, globalScope
+	from FTPSync.ftpsynctrace import Tracer
+	from FTPSync.ftpsyncprofile import Profiler, countInstances
+	from FTPSync.ftpsyncjournal import Journal
+	from FTPSync.ftpsyncfreshness import FreshnessCheck
+	from FTPSync.ftpsyncpubsub import Pubsub
+	from FTPSync.ftpsyncindex import SyncIndex, isInside
+	# exceptions
+	from FTPSync.ftpsyncexceptions import FileNotFoundException, TransferCancelledException, HostUnavailableException
+
+# ==== Initialization and optimization =====================================================
+
+# user interface, see setAdapter
+adapter = ConsoleAdapter()
+
+isLoaded = False
+
+isDebug = True
+# print overly informative messages?
+isDebugVerbose = True
+# default config for a project
+projectDefaults = {}
+nested = []
+index = 0
+# global config key - for specifying global config in settings file
+globalConfigKey = '__global'
+ignore = False
+re_ignore = None
+systemNotifications = False
+# time format settings
+timeFormat = ""
+# delay before check of right opened file is performed, cancelled if closed in the meantime
+downloadOnOpenDelay = 0
+
+coreConfig = {}
+
+# name of a file to be detected in the project
+configName = 'ftpsync.settings'
+# name of a file that is a default sheet for new configs for projects
+connectionDefaultsFilename = 'ftpsync.default-settings'
+# timeout for a Sublime status bar messages [ms]
+messageTimeout = 250
+# minimal interval between transfer progress repaints in status bar [ms]
+progressReportInterval = 100
+# longest time a burst of saves can postpone its upload [ms]
+coalesceMaxWait = 2000
+# default location of the offline queue journal
+journalDefaultFile = os.path.join(os.path.expanduser('~'), '.ftpsync', 'queue.journal')
+# default location of learned server capabilities
+capabilitiesDefaultFile = os.path.join(os.path.expanduser('~'), '.ftpsync', 'capabilities.json')
+# delay before replaying operations left from previous session [s]
+journalReplayDelay = 5
+# bounds of the retry interval while offline [s], doubles after each failed replay
+journalRetryMin = 15
+journalRetryMax = 300
+# comment removing regexp
+removeLineComment = re.compile('//.*', re.I)
+# deprecated names
+deprecatedNames = {
+	"check_time": "overwrite_newer_prevention"
+}
+
+
+# connection cache pool - all connections
+connections = {}
+# connections currently marked as {in use}
+usingConnections = []
+# root check cache
+rootCheckCache = {}
+# server capabilities remembered across sessions
+capabilities = Capabilities.instance()
+# capability keys being refreshed in background
+capabilityRefreshes = set()
+capabilityRefreshesLock = threading.Lock()
+# config location index, folder => ( config path or None, time resolved )
+configs = {}
+# files deleted by a single pooled connection at a time, see bulkDelete
+bulkDeleteBatch = 100
+# how long [s] is remembered that a folder has no config
+configNegativeTtl = 10
+# parsed config cache, config path => { signature: (mtime, size), config: dict }
+configCache = {}
+# scheduled delayed uploads, file_path => action id
+scheduledUploads = {}
+# pending operations journal (offline queue), None = disabled
+journal = None
+# whether a journaled operation failed for lack of connection
+journalOffline = False
+# offline queue replay state
+journalState = {
+	'scheduled': False,
+	'retryDelay': journalRetryMin
+}
+journalLock = threading.Lock()
+
+# uploads in progress, file_path => [ lock, number of holders and waiters ]
+uploadLocks = {}
+uploadLocksGuard = threading.Lock()
+# limit of workers
+workerLimit = 0
+# debug workers?
+debugWorkers = False
+# debug json?
+debugJson = False
+
+
+# overwrite cancelled
+overwriteCancelled = []
+
+
+# pre_save x post_save upload prevention
+preventUpload = []
+
+# watch pre-scan
+preScan = {}
+
+# temporarily remembered passwords
+#
+# { settings_filepath => { connection_name => password }, ... }
+passwords = {}
+
+# Overriding config for on-the-fly modifications
+overridingConfig = {}
+
+# transfer and cache statistics
+metrics = Metrics.instance()
+# file to append metrics snapshots to (JSON lines), None = disabled
+metricsExportFile = None
+
+# cProfile / tracemalloc hooks, see profile_commands
+profiler = Profiler.instance()
+profiler.watch('connections', lambda: sum(len(pool) for pool in list(connections.values())))
+profiler.watch('FTPSConnection objects', lambda: countInstances('FTPSConnection'))
+profiler.watch('FTPSConnection.canEncrypt', lambda: len(FTPSConnection.canEncrypt))
+profiler.watch('scheduledUploads', lambda: len(scheduledUploads))
+profiler.watch('uploadLocks', lambda: len(uploadLocks))
+profiler.watch('overwriteCancelled', lambda: len(overwriteCancelled))
+profiler.watch('usingConnections', lambda: len(usingConnections))
+
+
+def isString(var):
+	var_type = type(var)
+
+	if sys.version[0] == '3':
+		return var_type is str or var_type is bytes
+	else:
+		return var_type is str or var_type is unicode
+
+
+# Applies global settings
+#
+# @type settings: object
+# @param settings: anything with get(key) - sublime.Settings or dict
+def configure(settings):
+	global coreConfig
+	global debugJson
+	global debugWorkers
+	global downloadOnOpenDelay
+	global ignore
+	global index
+	global isDebug
+	global isDebugVerbose
+	global isLoaded
+	global metricsExportFile
+	global nested
+	global projectDefaults
+	global re_ignore
+	global systemNotifications
+	global timeFormat
+	global workerLimit
+
+	# parsed configs are merged with global settings
+	configCache.clear()
+
+	# test settings
+	if settings.get('project_defaults') is None:
+		print ("="*86)
+		print ("FTPSync > Error loading settings ... please restart Sublime Text after installation")
+		print ("="*86)
+
+	# print debug messages to console?
+	isDebug = settings.get('debug')
+	# print overly informative messages?
+	isDebugVerbose = settings.get('debug_verbose')
+	# default config for a project
+	projectDefaults = settings.get('project_defaults')
+
+	index = 0
+
+	for item in projectDefaults.items():
+		if type(item[1]) is dict:
+			nested.append(index)
+		index += 1
+
+	# global ignore pattern
+	ignore = settings.get('ignore')
+	# time format settings
+	timeFormat = settings.get('time_format')
+	# delay before check of right opened file is performed, cancelled if closed in the meantime
+	downloadOnOpenDelay = settings.get('download_on_open_delay')
+	# system notifications
+	systemNotifications = settings.get('system_notifications')
+
+	# compiled global ignore pattern
+	if isString(ignore):
+		re_ignore = re.compile(ignore)
+	else:
+		re_ignore = None
+
+	# loaded project's config will be merged with this global one
+	coreConfig = {
+		'ignore': ignore,
+		'debug_verbose': settings.get('debug_verbose'),
+		'ftp_retry_limit': settings.get('ftp_retry_limit'),
+		'ftp_retry_delay': settings.get('ftp_retry_delay'),
+		'ftp_retry_delay_max': settings.get('ftp_retry_delay_max'),
+		'circuit_breaker_threshold': settings.get('circuit_breaker_threshold'),
+		'circuit_breaker_cooldown': settings.get('circuit_breaker_cooldown'),
+		'after_save_watch_events': settings.get('after_save_watch_events'),
+
+		'connection_timeout': settings.get('connection_timeout'),
+		'ascii_extensions': settings.get('ascii_extensions'),
+		'binary_extensions': settings.get('binary_extensions')
+	}
+
+	# limit of workers
+	workerLimit = settings.get('max_threads')
+	# debug workers?
+	debugWorkers = settings.get('debug_threads')
+	# debug json?
+	debugJson = settings.get('debug_json')
+	# metrics export
+	metricsExportFile = settings.get('metrics_export_file')
+	# command tracing
+	traceFile = settings.get('trace_file')
+	if traceFile:
+		traceFile = os.path.expanduser(traceFile)
+	Tracer.instance().configure(traceFile or None, settings.get('trace_max_size'))
+	# profiling
+	profileFolder = settings.get('profile_folder')
+	if profileFolder:
+		profileFolder = os.path.expanduser(profileFolder)
+	profiler.configure(settings.get('profile_commands'), settings.get('profile_memory'), profileFolder or None)
+	# save coalescing
+	saveCoalescer.setDelay(settings.get('upload_coalesce_delay'))
+	# offline queue
+	configureJournal(settings.get('offline_queue'), settings.get('offline_queue_file'))
+	# capability cache
+	capabilityFile = None
+	if settings.get('capability_cache'):
+		capabilityFile = os.path.expanduser(settings.get('capability_cache_file') or capabilitiesDefaultFile)
+	capabilities.configure(capabilityFile, settings.get('capability_cache_ttl'))
+
+	isLoaded = True
+
+
+# Sets the user interface adapter
+#
+# @type instance: UiAdapter
+#
+# @global adapter
+def setAdapter(instance):
+	global adapter
+
+	adapter = instance
+
+
+# Returns the user interface adapter
+#
+# @return UiAdapter
+def getAdapter():
+	return adapter
+
+
+# ==== Generic =============================================================================
+
+# Dumps the exception to console
+def handleException(exception):
+	print ("FTPSync > Exception in user code:")
+	print ('-' * 60)
+	traceback.print_exc(file=sys.stdout)
+	print ('-' * 60)
+
+
+# Safer print of exception message
+def stringifyException(exception):
+	return str(exception)
+
+
+# ==== Messaging ===========================================================================
+
+# Shows a message into Sublime's status bar
+#
+# @type  text: string
+# @param text: message to status bar
+def statusMessage(text):
+	adapter.statusMessage(text)
+
+
+# Schedules a single message to be logged/shown
+#
+# @type  text: string
+# @param text: message to status bar
+#
+# @global messageTimeout
+def dumpMessage(text):
+	adapter.setTimeout(lambda: statusMessage(text), messageTimeout)
+
+
+# Transfer progress shown in status bar, coalesced across all transfer threads
+progressReporter = ProgressReporter(lambda callback, delay: adapter.setTimeout(callback, delay), statusMessage, progressReportInterval)
+
+
+# Prints a special message to console and optionally to status bar
+#
+# @type  text: string
+# @param text: message to status bar
+# @type  name: string|None
+# @param name: comma-separated list of connections or other auxiliary info
+# @type  onlyVerbose: boolean
+# @param onlyVerbose: print only if config has debug_verbose enabled
+# @type  status: boolean
+# @param status: show in status bar as well = true
+#
+# @global isDebug
+# @global isDebugVerbose
+def printMessage(text, name=None, onlyVerbose=False, status=False):
+	message = "FTPSync"
+
+	if name is not None:
+		message += " [" + name + "]"
+
+	message += " > "
+	message += text
+
+	if isDebug and (onlyVerbose is False or isDebugVerbose is True):
+		adapter.log(message)
+
+	if status:
+		dumpMessage(message)
+
+
+# Issues a system notification for certian event
+#
+# @type text: string
+# @param text: notification message
+def systemNotify(text):
+	try:
+		import subprocess
+
+		text = "FTPSync > " + text
+
+		if sys.platform == "darwin":
+			""" Run Grown Notification """
+			cmd = '/usr/local/bin/growlnotify -a "Sublime Text 2" -t "FTPSync message" -m "'+text+'"'
+			subprocess.call(cmd,shell=True)
+		elif sys.platform == "linux2":
+			subprocess.call('/usr/bin/notify-send "Sublime Text 2" "'+text+'"',shell=True)
+		elif sys.platform == "win32":
+			""" Find the notifaction platform for windows if there is one"""
+
+	except Exception as e:
+		printMessage("Notification failed")
+		handleExceptions(e)
+
+
+# Creates a process message with progress bar (to be used in status bar)
+#
+# @type  stored: list<string>
+# @param stored: usually list of connection names
+# @type progress: Progress
+# @type action: string
+# @type action: action that the message reports about ("uploaded", "downloaded"...)
+# @type  basename: string
+# @param basename: name of a file connected with the action
+#
+# @return string message
+def getProgressMessage(stored, progress, action, basename = None):
+	base = "FTPSync [remotes: " + ",".join(stored) + "] "
+	action = "> " + action + " "
+
+	if progress is not None:
+		base += " ["
+
+		percent = progress.getPercent()
+
+		for i in range(0, int(percent)):
+			base += "="
+		for i in range(int(percent), 20):
+			base += "--"
+
+		base += " " + str(progress.current) + "/" + str(progress.getTotal())
+
+		rate = progress.getRate()
+		if rate is not None:
+			base += ", " + formatRate(rate)
+
+			remaining = progress.getRemainingTime()
+			if remaining is not None and progress.isFinished() is False:
+				base += ", " + formatDuration(remaining) + " left"
+
+		base += "] "
+
+	base += action
+
+	if basename is not None:
+		base += " {" + basename + "}"
+
+	return base
+
+
+# Formats transfer rate for humans
+#
+# @type  rate: float
+# @param rate: bytes per second
+#
+# @return string
+def formatRate(rate):
+	return str(round(float(rate) / 1024 / 1024, 2)) + " MB/s"
+
+
+# Formats duration for humans
+#
+# @type  seconds: float
+#
+# @return string eg. 1:05:09 or 3:12
+def formatDuration(seconds):
+	seconds = int(math.ceil(seconds))
+	hours = seconds // 3600
+	minutes = (seconds % 3600) // 60
+	seconds = seconds % 60
+
+	if hours > 0:
+		return "%d:%02d:%02d" % (hours, minutes, seconds)
+
+	return "%d:%02d" % (minutes, seconds)
+
+
+# ==== Config =============================================================================
+
+# Alters override config
+#
+# @type  config_dir_name: string
+# @param config_dir_name: path to a folder of a config
+# @type  property: string
+# @param property: property to be modified
+# @type value: mixed
+# @type specificName: string
+# @param specificName: use to only modify specific connection's value
+#
+# @global overrideConfig
+def overrideConfig(config_file_path, property, value, specificName=None):
+	if config_file_path is None or os.path.exists(config_file_path) is False:
+		return
+
+	config = loadConfig(config_file_path)
+
+	if config_file_path not in overridingConfig:
+		overridingConfig[config_file_path] = { 'connections': {} }
+
+	for name in config['connections']:
+		if specificName and name != specificName:
+			continue
+
+		if name not in overridingConfig[config_file_path]['connections']:
+			overridingConfig[config_file_path]['connections'][name] = {}
+
+		overridingConfig[config_file_path]['connections'][name][property] = value
+
+
+# Invalidates all config index entries belonging to a certain directory
+# as long as they're empty or less nested in the filesystem
+#
+# @type  config_dir_name: string
+# @param config_dir_name: path to a folder of a config to be invalidated
+#
+# @global configs
+def invalidateConfigCache(config_dir_name):
+	config_dir_name = os.path.normpath(config_dir_name)
+	prefix = os.path.join(config_dir_name, '')
+
+	for folder in list(configs.keys()):
+		if folder != config_dir_name and folder.startswith(prefix) is False:
+			continue
+
+		config = configs[folder][0]
+		if config is None or prefix.startswith(os.path.join(os.path.dirname(config), '')):
+			configs.pop(folder, None)
+
+
+# Finds a config file in given folders
+#
+# @type  folders: list<string>
+# @param folders: list of paths to folders to filter
+#
+# @return list<string> of file paths
+#
+# @global configName
+def findConfigFile(folders):
+	return findFile(folders, configName)
+
+
+# Returns first found config file from folders
+#
+# @type  folders: list<string>
+# @param folders: list of paths to folders to search in
+#
+# @return config filepath
+def guessConfigFile(folders):
+	for folder in folders:
+		config = getConfigFile(folder)
+		if config is not None:
+			return config
+
+		for root, dirs, files in os.walk(folder):
+			if configName in files:
+				return getConfigFile(root)
+
+	return None
+
+
+# Returns configuration file for a given file
+#
+# Config locations are indexed per folder, so files sharing a folder
+# resolve with a single stat of the config file
+#
+# @type  file_path: string
+# @param file_path: file_path to the file for which we try to find a config
+#
+# @return file path to the config file or None
+#
+# @global configs
+def getConfigFile(file_path):
+	if file_path is None:
+		return None
+
+	cacheKey = file_path
+	if isString(cacheKey) is False:
+		cacheKey = cacheKey.decode('utf-8')
+	if sys.version[0] == '3' and type(cacheKey) is bytes:
+		cacheKey = cacheKey.decode('utf-8')
+
+	if os.path.isdir(cacheKey):
+		folder = os.path.normpath(cacheKey)
+	else:
+		folder = os.path.dirname(os.path.normpath(cacheKey))
+
+	# try indexed
+	config = getIndexedConfigFile(folder)
+	if config is not False:
+		metrics.increment(globalScope, 'config_index_hit')
+
+		if config is not None:
+			printMessage("Loading config: cache hit (key: " + cacheKey + ")")
+
+		return config
+
+	# index miss
+	metrics.increment(globalScope, 'config_index_miss')
+
+	try:
+		folders = getFolders(folder)
+
+		if folders is None or len(folders) == 0:
+			return None
+
+		probed = []
+		config = None
+
+		for candidate in folders:
+			indexed = getIndexedConfigFile(candidate)
+			if indexed is not False:
+				config = indexed
+				break
+
+			probed.append(candidate)
+
+			if os.path.exists(os.path.join(candidate, configName)):
+				config = os.path.join(candidate, configName)
+				break
+
+		resolved = time.time()
+		for candidate in probed:
+			configs[candidate] = (config, resolved)
+
+		if config is None:
+			printMessage("Found no config for {" + cacheKey + "}", None, True)
+
+		return config
+
+	except AttributeError:
+		return None
+
+
+# Returns indexed config file for a folder
+#
+# @type  folder: string
+#
+# @return string config path, None for no config or False if not (validly) indexed
+#
+# @global configs
+# @global configNegativeTtl
+def getIndexedConfigFile(folder):
+	if folder not in configs:
+		return False
+
+	config, resolved = configs[folder]
+
+	if config is None:
+		if time.time() - resolved < configNegativeTtl:
+			return None
+	else:
+		try:
+			if os.stat(config).st_size > 0:
+				return config
+		except OSError:
+			pass
+
+	configs.pop(folder, None)
+	return False
+
+
+# Returns hash of file_path
+#
+# @type  file_path: string
+# @param file_path: file path to the file of which we want the hash
+#
+# @return hash of filepath
+def getFilepathHash(file_path):
+	return hashlib.md5(file_path.encode('utf-8')).hexdigest()
+
+
+# Returns path of file from its config file
+#
+# @type  file_path: string
+# @param file_path: file path to the file of which we want the hash
+#
+# @return string file path from settings root
+def getRootPath(file_path, prefix = ''):
+	return prefix + os.path.relpath(file_path, os.path.dirname(getConfigFile(file_path))).replace('\\', '/')
+
+
+
+# Gathers all entries from selected paths
+#
+# @type  file_path: list<string>
+# @param file_path: list of file/folder paths
+#
+# @return list of file/folder paths
+def gatherFiles(paths):
+	syncFiles = []
+	fileNames = []
+
+	for target in paths:
+		if os.path.isfile(target):
+			if target not in fileNames:
+				fileNames.append(target)
+				syncFiles.append([target, getConfigFile(target)])
+		elif os.path.isdir(target):
+			empty = True
+
+			for root, dirs, files in os.walk(target):
+				for file_path in files:
+					empty = False
+
+					if file_path not in fileNames:
+						fileNames.append(target)
+						syncFiles.append([os.path.join(root, file_path), getConfigFile(os.path.join(root, file_path))])
+
+				for folder in dirs:
+					path = os.path.join(root, folder)
+
+					if not os.listdir(path) and path not in fileNames:
+						fileNames.append(path)
+						syncFiles.append([path, getConfigFile(path)])
+
+
+			if empty is True:
+				syncFiles.append([target, getConfigFile(target)])
+
+	return syncFiles
+
+
+# Returns stable hash of configuration contents
+#
+# @type config: dict
+#
+# @return string
+def getObjectHash(o):
+	return hashlib.md5(json.dumps(o, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# Returns fingerprint of a connection config, used to tell whether cached connection is still valid
+#
+# @type config: dict
+# @param config: config of a single connection
+#
+# @return string
+def getConfigFingerprint(config):
+	values = dict(config)
+	values.pop('fingerprint', None)
+
+	return getObjectHash(values)
+
+
+# Updates deprecated config to newer version
+#
+# @type config: dict
+#
+# @return dict (config)
+#
+# @global deprecatedNames
+def updateConfig(config):
+	for old_name in deprecatedNames:
+		new_name = deprecatedNames[old_name]
+
+		if new_name in config:
+			config[old_name] = config[new_name]
+		elif old_name in config:
+			config[new_name] = config[old_name]
+
+	return config
+
+
+# Verifies contents of a given config object
+#
+# Checks that it's an object with all needed keys of a proper type
+# Does not check semantic validity of the content
+#
+# Should be used on configs merged with the defaults
+#
+# @type  config: dict
+# @param config: config dict
+#
+# @return string verification fail reason or a boolean
+def verifyConfig(config):
+	if type(config) is not dict:
+		return "Config is not a {dict} type"
+
+	keys = ["username", "password", "private_key", "private_key_pass", "path", "encoding", "tls", "use_tempfile", "upload_on_save", "port", "timeout", "ignore", "check_time", "download_on_open", "upload_delay", "after_save_watch", "time_offset", "set_remote_lastmodified", "default_folder_permissions", "default_local_permissions", "always_sync_local_permissions"]
+
+	for key in keys:
+		if key not in config:
+			return "Config is missing a {" + key + "} key"
+
+	if config['username'] is not None and isString(config['username']) is False:
+		return "Config entry 'username' must be null or string, " + str(type(config['username'])) + " given"
+
+	if config['password'] is not None and isString(config['password']) is False:
+		return "Config entry 'password' must be null or string, " + str(type(config['password'])) + " given"
+
+	if config['private_key'] is not None and isString(config['private_key']) is False:
+		return "Config entry 'private_key' must be null or string, " + str(type(config['private_key'])) + " given"
+
+	if config['private_key_pass'] is not None and isString(config['private_key_pass']) is False:
+		return "Config entry 'private_key_pass' must be null or string, " + str(type(config['private_key_pass'])) + " given"
+
+	if config['ignore'] is not None and isString(config['ignore']) is False:
+		return "Config entry 'ignore' must be null or string, " + str(type(config['ignore'])) + " given"
+
+	if isString(config['path']) is False:
+		return "Config entry 'path' must be a string, " + str(type(config['path'])) + " given"
+
+	if config['encoding'] is not None and isString(config['encoding']) is False:
+		return "Config entry 'encoding' must be a string, " + str(type(config['encoding'])) + " given"
+
+	if type(config['tls']) is not bool:
+		return "Config entry 'tls' must be true or false, " + str(type(config['tls'])) + " given"
+
+	if type(config['passive']) is not bool:
+		return "Config entry 'passive' must be true or false, " + str(type(config['passive'])) + " given"
+
+	if type(config['use_tempfile']) is not bool:
+		return "Config entry 'use_tempfile' must be true or false, " + str(type(config['use_tempfile'])) + " given"
+
+	if type(config['set_remote_lastmodified']) is not bool:
+		return "Config entry 'set_remote_lastmodified' must be true or false, " + str(type(config['set_remote_lastmodified'])) + " given"
+
+	if type(config['upload_on_save']) is not bool:
+		return "Config entry 'upload_on_save' must be true or false, " + str(type(config['upload_on_save'])) + " given"
+
+	if type(config['check_time']) is not bool:
+		return "Config entry 'check_time' must be true or false, " + str(type(config['check_time'])) + " given"
+
+	if type(config['download_on_open']) is not bool:
+		return "Config entry 'download_on_open' must be true or false, " + str(type(config['download_on_open'])) + " given"
+
+	if type(config['upload_delay']) is not int and type(config['upload_delay']) is not long:
+		return "Config entry 'upload_delay' must be integer or long, " + str(type(config['upload_delay'])) + " given"
+
+	if config.get('append_extensions') is not None and type(config['append_extensions']) is not list:
+		return "Config entry 'append_extensions' must be null or list, " + str(type(config['append_extensions'])) + " given"
+
+	if config.get('compress_transfers') not in [None, True, False, "text"]:
+		return "Config entry 'compress_transfers' must be true, false or \"text\", " + str(config['compress_transfers']) + " given"
+
+	if config['after_save_watch'] is not None and type(config['after_save_watch']) is not list:
+		return "Config entry 'after_save_watch' must be null or list, " + str(type(config['after_save_watch'])) + " given"
+
+	if type(config['port']) is not int and type(config['port']) is not long:
+		return "Config entry 'port' must be an integer or long, " + str(type(config['port'])) + " given"
+
+	if type(config['timeout']) is not int and type(config['timeout']) is not long:
+		return "Config entry 'timeout' must be an integer or long, " + str(type(config['timeout'])) + " given"
+
+	if type(config['time_offset']) is not int and type(config['time_offset']) is not long:
+		return "Config entry 'time_offset' must be an integer or long, " + str(type(config['time_offset'])) + " given"
+
+	return True
+
+
+# Parses JSON-type file with comments stripped out (not part of a proper JSON, see http://json.org/)
+#
+# @type  file_path: string
+#
+# @return dict|None
+#
+# @global removeLineComment
+def parseJson(file_path):
+	attempts = 3
+	succeeded = False
+
+	while attempts > 0:
+		attempts = attempts - 1
+		try:
+			json = parseJsonInternal(file_path)
+			if debugJson:
+				printMessage("Type returned: " + str(type(json)))
+				printMessage("Is empty: " + str(bool(json)))
+
+			succeeded = type(json) is dict and bool(json) is True
+			break
+		except Exception as e:
+			handleException(e)
+			printMessage("Retrying reading config... (remaining " + str(attempts) + ")")
+			sleep(0.1)
+
+	if succeeded:
+		return json
+	else:
+		printMessage("Failed to read settings from file: " + str(file_path))
+		return {}
+
+# Parses JSON-type file with comments stripped out (not part of a proper JSON, see http://json.org/)
+#
+# @type  file_path: string
+#
+# @return dict
+#
+# @global removeLineComment
+def parseJsonInternal(file_path):
+	if isString(file_path) is False:
+		raise Exception("Expected filepath as string, " + str(type(file_path)) + " given")
+
+	if os.path.exists(file_path) is False:
+		raise IOError("File " + str(file_path) + " does not exist")
+
+	if os.path.getsize(file_path) == 0:
+		raise IOError("File " + str(file_path) + " is empty")
+
+	contents = ""
+
+	try:
+		file = open(file_path, 'r')
+
+		for line in file:
+			contents += removeLineComment.sub('', line).strip()
+	finally:
+		file.close()
+
+	decoder = json.JSONDecoder()
+
+	if debugJson:
+		printMessage("Debug JSON:")
+		print ("="*86)
+		print (contents)
+		print ("="*86)
+
+	if len(contents) > 0:
+		return decoder.decode(contents)
+	else:
+		raise IOError('Content read from ' + str(file_path) + ' is empty')
+
+
+# Asks for passwords if missing in configuration
+#
+# @type config_file_path: string
+# @type config: dict
+# @param config: configuration object
+# @type callback: callback
+# @param callback: what should be done after config is filled
+# @type window: Window|None
+# @param window: SublimeText2 API Window object, passed to adapter
+#
+# @global passwords
+def addPasswords(config_file_path, config, callback, window):
+	def setPassword(config, name, password):
+		config['connections'][name]['password'] = password
+
+		if config_file_path not in passwords:
+			passwords[config_file_path] = {}
+
+		passwords[config_file_path][name] = password
+
+		addPasswords(config_file_path, config, callback, window)
+
+	def ask(connectionName, host, username):
+		adapter.showInputPanel('FTPSync > please provide password for:  ' + str(host) + ' ~ ' + str(username), "", lambda password: setPassword(config, connectionName, password), window)
+
+	if type(config) is dict:
+		for name in config['connections']:
+			prop = config['connections'][name]
+
+			if prop['password'] is None:
+				if config_file_path in passwords and name in passwords[config_file_path] and passwords[config_file_path][name] is not None:
+					config['connections'][name]['password'] = passwords[config_file_path][name]
+				else:
+					ask(name, prop['host'], prop['username'])
+					return
+
+	return callback()
+
+
+# Fills passwords if missing in configuration
+#
+# @type fileList: [ [ filepath, config_file_path ], ... ]
+# @type callback: callback
+# @param callback: what should be done after config is filled
+# @type window: Window|None
+# @param window: SublimeText2 API Window object, passed to adapter
+#
+# @global passwords
+def fillPasswords(fileList, callback, window, index = 0):
+	def ask():
+		fillPasswords(fileList, callback, window, index + 1)
+
+	i = 0
+	length = len(fileList)
+
+	if index >= length:
+		callback(fileList)
+		return
+
+	config_files = []
+	for filepath, config_file_path in fileList:
+		if config_file_path not in config_files:
+			config_files.append(config_file_path)
+
+	for config_file_path in config_files:
+		if i < index:
+			i = i + 1
+			continue
+
+		if config_file_path is None:
+			continue
+
+		config = loadConfig(config_file_path)
+		if config is not None:
+			addPasswords(config_file_path, config, ask, window)
+		return
+
+	callback(fileList)
+
+
+# Parses given config and adds default values to each connection entry
+#
+# Parsed configs are cached and revalidated by modification time and size,
+# each call returns a copy safe to be modified by the caller
+#
+# @type  file_path: string
+# @param file_path: file path to the file of which we want the hash
+#
+# @return config dict or None
+#
+# @global isLoaded
+# @global configCache
+def loadConfig(file_path):
+
+	if isLoaded is False:
+		printMessage("FTPSync is not loaded (just installed?), please restart Sublime Text")
+		return None
+
+	if isString(file_path) is False:
+		printMessage("LoadConfig expects string, " + str(type(file_path)) + " given")
+		return None
+
+	try:
+		stat = os.stat(file_path)
+	except OSError:
+		return None
+
+	signature = (stat.st_mtime, stat.st_size)
+
+	cached = configCache.get(file_path)
+	if cached is not None and cached['signature'] == signature:
+		metrics.increment(globalScope, 'config_cache_hit')
+	else:
+		metrics.increment(globalScope, 'config_cache_miss')
+		config = parseConfig(file_path)
+		if config is None:
+			return None
+
+		cached = {
+			'signature': signature,
+			'config': config
+		}
+
+		# failed reads are not remembered, the file may be just being written
+		if len(config['connections']) > 0:
+			configCache[file_path] = cached
+
+	return getConfigView(file_path, cached['config'])
+
+
+# Parses given config file, merges it with defaults and verifies it
+#
+# @type  file_path: string
+#
+# @return config dict or None
+#
+# @global coreConfig
+# @global projectDefaults
+def parseConfig(file_path):
+	# parse config
+	try:
+		config = parseJson(file_path)
+	except Exception as e:
+		printMessage("Failed parsing configuration file: {" + file_path + "} (commas problem?) [Exception: " + stringifyException(e) + "]", status=True)
+		handleException(e)
+		return None
+
+	result = {}
+
+	# merge with defaults and check
+	for name in config:
+		if type(config[name]) is not dict:
+			printMessage("Failed using configuration: contents are not dictionaries but values", status=True)
+			return None
+
+		result[name] = dict(list(projectDefaults.items()) + list(config[name].items()))
+		result[name]['file_path'] = file_path
+
+		# fix path
+		if len(result[name]['path']) > 1 and result[name]['path'][-1] != "/":
+			result[name]['path'] = result[name]['path'] + "/"
+
+		# merge nested
+		for index in nested:
+			list1 = list(list(projectDefaults.items())[index][1].items())
+			list2 = list(result[name][list(projectDefaults.items())[index][0]].items())
+
+			result[name][list(projectDefaults.items())[index][0]] = dict(list1 + list2)
+		try:
+			if result[name]['debug_extras']['dump_config_load'] is True:
+				print(result[name])
+		except KeyError:
+			pass
+
+		result[name] = updateConfig(result[name])
+
+		verification_result = verifyConfig(result[name])
+
+		if verification_result is not True:
+			printMessage("Invalid configuration loaded: <" + str(verification_result) + ">", status=True)
+
+		result[name]['fingerprint'] = getConfigFingerprint(result[name])
+
+	# merge with generics
+	return dict(list(coreConfig.items()) + list({"connections": result}.items()))
+
+
+# Returns a copy of a parsed config with passwords and overrides applied
+#
+# Connection entries are copied so that the caller can alter or remove them,
+# nested values are shared with the cache and are not to be modified
+#
+# @type  file_path: string
+# @type  config: dict
+# @param config: cached parsed config
+#
+# @return config dict
+#
+# @global passwords
+# @global overridingConfig
+def getConfigView(file_path, config):
+	final = dict(config)
+	final['connections'] = {}
+
+	altered = []
+
+	for name in config['connections']:
+		final['connections'][name] = dict(config['connections'][name])
+
+		# add passwords
+		if file_path in passwords and name in passwords[file_path] and passwords[file_path][name] is not None:
+			final['connections'][name]['password'] = passwords[file_path][name]
+			altered.append(name)
+
+	# override by overridingConfig
+	if file_path in overridingConfig:
+		for name in overridingConfig[file_path]['connections']:
+			if name in final['connections']:
+				for item in overridingConfig[file_path]['connections'][name]:
+					final['connections'][name][item] = overridingConfig[file_path]['connections'][name][item]
+				altered.append(name)
+
+	for name in set(altered):
+		final['connections'][name]['fingerprint'] = getConfigFingerprint(final['connections'][name])
+
+	return final
+
+
+# ==== Remote =============================================================================
+
+# Creates a new connection
+#
+# @type  config: object
+# @param config: configuration object
+# @type  hash: string
+# @param hash: connection cache hash (config filepath hash actually)
+#
+# @return list of descendants of AbstractConnection (ftpsyncwrapper.py)
+def makeConnection(config, hash=None, handleExceptions=True):
+
+	result = []
+
+	# for each config
+	for name in config['connections']:
+		properties = config['connections'][name]
+
+		# 1. initialize
+		try:
+			connection = CreateConnection(config, name)
+		except Exception as e:
+			if handleExceptions is False:
+				raise
+
+			metrics.increment(globalScope, 'connection_failures')
+			printMessage("Connection initialization failed [Exception: " + stringifyException(e) + "]", name, status=True)
+			handleException(e)
+
+			return []
+
+		# 2. connect
+		try:
+			connection.connect()
+		except Exception as e:
+			Pubsub.instance().publish('connectionFailed', [hash])
+
+			if handleExceptions is False:
+				raise
+
+			metrics.increment(globalScope, 'connection_failures')
+			printMessage("Connection failed [Exception: " + stringifyException(e) + "]", name, status=True)
+			connection.close(connections, hash)
+			handleException(e)
+
+			return []
+
+		printMessage("Connected to: " + properties['host'] + ":" + str(properties['port']) + " (timeout: " + str(properties['timeout']) + ") (key: " + str(hash) + ")", name)
+
+		# 3. authenticate
+		try:
+			if connection.authenticate():
+				printMessage("Authentication processed", name)
+		except Exception as e:
+			if handleExceptions is False:
+				raise
+
+			metrics.increment(globalScope, 'connection_failures')
+			printMessage("Authentication failed [Exception: " + stringifyException(e) + "]", name, status=True)
+			handleException(e)
+
+			return []
+
+		# 4. login
+		if properties['username'] is not None and properties['password'] is not None:
+			try:
+				connection.login()
+			except Exception as e:
+				metrics.increment(globalScope, 'connection_failures')
+				printMessage("Login failed [Exception: " + stringifyException(e) + "]", name, status=True)
+				handleException(e)
+
+				if properties['file_path'] in passwords and name in passwords[properties['file_path']]:
+					passwords[properties['file_path']][name] = None
+
+				if handleExceptions is False:
+					raise
+
+				return []
+
+			pass_present = " (using password: NO)"
+			if len(properties['password']) > 0:
+				pass_present = " (using password: YES)"
+
+			printMessage("Logged in as: " + properties['username'] + pass_present, name)
+		else:
+			printMessage("Anonymous connection", name)
+
+		# 5. ensure that root exists
+		cacheKey = properties['host'] + ":" + properties['path']
+		capabilityKey = getCapabilityKey(properties)
+		if cacheKey not in rootCheckCache and capabilities.get(capabilityKey, 'root:' + properties['path']):
+			rootCheckCache[cacheKey] = True
+
+		if cacheKey not in rootCheckCache:
+			try:
+				connection.ensureRoot()
+
+				rootCheckCache[cacheKey] = True
+				capabilities.set(capabilityKey, 'root:' + properties['path'], True)
+			except Exception as e:
+				if handleExceptions is False:
+					raise
+
+				printMessage("Failed ensure root exists [Exception: " + stringifyException(e) + "]", name)
+				handleException(e)
+
+				return []
+
+		# 6. set initial directory, set name, store connection
+		try:
+			connection.cwd(properties['path'])
+		except Exception as e:
+			if handleExceptions is False:
+				raise
+
+			printMessage("Failed to set path (probably connection failed) [Exception: " + stringifyException(e) + "]", name)
+			handleException(e)
+
+			return []
+
+		if capabilities.isStale(capabilityKey):
+			refreshCapabilities(config, name)
+
+		# 7. add to connections list
+		present = False
+		for con in result:
+			if con.name == connection.name:
+				present = True
+
+		if present is False:
+			result.append(connection)
+
+	if len(result) > 0:
+		Pubsub.instance().publish('connectionEstablished', [hash])
+
+	return result
+
+
+# Returns connection, connects if needed
+#
+# @type  hash: string
+# @param hash: connection cache hash (config filepath hash actually)
+# @type  config: object
+# @param config: configuration object
+# @type  shared: bool
+# @param shared: whether to use shared connection
+#
+# @return list of descendants of AbstractConnection (ftpsyncwrapper.py)
+#
+# @global connections
+def getConnection(hash, config, shared=True):
+	if shared is False:
+		return makeConnection(config, hash)
+
+	# try cache
+	try:
+		if connections[hash] and len(connections[hash]) > 0:
+			printMessage("Connection cache hit (key: " + hash + ")", None, True)
+
+		if type(connections[hash]) is not list or len(connections[hash]) < len(config['connections']):
+			raise KeyError
+
+		# has config changed?
+		valid = True
+		index = 0
+		for name in config['connections']:
+			if connections[hash][index].fingerprint != config['connections'][name].get('fingerprint'):
+				valid = False
+
+			index += 1
+
+		if valid == False:
+			for connection in connections[hash]:
+				connection.close(connections, hash)
+
+			raise KeyError
+
+		# is config truly alive
+		for connection in connections[hash]:
+			if connection.isAlive() is False:
+				raise KeyError
+
+		metrics.increment(globalScope, 'connection_cache_hit')
+		return connections[hash]
+
+	# cache miss
+	except KeyError:
+		metrics.increment(globalScope, 'connection_cache_miss')
+		connections[hash] = makeConnection(config, hash)
+
+		# schedule connection timeout
+		def closeThisConnection():
+			if hash not in usingConnections:
+				closeConnection(hash)
+			else:
+				adapter.setTimeout(closeThisConnection, config['connection_timeout'] * 1000)
+
+		adapter.setTimeout(closeThisConnection, config['connection_timeout'] * 1000)
+
+		# return all connections
+		return connections[hash]
+
+
+# Close all connections for a given config file
+#
+# @type  hash: string
+# @param hash: connection cache hash (config filepath hash actually)
+#
+# @global connections
+def closeConnection(hash):
+	if isString(hash) is False:
+		printMessage("Error closing connection: connection hash must be a string, " + str(type(hash)) + " given")
+		return
+
+	if hash not in connections:
+		return
+
+	try:
+		for connection in connections[hash]:
+			connection.close(connections, hash)
+			printMessage("Closed", connection.name)
+
+		if len(connections[hash]) == 0:
+			connections.pop(hash)
+
+	except Exception as e:
+		printMessage("Error when closing connection (key: " + hash + ") [Exception: " + stringifyException(e) + "]")
+		handleException(e)
+
+	exportMetrics()
+
+
+# Appends current metrics snapshot to the export file, if configured
+#
+# @global metricsExportFile
+def exportMetrics():
+	if not metricsExportFile:
+		return
+
+	try:
+		metrics.export(os.path.expanduser(metricsExportFile))
+	except Exception as e:
+		printMessage("Failed to export metrics [Exception: " + stringifyException(e) + "]")
+
+
+# Refreshes expired capabilities of a server in background
+#
+# @type config: dict
+# @type name: string
+# @param name: connection name
+#
+# @global capabilityRefreshes
+def refreshCapabilities(config, name):
+	capabilityKey = getCapabilityKey(config['connections'][name])
+
+	with capabilityRefreshesLock:
+		if capabilityKey in capabilityRefreshes:
+			return
+
+		capabilityRefreshes.add(capabilityKey)
+
+	single = dict(config)
+	single['connections'] = { name: config['connections'][name] }
+
+	refresh = RemoteCapabilityRefresh()
+	refresh.setConfig(single, capabilityKey)
+	refresh.start()
+
+
+# Returns lowest learned limit of connections of a config's servers
+#
+# @type config_file_path: string
+#
+# @return int|None
+def loadConnectionLimit(config_file_path):
+	config = loadConfig(config_file_path)
+	if config is None:
+		return None
+
+	limits = []
+	for name in config['connections']:
+		limit = capabilities.get(getCapabilityKey(config['connections'][name]), 'connectionLimit')
+		if limit is not None:
+			limits.append(limit)
+
+	if len(limits) == 0:
+		return None
+
+	return min(limits)
+
+
+# Remembers how many connections servers of a config accepted
+#
+# @type config_file_path: string
+# @type limit: int
+def storeConnectionLimit(config_file_path, limit):
+	config = loadConfig(config_file_path)
+	if config is None:
+		return
+
+	for name in config['connections']:
+		capabilities.set(getCapabilityKey(config['connections'][name]), 'connectionLimit', limit)
+
+
+# Returns a new worker
+def createWorker():
+	queue = Worker(workerLimit, makeConnection, loadConfig)
+	queue.setConnectionLimitStore(loadConnectionLimit, storeConnectionLimit)
+
+	if debugWorkers and isDebug:
+		queue.enableDebug()
+
+	return queue
+
+
+# Closes all cached connections
+#
+# @global connections
+def closeAllConnections():
+	for hash in list(connections.keys()):
+		closeConnection(hash)
+
+
+# ==== Executive functions ======================================================================
+
+class SyncObject(object):
+
+	def __init__(self):
+		self.onFinish = []
+
+	def addOnFinish(self, callback):
+		self.onFinish.append(callback)
+
+		return self
+
+	def triggerFinish(self, args):
+		for finish in self.onFinish:
+			if finish is not None:
+				finish(args)
+
+
+# Generic synchronization command
+class SyncCommand(SyncObject):
+
+	def __init__(self, file_path, config_file_path):
+		SyncObject.__init__(self)
+
+		if sys.version[0] == '3' and type(file_path) is bytes:
+			file_path = file_path.decode('utf-8')
+
+		self.running = True
+		self.closed = False
+		# has exclusive ownership of connection?
+		self.ownConnection = False
+		self.file_path = file_path
+		self.config_file_path = config_file_path
+		# entry in offline queue
+		self.journalId = None
+
+		if isString(config_file_path) is False:
+			printMessage("Cancelling " + self.getIdentification() + ": invalid config_file_path given (type: " + str(type(config_file_path)) + ")")
+			self.close()
+			return
+
+		if os.path.exists(config_file_path) is False:
+			printMessage("Cancelling " + self.getIdentification() + ": config_file_path: No such file")
+			self.close()
+			return
+
+		self.config = loadConfig(config_file_path)
+		if file_path is not None:
+			self.basename = os.path.relpath(file_path, os.path.dirname(config_file_path))
+
+		self.config_hash = getFilepathHash(self.config_file_path)
+		self.connections = None
+		self.worker = None
+
+		if profiler.isEnabled():
+			self.execute = profiler.wrap(self, 'execute')
+
+	def getIdentification(self):
+		return str(self.__class__.__name__) + " [" + str(self.file_path) + "]"
+
+	def setWorker(self, worker):
+		self.worker = worker
+
+	def setConnection(self, connections):
+		self.connections = connections
+		self.ownConnection = False
+
+	# Binds the command to an already journaled operation (replay)
+	def setJournalId(self, journalId):
+		self.journalId = journalId
+
+	def _createConnection(self):
+		if self.connections is None:
+			self.connections = getConnection(self.config_hash, self.config, False)
+			self.ownConnection = True
+
+	def _localizePath(self, config, remote_path):
+		path = remote_path
+		if path.find(config['path']) == 0:
+			path = os.path.realpath(os.path.join(os.path.dirname(self.config_file_path), remote_path[len(config['path']):]))
+
+		return path
+
+	def execute(self):
+		raise NotImplementedError("Abstract method")
+
+	def close(self):
+		self.running = False
+		self.closed = True
+
+	def _closeConnection(self):
+		closeConnection(getFilepathHash(self.config_file_path))
+
+	def whitelistConnections(self, whitelistConnections):
+		toBeRemoved = []
+		for name in self.config['connections']:
+			if name not in whitelistConnections:
+				toBeRemoved.append(name)
+
+		for name in toBeRemoved:
+			self.config['connections'].pop(name)
+
+		return self
+
+	def isRunning(self):
+		return self.running
+
+	def __del__(self):
+		self.running = False
+
+		if hasattr(self, 'config_hash') and self.config_hash in usingConnections:
+			usingConnections.remove(self.config_hash)
+
+		if hasattr(self, 'ownConnection'):
+			if self.ownConnection:
+				for connection in self.connections:
+					if isDebug:
+						printMessage("Closing connection")
+					connection.close()
+			elif hasattr(self, 'worker') and self.worker is not None:
+				self.worker = None
+
+
+# Transfer-related sychronization command
+class SyncCommandTransfer(SyncCommand):
+
+	def __init__(self, file_path, config_file_path, progress=None, onSave=False, disregardIgnore=False, whitelistConnections=[], forcedSave=False):
+		SyncCommand.__init__(self, file_path, config_file_path)
+
+		self.progress = progress
+		self.onSave = onSave
+		self.disregardIgnore = False
+
+		# global ignore
+		if disregardIgnore is False and ignore is not None and re_ignore.search(self.file_path) is not None:
+			if self._onPreConnectionRemoved():
+				printMessage("File globally ignored: {" + os.path.basename(self.file_path) + "}", onlyVerbose=True)
+				self.close()
+				return
+
+		toBeRemoved = []
+		for name in self.config['connections']:
+
+			# on save
+			if self.config['connections'][name]['upload_on_save'] is False and onSave is True and forcedSave is False:
+				toBeRemoved.append(name)
+				continue
+
+			# ignore
+			if disregardIgnore is False and self.config['connections'][name]['ignore'] is not None and re.search(self.config['connections'][name]['ignore'], self.file_path):
+				if self._onPreConnectionRemoved():
+					toBeRemoved.append(name)
+
+				printMessage("File ignored by rule: {" + self.basename + "}", name, True)
+				continue
+
+			# whitelist
+			if len(whitelistConnections) > 0 and name not in whitelistConnections:
+				toBeRemoved.append(name)
+				continue
+
+		for name in toBeRemoved:
+			self.config['connections'].pop(name)
+
+	# Code that needs to run when a connection is removed (ignored)
+	#
+	# @return bool: truly remove?
+	def _onPreConnectionRemoved(self):
+		if self.progress is not None:
+			self.progress.progress()
+
+		return True
+
+	# Get connections of this command that were not removed due to config, ignore etc.
+	def getConnectionsApplied(self):
+		return self.config['connections']
+
+	# Returns a callback for transferred blocks reporting the progress
+	#
+	# @type name: string
+	# @param name: connection name
+	# @type title: string
+	# @param title: action description, eg. "Downloading"
+	#
+	# @return callback(size)
+	def _onBlock(self, name, title):
+		key = self.progress
+		if key is None:
+			key = name + ":" + self.file_path
+
+		def message():
+			return getProgressMessage([name], self.progress, title, self.basename)
+
+		def onBlock(size):
+			if self.progress is not None:
+				self.progress.transferred(size)
+
+			progressReporter.update(key, message)
+
+		return onBlock
+
+	# Creates a message when transfer is finished and sends it to console / bar / system
+	def finishMessage(self, title, stored, wasFinished):
+		notify = title + "ing "
+		if self.progress is None or self.progress.getTotal() == 1:
+			notify += "{" + self.basename + "} "
+		else:
+			notify += str(self.progress.getTotal()) + " files "
+		notify += "finished!"
+
+		if self.progress is not None and self.progress.isFinished() and wasFinished is False:
+			dumpMessage(getProgressMessage(stored, self.progress, notify))
+		else:
+			dumpMessage(getProgressMessage(stored, self.progress, title + "ed ", self.basename))
+
+		if systemNotifications and self.progress is None or (self.progress.isFinished() and wasFinished is False):
+			systemNotify(notify)
+
+
+# Waits until no other upload of the file is in progress
+#
+# Keeps an older upload from finishing after a newer one
+#
+# @type file_path: string
+#
+# @global uploadLocks
+def acquireUpload(file_path):
+	with uploadLocksGuard:
+		if file_path not in uploadLocks:
+			uploadLocks[file_path] = [threading.Lock(), 0]
+
+		entry = uploadLocks[file_path]
+		entry[1] += 1
+
+	entry[0].acquire()
+
+
+# Lets a waiting upload of the file continue
+#
+# @type file_path: string
+#
+# @global uploadLocks
+def releaseUpload(file_path):
+	with uploadLocksGuard:
+		entry = uploadLocks[file_path]
+		entry[1] -= 1
+
+		if entry[1] == 0:
+			uploadLocks.pop(file_path)
+
+	entry[0].release()
+
+
+# Upload command
+class SyncCommandUpload(SyncCommandTransfer):
+
+	def __init__(self, file_path, config_file_path, progress=None, onSave=False, disregardIgnore=False, whitelistConnections=[], forcedSave=False):
+		self.delayed = False
+		self.skip = False
+
+		SyncCommandTransfer.__init__(self, file_path, config_file_path, progress, onSave, disregardIgnore, whitelistConnections, forcedSave)
+
+		self.watcher = FileWatcher(self.config_file_path, self.config['connections'], self.config['after_save_watch_events'] is not False)
+		if os.path.exists(file_path) is False:
+			printMessage("Cancelling " + self.getIdentification() + ": file_path: No such file")
+			self.close()
+			return
+
+		# saved changes must not get lost when offline
+		if self.onSave is True and len(self.config['connections']) > 0:
+			self.journalId = journalAdd('upload', self.file_path, self.config_file_path, list(self.config['connections']))
+
+	# Code that needs to run when a connection is removed (ignored)
+	#
+	# @return bool: truly remove?
+	def _onPreConnectionRemoved(self):
+		SyncCommandTransfer._onPreConnectionRemoved(self)
+
+		# when saving and has afterwatch, don't remove completely, only skip
+		# so that we at least upload those changed files
+		if self._hasAfterWatch() and self.onSave:
+			self.skip = True
+			return False
+
+		return True
+
+	# Returns whether any of the config entries has after_save_watch enabled
+	# Can't be in FileWatcher due to cycling dependency with config and _onPreConnectionRemoved
+	def _hasAfterWatch(self):
+		for name in self.config['connections']:
+			if self.config['connections'][name]['after_save_watch']:
+				return True
+
+		return False
+
+	# ???
+	def setScanned(self, event, name, data):
+		self.watcher.setScanned(event, name, data)
+
+	# Executes command
+	def execute(self):
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			journalFinish(self.journalId, [])
+			self.close()
+			return
+
+		if len(self.config['connections']) == 0:
+			printMessage("Cancelling " + self.getIdentification() + ": zero connections apply")
+			journalFinish(self.journalId, [])
+			self.close()
+			return
+
+		self._createConnection()
+
+		# afterwatch
+		if self.onSave is True:
+			try:
+				self.watcher.prepare()
+			except Exception as e:
+				printMessage("Watching failed: {" + self.basename + "} [Exception: " + stringifyException(e) + "]", "", False, True)
+
+		usingConnections.append(self.config_hash)
+		stored = []
+		offline = []
+		index = -1
+
+		# identification, a newer upload of the same file supersedes this one
+		id = os.urandom(32)
+		scheduledUploads[self.file_path] = id
+		remaining = [len(self.config['connections'])]
+
+		def release():
+			remaining[0] -= 1
+			if remaining[0] <= 0:
+				if scheduledUploads.get(self.file_path) == id:
+					scheduledUploads.pop(self.file_path)
+
+				journalFinish(self.journalId, offline, self.basename)
+
+		# same file is sent to every connection
+		if self.progress is not None and len(self.config['connections']) > 1 and os.path.isfile(self.file_path):
+			self.progress.addBytes(os.path.getsize(self.file_path) * (len(self.config['connections']) - 1))
+
+		for name in self.config['connections']:
+			index += 1
+
+			try:
+				self._createConnection()
+
+				connection = self.connections[index]
+
+				# action
+				def action(name=name, connection=connection):
+					try:
+
+						# cancelled
+						if self._isSuperseded(id):
+							printMessage("Upload of {" + self.basename + "} superseded by a newer one", name, onlyVerbose=True)
+							return
+
+						# process
+						if self.skip is False:
+							acquireUpload(self.file_path)
+							try:
+								if self._isSuperseded(id):
+									raise TransferCancelledException("Superseded by a newer upload")
+
+								connection.put(self.file_path, blockCallback = self._onSupersededBlock(id, self._onBlock(name, "Uploading")))
+							finally:
+								releaseUpload(self.file_path)
+
+						stored.append(name)
+
+						if self.skip is False:
+							printMessage("Uploaded {" + self.basename + "}", name)
+						else:
+							printMessage("Ignored {" + self.basename + "}", name)
+
+						if self.delayed is True:
+							for change in self.watcher.getChangedFiles(name):
+								if change.isSameFilepath(self.file_path):
+									continue
+
+								change = change.getPath()
+								command = SyncCommandUpload(change, getConfigFile(change), None, False, True, [name])
+
+								if self.worker is not None:
+									command.setWorker(self.worker)
+									self.worker.addCommand(command, self.config_file_path)
+								else:
+									command.execute()
+
+							self.delayed = False
+							self.__del__()
+
+						# no need to handle progress, delay action only happens with single uploads
+						self.triggerFinish(self.file_path)
+
+					except TransferCancelledException:
+						metrics.increment(globalScope, 'uploads_superseded')
+						printMessage("Upload of {" + self.basename + "} superseded by a newer one", name, onlyVerbose=True)
+
+					except Exception as e:
+						if isConnectivityError(e):
+							offline.append(name)
+
+						metrics.increment(globalScope, 'transfer_failures')
+						printMessage("Upload failed: {" + self.basename + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+						handleException(e)
+
+					finally:
+						release()
+						self.running = False
+
+				# delayed
+				if self.onSave is True and self.config['connections'][name]['upload_delay'] > 0:
+					self.delayed = True
+					printMessage("Delaying processing " + self.basename + " by " + str(self.config['connections'][name]['upload_delay']) + " seconds", name, onlyVerbose=True)
+					adapter.setTimeout(action, self.config['connections'][name]['upload_delay'] * 1000)
+				else:
+					action()
+
+			except IndexError:
+				offline.append(name)
+				release()
+				continue
+
+			except EOFError:
+				offline.append(name)
+				release()
+				printMessage("Connection has been terminated, please retry your action", name, False, True)
+				self._closeConnection()
+
+			except Exception as e:
+				if isConnectivityError(e):
+					offline.append(name)
+
+				release()
+				metrics.increment(globalScope, 'transfer_failures')
+				printMessage("Upload failed: {" + self.basename + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+				handleException(e)
+
+		if self.progress is not None:
+			self.progress.progress()
+
+		if len(stored) > 0:
+			self.finishMessage("Upload", stored, True)
+
+	# Whether a newer upload of the same file has been scheduled since
+	#
+	# @type id: bytes
+	# @param id: identification of this upload
+	#
+	# @return bool
+	def _isSuperseded(self, id):
+		return scheduledUploads.get(self.file_path) != id
+
+	# Wraps a block callback so that a superseded transfer gets aborted
+	#
+	# @type id: bytes
+	# @type onBlock: callback(size)
+	#
+	# @return callback(size)
+	def _onSupersededBlock(self, id, onBlock):
+		def onSupersededBlock(size):
+			if self._isSuperseded(id):
+				raise TransferCancelledException("Superseded by a newer upload")
+
+			onBlock(size)
+
+		return onSupersededBlock
+
+	def __del__(self):
+		if hasattr(self, 'delayed') and self.delayed is False:
+			SyncCommand.__del__(self)
+		else:
+			self.closed = True
+			self.running = False
+
+
+# Download command
+class SyncCommandDownload(SyncCommandTransfer):
+
+	def __init__(self, file_path, config_file_path, progress=None, onSave=False, disregardIgnore=False, whitelistConnections=[], forcedSave = False):
+		SyncCommandTransfer.__init__(self, file_path, config_file_path, progress, onSave, disregardIgnore, whitelistConnections, forcedSave)
+
+		self.isDir = False
+		self.forced = False
+		self.skip = False
+
+	def setIsDir(self):
+		self.isDir = True
+
+		return self
+
+	def setForced(self):
+		self.forced = True
+
+		return self
+
+	def setSkip(self):
+		self.skip = True
+
+		return self
+
+	def execute(self):
+		self.forced = True
+
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			self.close()
+			return
+
+		if len(self.config['connections']) == 0:
+			printMessage("Cancelling " + self.getIdentification() + ": zero connections apply")
+			self.close()
+			return
+
+		self._createConnection()
+
+		usingConnections.append(self.config_hash)
+		index = -1
+		stored = []
+
+		for name in self.config['connections']:
+			index += 1
+
+			try:
+				if self.isDir or os.path.isdir(self.file_path):
+					contents = self.connections[index].list(self.file_path)
+					if type(contents) is not list:
+						printMessage("List returned no entries {0}".format(self.file_path))
+						continue
+
+					if os.path.exists(self.file_path) is False:
+						os.makedirs(self.file_path)
+
+					if self.progress:
+						for entry in contents:
+							if entry.isDirectory() is False:
+								self.progress.add([os.path.join(self.file_path, entry.getName())], [entry.getFilesize()])
+
+					self.running = False
+					for entry in contents:
+						full_name = os.path.join(self.file_path, entry.getName())
+
+						command = SyncCommandDownload(full_name, self.config_file_path, progress=self.progress, disregardIgnore=self.disregardIgnore)
+
+						if self.forced:
+							command.setForced()
+
+						if entry.isDirectory() is True:
+							command.setIsDir()
+						elif not self.forced and entry.isNewerThan(full_name) is True:
+							command.setSkip()
+
+						if self.worker is not None:
+							command.setWorker(self.worker)
+							self.worker.addCommand(command, self.config_file_path)
+						else:
+							command.execute()
+
+				else:
+					if not self.skip or self.forced:
+						self.connections[index].get(self.file_path, blockCallback = self._onBlock(name, "Downloading"))
+						printMessage("Downloaded {" + self.basename + "}", name)
+						self.triggerFinish(self.file_path)
+					else:
+						printMessage("Skipping {" + self.basename + "}", name)
+
+					stored.append(name)
+
+			except IndexError:
+				continue
+
+			except FileNotFoundException:
+				printMessage("Remote file not found", name, False, True)
+				handleException(e)
+
+			except EOFError:
+				printMessage("Connection has been terminated, please retry your action", name, False, True)
+				self._closeConnection()
+
+			except Exception as e:
+				metrics.increment(globalScope, 'transfer_failures')
+				printMessage("Download of {" + self.basename + "} failed [Exception: " + stringifyException(e) + "]", name, False, True)
+				handleException(e)
+
+			finally:
+				self.running = False
+				break
+
+		wasFinished = False
+		if self.progress is None or self.progress.isFinished() is False:
+			wasFinished = True
+
+		if self.progress is not None and self.isDir is not True:
+			self.progress.progress()
+
+		if len(stored) > 0:
+			self.finishMessage("Download", stored, wasFinished)
+
+			adapter.reloadFile(self.file_path)
+
+
+# Rename command
+class SyncCommandRename(SyncCommand):
+
+	def __init__(self, file_path, config_file_path, new_name):
+		if os.path.exists(file_path) is False:
+			printMessage("Cancelling " + self.getIdentification() + ": file_path: No such file")
+			self.close()
+			return
+
+		if isString(new_name) is False:
+			printMessage("Cancelling SyncCommandRename: invalid new_name given (type: " + str(type(new_name)) + ")")
+			self.close()
+			return
+
+		if len(new_name) == 0:
+			printMessage("Cancelling SyncCommandRename: empty new_name given")
+			self.close()
+			return
+
+		self.new_name = new_name
+		self.dirname = os.path.dirname(file_path)
+		SyncCommand.__init__(self, file_path, config_file_path)
+
+		if self.closed is False and len(self.config['connections']) > 0:
+			self.journalId = journalAdd('rename', self.file_path, self.config_file_path, list(self.config['connections']), new_name)
+
+	def execute(self):
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			journalFinish(self.journalId, [])
+			self.close()
+			return
+
+		if len(self.config['connections']) == 0:
+			printMessage("Cancelling " + self.getIdentification() + ": zero connections apply")
+			journalFinish(self.journalId, [])
+			self.close()
+			return
+
+		self._createConnection()
+
+		usingConnections.append(self.config_hash)
+		index = -1
+		renamed = []
+
+		exists = []
+		# connections that couldn't be reached, renamed when replaying the offline queue
+		unreachable = []
+		remote_new_name = os.path.join( os.path.split(self.file_path)[0], self.new_name)
+		for name in self.config['connections']:
+			index += 1
+
+			check = None
+			try:
+				check = self.connections[index].list(remote_new_name)
+			except FileNotFoundException:
+				pass
+			except IndexError:
+				unreachable.append(name)
+			except Exception as e:
+				if isConnectivityError(e) is False:
+					raise
+
+				unreachable.append(name)
+				printMessage("Renaming failed: {" + self.basename + "} -> {" + self.new_name + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+
+			if type(check) is list and len(check) > 0:
+				exists.append(name)
+
+		def action(forced=False):
+			index = -1
+			offline = list(unreachable)
+
+			for name in self.config['connections']:
+				index += 1
+
+				if name in unreachable:
+					continue
+
+				try:
+					self.connections[index].rename(self.file_path, self.new_name, forced)
+					printMessage("Renamed {" + self.basename + "} -> {" + self.new_name + "}", name)
+					renamed.append(name)
+
+				except IndexError:
+					offline.append(name)
+					continue
+
+				except TargetAlreadyExists as e:
+					printMessage(stringifyException(e))
+
+				except EOFError:
+					offline.append(name)
+					printMessage("Connection has been terminated, please retry your action", name, False, True)
+					self._closeConnection()
+
+				except Exception as e:
+					if isConnectivityError(e):
+						offline.append(name)
+						metrics.increment(globalScope, 'transfer_failures')
+						printMessage("Renaming failed: {" + self.basename + "} -> {" + self.new_name + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+					elif str(e).find("No such file or directory"):
+						printMessage("Remote file not found", name, False, True)
+						renamed.append(name)
+					else:
+						metrics.increment(globalScope, 'transfer_failures')
+						printMessage("Renaming failed: {" + self.basename + "} -> {" + self.new_name + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+						handleException(e)
+
+			# message
+			if len(renamed) > 0:
+				# rename file
+				replace(self.file_path, os.path.join(self.dirname, self.new_name))
+
+				self.triggerFinish(self.file_path)
+
+				printMessage("Remotely renamed {" + self.basename + "} -> {" + self.new_name + "}", "remotes: " + ','.join(renamed), status=True)
+
+			journalFinish(self.journalId, offline, self.basename)
+
+		if len(exists) == 0:
+			action()
+		else:
+			def sync(index):
+				if index is 0:
+					printMessage("Renaming: overwriting target")
+					action(True)
+				else:
+					printMessage("Renaming: keeping original")
+					journalFinish(self.journalId, [])
+
+			overwrite = []
+			overwrite.append("Overwrite remote file? Already exists in:")
+			for remote in exists:
+				overwrite.append(remote + " [" + self.config['connections'][name]['host'] + "]")
+
+			cancel = []
+			cancel.append("Cancel renaming")
+			for remote in exists:
+				cancel.append("")
+
+			adapter.showQuickPanel([ overwrite, cancel ], sync)
+
+
+# Copies a remote file or folder from one connection of a config to another
+class SyncCommandCopy(SyncCommand):
+
+	# @type source: string
+	# @param source: name of the connection to copy from
+	# @type target: string
+	# @param target: name of the connection to copy to
+	def __init__(self, file_path, config_file_path, source, target):
+		self.source = source
+		self.target = target
+		SyncCommand.__init__(self, file_path, config_file_path)
+
+		if self.closed is False:
+			self.whitelistConnections([source, target])
+
+	def execute(self):
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			return
+
+		if self.source not in self.config['connections'] or self.target not in self.config['connections'] or self.source == self.target:
+			printMessage("Cancelling " + self.getIdentification() + ": two different connections needed")
+			return
+
+		self._createConnection()
+		names = list(self.config['connections'])
+
+		try:
+			source = self.connections[names.index(self.source)]
+			target = self.connections[names.index(self.target)]
+		except IndexError:
+			metrics.increment(globalScope, 'transfer_failures')
+			printMessage("Copying {" + self.basename + "} failed: could not connect", status=True)
+			return
+
+		printMessage("Copying {" + self.basename + "} to " + self.target, self.source)
+
+		try:
+			copied = source.copyTo(target, self.file_path)
+			printMessage("Copied {" + self.basename + "} to " + self.target + " (files: " + str(copied) + ")", self.source, status=True)
+			self.triggerFinish(self.file_path)
+		except FileNotFoundException:
+			printMessage("No remote version of {" + self.basename + "} found", self.source, status=True)
+		except Exception as e:
+			metrics.increment(globalScope, 'transfer_failures')
+			printMessage("Copying {" + self.basename + "} failed [Exception: " + stringifyException(e) + "]", self.source, False, True)
+			handleException(e)
+
+
+# Upload command
+class SyncCommandDelete(SyncCommandTransfer):
+
+	def __init__(self, file_path, config_file_path, progress=None, onSave=False, disregardIgnore=False, whitelistConnections=[]):
+		SyncCommandTransfer.__init__(self, file_path, config_file_path, progress, False, False, whitelistConnections)
+
+		if self.closed is False and len(self.config['connections']) > 0:
+			self.journalId = journalAdd('delete', self.file_path, self.config_file_path, list(self.config['connections']))
+
+	def execute(self):
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			journalFinish(self.journalId, [])
+			return
+
+		if self.progress is not None:
+			self.progress.progress()
+
+		if len(self.config['connections']) == 0:
+			printMessage("Cancelling " + self.getIdentification() + ": zero connections apply")
+			journalFinish(self.journalId, [])
+			return
+
+		self._createConnection()
+		usingConnections.append(self.config_hash)
+		deleted = []
+		offline = []
+		index = -1
+
+		for name in self.config['connections']:
+			index += 1
+
+			try:
+				# identification
+				connection = self.connections[index]
+
+				# action
+				try:
+					# process
+					if os.path.isdir(self.file_path):
+						bulkDelete(connection, self.file_path, self.config_file_path, name)
+					else:
+						connection.delete(self.file_path)
+					deleted.append(name)
+					printMessage("Deleted {" + self.basename + "}", name)
+
+				except FileNotFoundException:
+					deleted.append(name)
+					printMessage("No remote version of {" + self.basename + "} found", name)
+
+				except Exception as e:
+					if isConnectivityError(e):
+						offline.append(name)
+
+					metrics.increment(globalScope, 'transfer_failures')
+					printMessage("Delete failed: {" + self.basename + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+					handleException(e)
+
+			except IndexError:
+				offline.append(name)
+				continue
+
+			except FileNotFoundException:
+				printMessage("Remote file not found", name, False, True)
+				deleted.append(name)
+				continue
+
+			except EOFError:
+				offline.append(name)
+				printMessage("Connection has been terminated, please retry your action", name, False, True)
+				self._closeConnection()
+
+			except Exception as e:
+				if isConnectivityError(e):
+					offline.append(name)
+					metrics.increment(globalScope, 'transfer_failures')
+					printMessage("Delete failed: {" + self.basename + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+				elif str(e).find("No such file or directory"):
+					printMessage("Remote file not found", name, False, True)
+					deleted.append(name)
+				else:
+					metrics.increment(globalScope, 'transfer_failures')
+					printMessage("Delete failed: {" + self.basename + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+					handleException(e)
+
+		if len(deleted) > 0:
+			if os.path.exists(self.file_path):
+				if os.path.isdir(self.file_path):
+					shutil.rmtree(self.file_path)
+				else:
+					os.remove(self.file_path)
+
+			self.triggerFinish(self.file_path)
+
+			dumpMessage(getProgressMessage(deleted, self.progress, "Deleted", self.basename))
+
+		journalFinish(self.journalId, offline, self.basename)
+
+
+# Removes a remote folder with all its contents
+#
+# The tree is listed once, files are deleted by absolute paths in batches spread
+# over pooled connections, folders are then removed from the deepest
+#
+# @type connection: AbstractConnection
+# @type file_path: string
+# @param file_path: local path of the folder
+# @type config_file_path: string
+# @type name: string
+# @param name: connection name
+#
+# @global bulkDeleteBatch
+def bulkDelete(connection, file_path, config_file_path, name):
+	files, folders = connection.crawl(file_path)
+	basename = os.path.relpath(file_path, os.path.dirname(config_file_path))
+
+	progress = Progress()
+	progress.add([name + ":" + path for path in files + folders])
+	failed = []
+
+	def report():
+		progressReporter.update(progress, lambda: getProgressMessage([name], progress, "Deleting", basename))
+
+	batches = [files[index:index + bulkDeleteBatch] for index in range(0, len(files), bulkDeleteBatch)]
+
+	if workerLimit > 1 and len(batches) > 1:
+		queue = createWorker()
+
+		# the worker may look empty while it's still handing a batch over,
+		# so the batches themselves tell when they are done
+		remaining = [len(batches)]
+		lock = threading.Lock()
+		finished = threading.Event()
+
+		def onBatchFinish(paths):
+			with lock:
+				remaining[0] -= 1
+				if remaining[0] == 0:
+					finished.set()
+
+		for batch in batches:
+			command = SyncCommandDeleteEntries(batch, config_file_path, name, progress, failed, report)
+			command.addOnFinish(onBatchFinish)
+			queue.addCommand(command, config_file_path)
+
+		finished.wait()
+	else:
+		for batch in batches:
+			deleteEntries(connection, batch, progress, failed, report)
+
+	if len(failed) > 0:
+		raise Exception("Failed to delete " + str(len(failed)) + " of " + str(len(files)) + " files, e.g. " + failed[0])
+
+	for path in folders:
+		connection.removeEntry(path, True)
+		progress.progress()
+		report()
+
+
+# Deletes remote files one by one, see bulkDelete
+#
+# @type connection: AbstractConnection
+# @type paths: list<string>
+# @param paths: remote paths
+# @type progress: Progress
+# @type failed: list<string>
+# @param failed: collects paths that couldn't be deleted
+# @type report: callback
+def deleteEntries(connection, paths, progress, failed, report):
+	for index in range(len(paths)):
+		try:
+			connection.removeEntry(paths[index], False)
+		except Exception as e:
+			printMessage("Delete failed: {" + paths[index] + "} [Exception: " + stringifyException(e) + "]", connection.name, True)
+			failed.append(paths[index])
+
+			if isConnectivityError(e):
+				failed.extend(paths[index + 1:])
+				return
+
+		progress.progress()
+		report()
+
+
+# Deletes a batch of remote files on a pooled connection, see bulkDelete
+class SyncCommandDeleteEntries(SyncCommand):
+
+	# @type paths: list<string>
+	# @param paths: remote paths
+	# @type name: string
+	# @param name: connection name
+	# @type progress: Progress
+	# @type failed: list<string>
+	# @param failed: shared by all batches
+	# @type report: callback
+	def __init__(self, paths, config_file_path, name, progress, failed, report):
+		self.paths = paths
+		self.name = name
+		self.progress = progress
+		self.failed = failed
+		self.report = report
+		SyncCommand.__init__(self, None, config_file_path)
+
+	def getIdentification(self):
+		return str(self.__class__.__name__) + " [" + str(len(self.paths)) + " files]"
+
+	def execute(self):
+		try:
+			if self.closed is True:
+				printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+				self.failed.extend(self.paths)
+				return
+
+			self._createConnection()
+			connection = self.connections[list(self.config['connections']).index(self.name)]
+			deleteEntries(connection, self.paths, self.progress, self.failed, self.report)
+		except (IndexError, ValueError):
+			self.failed.extend(self.paths)
+		finally:
+			self.running = False
+			self.triggerFinish(self.paths)
+
+
+# Rename command
+class SyncCommandGetMetadata(SyncCommand):
+
+	def execute(self):
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			return
+
+		if len(self.config['connections']) == 0:
+			printMessage("Cancelling " + self.getIdentification() + ": zero connections apply")
+			return
+
+		self._createConnection()
+
+		usingConnections.append(self.config_hash)
+		index = -1
+		results = []
+		notFound = False
+
+		for name in self.config['connections']:
+			index += 1
+
+			try:
+				results.append({
+					'connection': name,
+					'metadata': self.connections[index].getMetadata(self.file_path)
+				})
+
+			except IndexError:
+				continue
+
+			except FileNotFoundException:
+				notFound = True
+
+			except EOFError:
+				printMessage("Connection has been terminated, please retry your action", name, False, True)
+				self._closeConnection()
+
+			except Exception as e:
+				printMessage("Getting metadata failed: {" + self.basename + "} [Exception: " + stringifyException(e) + "]", name, False, True)
+				handleException(e)
+
+		if notFound and len(results) == 0:
+			raise FileNotFoundException
+
+		return results
+
+
+def performRemoteCheck(file_path, window, forced = False, whitelistConnections=[]):
+	if isString(file_path) is False:
+		return
+
+	if window is None:
+		return
+
+	basename = os.path.basename(file_path)
+
+	printMessage("Checking {" + basename + "} if up-to-date", status=True)
+
+	config_file_path = getConfigFile(file_path)
+	if config_file_path is None:
+		return printMessage("Found no config > for file: " + file_path, status=True)
+
+	config = loadConfig(config_file_path)
+	try:
+		metadata = SyncCommandGetMetadata(file_path, config_file_path)
+		if len(whitelistConnections) > 0:
+			metadata.whitelistConnections(whitelistConnections)
+		metadata = metadata.execute()
+	except FileNotFoundException:
+		printMessage("Remote file not found", status=True)
+		return
+	except Exception as e:
+		printMessage("Error when getting metadata: " + stringifyException(e))
+		handleException(e)
+		metadata = []
+
+	if type(metadata) is not list:
+		return printMessage("Invalid metadata response, expected list, got " + str(type(metadata)))
+
+	if len(metadata) == 0:
+		return printMessage("No version of {" + basename + "} found on any server", status=True)
+
+	newest = []
+	oldest = []
+	every = []
+
+	for entry in metadata:
+		if forced is False and entry['metadata'].isDifferentSizeThan(file_path) is False:
+			continue
+
+		if entry['metadata'].isNewerThan(file_path):
+			newest.append(entry)
+			every.append(entry)
+		else:
+			oldest.append(entry)
+
+			if entry['metadata'].isDifferentSizeThan(file_path):
+				every.append(entry)
+
+	if len(every) > 0:
+		every = metadata
+		sorted(every, key=lambda entry: entry['metadata'].getLastModified())
+		every.reverse()
+
+		connectionCount = len(every)
+
+		def sync(index):
+			if index == connectionCount + 1:
+				return RemoteSyncCall(file_path, getConfigFile(file_path), True).start()
+
+			if index > 0:
+				if isDebug:
+					i = 0
+					for entry in every:
+						printMessage("Listing connection " + str(i) + ": " + str(entry['connection']))
+						i += 1
+
+					printMessage("Index selected: " + str(index - 1))
+
+				return RemoteSyncDownCall(file_path, getConfigFile(file_path), True, whitelistConnections=[every[index - 1]['connection']]).start()
+
+		filesize = os.path.getsize(file_path)
+		allItems = []
+		items = []
+		items.append("Keep current " + os.path.basename(file_path))
+		items.append("Size: " + str(round(float(os.path.getsize(file_path)) / 1024, 3)) + " kB")
+		items.append("Last modified: " + formatTimestamp(os.path.getmtime(file_path)))
+		allItems.append(items)
+		index = 1
+
+		for item in every:
+			item_filesize = item['metadata'].getFilesize()
+
+			if item_filesize == filesize:
+				item_filesize = "same size"
+			else:
+				if item_filesize > filesize:
+					item_filesize = str(round(item_filesize / 1024, 3)) + " kB ~ larger"
+				else:
+					item_filesize = str(round(item_filesize / 1024, 3)) + " kB ~ smaller"
+
+			time = str(item['metadata'].getLastModifiedFormatted(timeFormat))
+
+			if item in newest:
+				time += " ~ newer"
+			else:
+				time += " ~ older"
+
+
+			items = []
+			items.append("Get from " + item['connection'] + " [" + config['connections'][ item['connection'] ]['host'] + "]")
+			items.append("Size: " + item_filesize)
+			items.append("Last modified: " + time)
+			allItems.append(items)
+			index += 1
+
+		upload = []
+		upload.append("Upload file " + os.path.basename(file_path))
+		upload.append("Size: " + str(round(float(os.path.getsize(file_path)) / 1024, 3)) + " kB")
+		upload.append("Last modified: " + formatTimestamp(os.path.getmtime(file_path)))
+		allItems.append(upload)
+
+		adapter.showQuickPanel(allItems, sync, window)
+	else:
+		printMessage("All remote versions of {" + basename + "} are of same size and older", status=True)
+
+# ==== Threading ===========================================================================
+
+def fillProgress(progress, entry):
+	if len(entry) == 0:
+		return
+
+	if isString(entry[0]):
+		entry = entry[0]
+
+	if type(entry) is list:
+		for item in entry:
+			fillProgress(progress, item)
+	elif os.path.isfile(entry):
+		progress.add([entry], [os.path.getsize(entry)])
+	else:
+		progress.add([entry])
+
+
+class RemoteThread(threading.Thread):
+
+	def __init__(self):
+		threading.Thread.__init__(self)
+		self.preScan = None
+		self._whitelistConnetions = []
+		self._onFinish = None
+
+		if profiler.isEnabled():
+			self.run = profiler.wrap(self, 'run')
+
+	def setPreScan(self, preScan):
+		self.preScan = preScan
+
+	def addPreScan(self, command):
+		if self.preScan is not None:
+			for name in self.preScan:
+				command.setScanned('before', name, self.preScan[name])
+
+	def setWhitelistConnections(self, whitelistConnections):
+		self._whitelistConnetions = whitelistConnections
+
+	def addWhitelistConnections(self, command):
+		if hasattr(self, '_whitelistConnections'):
+			command.whitelistConnections(self._whitelistConnetions)
+
+		return command
+
+	def onFinish(self, callback):
+		self._onFinish = callback
+
+	def getOnFinish(self):
+		if hasattr(self, '_onFinish'):
+			return self._onFinish
+		else:
+			return None
+
+
+# Probes a server again with a dedicated connection once its cached capabilities expire
+class RemoteCapabilityRefresh(RemoteThread):
+
+	# @type config: dict
+	# @param config: with a single connection
+	# @type capabilityKey: string
+	def setConfig(self, config, capabilityKey):
+		self.config = config
+		self.capabilityKey = capabilityKey
+
+	def run(self):
+		properties = list(self.config['connections'].values())[0]
+
+		try:
+			capabilities.renew(self.capabilityKey, {})
+			rootCheckCache.pop(properties['host'] + ":" + properties['path'], None)
+
+			for connection in makeConnection(self.config, None, False):
+				connection.getInfo()
+				connection.close()
+
+			printMessage("Refreshed capabilities of " + self.capabilityKey)
+		except Exception as e:
+			printMessage("Failed to refresh capabilities of " + self.capabilityKey + " [Exception: " + stringifyException(e) + "]")
+		finally:
+			with capabilityRefreshesLock:
+				capabilityRefreshes.discard(self.capabilityKey)
+
+
+# Finds files that are newer on servers, for many files at once
+class SyncCommandCheckNewer(SyncCommand):
+
+	# @type file_paths: list<string>
+	# @param file_paths: files sharing the config_file_path
+	# @type config_file_path: string
+	def __init__(self, file_paths, config_file_path):
+		self.file_paths = file_paths
+		SyncCommand.__init__(self, None, config_file_path)
+
+	# @return dict<file_path => list<connection name>>
+	def execute(self):
+		newer = {}
+
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			return newer
+
+		if len(self.config['connections']) == 0:
+			return newer
+
+		self._createConnection()
+
+		usingConnections.append(self.config_hash)
+		index = -1
+
+		for name in self.config['connections']:
+			index += 1
+
+			if self.config['connections'][name]['check_time'] is not True:
+				continue
+
+			try:
+				check = FreshnessCheck(self.connections[index])
+				for file_path in self.file_paths:
+					check.add(file_path)
+
+				for file_path in check.run().getNewer():
+					if file_path not in newer:
+						newer[file_path] = []
+
+					newer[file_path].append(name)
+
+			except IndexError:
+				continue
+
+			except EOFError:
+				printMessage("Connection has been terminated, please retry your action", name, False, True)
+				self._closeConnection()
+
+			except Exception as e:
+				printMessage("Checking for newer files failed [Exception: " + stringifyException(e) + "]", name, False, True)
+				handleException(e)
+
+		return newer
+
+
+# Creates remote folders for files about to be uploaded, all at once, parents first
+class SyncCommandPrepareFolders(SyncCommand):
+
+	# @type file_paths: list<string>
+	# @param file_paths: files and folders sharing the config_file_path
+	# @type config_file_path: string
+	# @type disregardIgnore: bool
+	def __init__(self, file_paths, config_file_path, disregardIgnore=False):
+		self.file_paths = file_paths
+		self.disregardIgnore = disregardIgnore
+		SyncCommand.__init__(self, None, config_file_path)
+
+	# Returns local folders that need to exist on the connection's server
+	#
+	# @type name: string
+	# @param name: connection name
+	#
+	# @return list<string>
+	def _getFolders(self, name):
+		folders = []
+		rule = self.config['connections'][name]['ignore']
+
+		for file_path in self.file_paths:
+			if self.disregardIgnore is False:
+				if re_ignore is not None and re_ignore.search(file_path) is not None:
+					continue
+
+				if rule is not None and re.search(rule, file_path):
+					continue
+
+			if os.path.isdir(file_path):
+				folders.append(file_path)
+			else:
+				folders.append(os.path.dirname(file_path))
+
+		return folders
+
+	# @return list<connection name> connections where all the folders exist now
+	def execute(self):
+		prepared = []
+
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			return prepared
+
+		if len(self.config['connections']) == 0:
+			return prepared
+
+		self._createConnection()
+
+		usingConnections.append(self.config_hash)
+		index = -1
+
+		for name in self.config['connections']:
+			index += 1
+
+			try:
+				created = self.connections[index].ensureFolders(self._getFolders(name))
+				prepared.append(name)
+
+				if created > 0:
+					printMessage("Created " + str(created) + " folder(s)", name, onlyVerbose=True)
+
+			except IndexError:
+				continue
+
+			except EOFError:
+				printMessage("Connection has been terminated, please retry your action", name, False, True)
+				self._closeConnection()
+
+			except Exception as e:
+				printMessage("Creating folders failed [Exception: " + stringifyException(e) + "]", name, False, True)
+				handleException(e)
+
+		return prepared
+
+
+# Moves remote files and folders the way they were moved locally since the last sync
+#
+# Whatever fails to move is left for upload
+#
+# @type connection: AbstractConnection
+# @type root: string
+# @param root: synced local folder
+# @type moves: list<(string, string)>
+# @param moves: see SyncIndex.findMoves
+# @type name: string
+# @param name: connection name
+#
+# @return list<(string, string)> moves that were applied
+def applyMoves(connection, root, moves, name):
+	applied = []
+
+	for source, target in moves:
+		try:
+			connection.move(os.path.join(root, source), os.path.join(root, target))
+			applied.append((source, target))
+			metrics.increment(globalScope, 'remote_moves')
+			printMessage("Moved {" + source + "} -> {" + target + "}", name)
+		except Exception as e:
+			printMessage("Moving {" + source + "} failed, uploading instead [Exception: " + stringifyException(e) + "]", name)
+
+	return applied
+
+
+# Applies local renames and moves inside an uploaded folder on the servers
+#
+# Uses the folder's SyncIndex, the same one the command line mirror keeps
+class SyncCommandApplyMoves(SyncCommand):
+
+	# @type file_path: string
+	# @param file_path: uploaded folder
+	# @type config_file_path: string
+	# @type disregardIgnore: bool
+	def __init__(self, file_path, config_file_path, disregardIgnore=False):
+		self.disregardIgnore = disregardIgnore
+		SyncCommand.__init__(self, file_path, config_file_path)
+
+	# Whether a file or folder is excluded from syncing with the connection
+	#
+	# @type file_path: string
+	# @type name: string
+	# @param name: connection name
+	#
+	# @return bool
+	def _isIgnored(self, file_path, name):
+		if self.disregardIgnore:
+			return False
+
+		if re_ignore is not None and re_ignore.search(file_path) is not None:
+			return True
+
+		rule = self.config['connections'][name]['ignore']
+		return rule is not None and re.search(rule, file_path) is not None
+
+	# Returns files that the applied moves put in place unchanged
+	#
+	# @type syncIndex: SyncIndex
+	# @param syncIndex: with the state before moves
+	# @type current: dict
+	# @param current: see SyncIndex.scan
+	# @type applied: list<(string, string)>
+	#
+	# @return list<string> relative paths
+	def _getMovedFiles(self, syncIndex, current, applied):
+		moved = []
+
+		for path in current:
+			if current[path][0] or current[path][1] is None:
+				continue
+
+			original = path
+			for source, target in reversed(applied):
+				if isInside(original, target):
+					original = source + original[len(target):]
+
+			if original != path and syncIndex.entries.get(original) == current[path]:
+				moved.append(path)
+
+		return moved
+
+	# @return dict<file_path => list<connection name>> files not to be uploaded to given connections
+	def execute(self):
+		inPlace = {}
+
+		if self.closed is True:
+			printMessage("Cancelling " + self.getIdentification() + ": command is closed")
+			return inPlace
+
+		if len(self.config['connections']) == 0 or os.path.isdir(self.file_path) is False:
+			return inPlace
+
+		self._createConnection()
+
+		usingConnections.append(self.config_hash)
+		index = -1
+
+		for name in self.config['connections']:
+			index += 1
+
+			syncIndex = SyncIndex(self.file_path, self.config_file_path + "|" + name)
+			current = syncIndex.scan(lambda file_path: self._isIgnored(file_path, name))
+
+			try:
+				if syncIndex.load():
+					applied = applyMoves(self.connections[index], self.file_path, syncIndex.findMoves(current), name)
+
+					for path in self._getMovedFiles(syncIndex, current, applied):
+						file_path = os.path.join(self.file_path, path.replace('/', os.sep))
+						inPlace.setdefault(file_path, []).append(name)
+
+			except IndexError:
+				continue
+
+			except EOFError:
+				printMessage("Connection has been terminated, please retry your action", name, False, True)
+				self._closeConnection()
+
+			try:
+				syncIndex.save(current)
+			except (IOError, OSError) as e:
+				printMessage("Failed to save sync index [Exception: " + stringifyException(e) + "]", name)
+
+		return inPlace
+
+
+class RemotePresave(RemoteThread):
+	def __init__(self, file_path, metafile, config_file_path, _files, view, window, callback):
+		self.file_path = file_path
+		self.metafile = metafile
+		self.config_file_path = config_file_path
+		self._files = _files
+		self.view = view
+		self.window = window
+		self.callback = callback
+		RemoteThread.__init__(self)
+
+	def run(self):
+		try:
+			self._check()
+		except Exception:
+			saveCoalescer.release(self.file_path)
+			raise
+
+	def _check(self):
+		_files = self._files
+		file_path = self.file_path
+		config_file_path = self.config_file_path
+		view = self.view
+		preScan[config_file_path] = {}
+		root = os.path.dirname(config_file_path)
+		config = loadConfig(config_file_path)
+		blacklistConnections = []
+
+		for connection in config['connections']:
+			properties = config['connections'][connection]
+
+			if properties['upload_on_save'] is False:
+				blacklistConnections.append(connection)
+
+			watch = properties['after_save_watch']
+			if type(watch) is list and len(watch) > 0 and properties['upload_delay'] > 0:
+				# event-driven watch collects changes during the delay, no need to scan
+				if config['after_save_watch_events'] is not False:
+					eventWatch = createEventWatch(root, watch, properties['upload_delay'])
+					if eventWatch is not None:
+						preScan[config_file_path][connection] = eventWatch
+						continue
+
+				preScan[config_file_path][connection] = {}
+
+				for folder, filepattern in watch:
+					files = gatherMetafiles(filepattern, os.path.join(root, folder))
+					preScan[config_file_path][connection].update(files.items())
+
+				if properties['debug_extras']['after_save_watch']:
+					printMessage("<debug> dumping pre-scan")
+					print ("COUNT: " + str(len(preScan[config_file_path][connection])))
+					for change in preScan[config_file_path][connection]:
+						print ("Path: " + preScan[config_file_path][connection][change].getPath() + " | Name: " + preScan[config_file_path][connection][change].getName())
+
+		if len(blacklistConnections) == len(config['connections']):
+			saveCoalescer.release(file_path)
+			return
+
+		try:
+			metadata = SyncCommandGetMetadata(file_path, config_file_path).execute()
+		except Exception as e:
+			if str(e).find('No such file'):
+				printMessage("No version of {" + os.path.basename(file_path) + "} found on any server", status=True)
+			else:
+				printMessage("Error when getting metadata: " + stringifyException(e))
+				handleException(e)
+			metadata = []
+
+		newest = None
+		newer = []
+		index = 0
+
+		for entry in metadata:
+			properties = config['connections'][entry['connection']]
+
+			if 'debug_overwrite_prevention' in properties['debug_extras'] and properties['debug_extras']['debug_overwrite_prevention']:
+				printMessage("<debug> dumping overwrite prevention")
+				print ("File [local]: " + str(file_path))
+				print ("File [remote]: " + str(entry['metadata'].getPath()))
+				print ("Enabled: " + str(properties['check_time'] is True))
+				print ("Not in blacklist: " + str(entry['connection'] not in blacklistConnections))
+				print ("Is remote newer: " + str(entry['metadata'].isNewerThan(self.metafile)))
+				print ("Is size different: " + str(entry['metadata'].isDifferentSizeThan(file_path)))
+				print ("In overwrite cancelled: " + str(file_path in overwriteCancelled))
+				print ("+ [remote] last modified: " + str(entry['metadata'].getLastModified()))
+				print ("+ [local] last modified: " + str(self.metafile.getLastModified()))
+				print ("+ [remote] size: " + str(entry['metadata'].getFilesize()))
+				print ("+ [local] size: " + str(os.path.getsize(file_path)))
+
+			if (entry['connection'] not in blacklistConnections and properties['check_time'] is True and entry['metadata'].isNewerThan(self.metafile) and entry['metadata'].isDifferentSizeThan(file_path)) or file_path in overwriteCancelled:
+				newer.append(entry['connection'])
+
+				if newest is None or newest > entry['metadata'].getLastModified():
+					newest = index
+
+			index += 1
+
+		if len(newer) > 0:
+			preventUpload.append(file_path)
+
+			def sync(index):
+				if index is 0:
+					printMessage("Overwrite prevention: overwriting")
+
+					if file_path in overwriteCancelled:
+						overwriteCancelled.remove(file_path)
+
+					self.callback(self.file_path)
+				else:
+					printMessage("Overwrite prevention: cancelled upload")
+					saveCoalescer.release(file_path)
+
+					if file_path not in overwriteCancelled:
+						overwriteCancelled.append(file_path)
+
+			yes = []
+			yes.append("Yes, overwrite newer")
+			yes.append("Last modified: " + metadata[newest]['metadata'].getLastModifiedFormatted())
+
+			for entry in newer:
+				yes.append(entry + " [" + config['connections'][entry]['host'] + "]")
+
+			no = []
+			no.append("No")
+			no.append("Cancel uploading")
+
+			for entry in newer:
+				no.append("")
+
+			adapter.showQuickPanel([ yes, no ], sync, self.window)
+		else:
+			self.callback(self.file_path)
+
+
+class RemoteSyncCall(RemoteThread):
+	def __init__(self, file_path, config, onSave, disregardIgnore=False, whitelistConnections=[], forcedSave=False, checkNewer=True, folders=[]):
+		self.file_path = file_path
+		self.config = config
+		self.onSave = onSave
+		self.forcedSave = forcedSave
+		self.disregardIgnore = disregardIgnore
+		self.whitelistConnections = whitelistConnections
+		# overwrite prevention for multiple files, saved files are checked in RemotePresave
+		self.checkNewer = checkNewer
+		# uploaded folders, their local renames and moves are done on the server instead
+		self.folders = folders
+		RemoteThread.__init__(self)
+
+	def run(self):
+		target = self.file_path
+
+		if isString(target) and self.config is None:
+			return False
+
+		elif isString(target):
+			command = SyncCommandUpload(target, self.config, onSave=self.onSave, disregardIgnore=self.disregardIgnore, whitelistConnections=self.whitelistConnections, forcedSave=self.forcedSave)
+			command.addOnFinish(self.getOnFinish())
+			self.addWhitelistConnections(command)
+			self.addPreScan(command)
+			command.execute()
+
+		elif type(target) is list and len(target) > 0:
+			if self.checkNewer is False or self.onSave is True:
+				return self._upload(target, {})
+
+			newer = self._findNewer(target)
+			if len(newer) == 0:
+				return self._upload(target, newer)
+
+			def sync(index):
+				if index == 0:
+					printMessage("Overwrite prevention: overwriting")
+					self._upload(target, {})
+				elif index == 1:
+					printMessage("Overwrite prevention: skipping newer files")
+					self._upload(target, newer)
+				else:
+					printMessage("Overwrite prevention: cancelled upload")
+
+			names = sorted(newer)
+
+			yes = []
+			yes.append("Yes, overwrite newer")
+			yes.append("Newer remote version of " + str(len(names)) + " file(s):")
+			for file_path in names[:5]:
+				yes.append(os.path.basename(file_path) + " [" + ','.join(newer[file_path]) + "]")
+
+			skip = []
+			skip.append("No, skip newer files")
+			skip.append("Upload only the other " + str(len(target) - len(names)) + " file(s)")
+			for file_path in names[:5]:
+				skip.append("")
+
+			no = []
+			no.append("Cancel uploading")
+			no.append("")
+			for file_path in names[:5]:
+				no.append("")
+
+			adapter.showQuickPanel([ yes, skip, no ], sync)
+
+	# Finds files that are newer on servers, one listing per remote folder
+	#
+	# @type target: list<[file_path, config_file_path]>
+	#
+	# @return dict<file_path => list<connection name>>
+	def _findNewer(self, target):
+		grouped = {}
+		for file_path, config in target:
+			if config is None or os.path.isfile(file_path) is False:
+				continue
+
+			if config not in grouped:
+				grouped[config] = []
+
+			grouped[config].append(file_path)
+
+		newer = {}
+		for config in grouped:
+			command = SyncCommandCheckNewer(grouped[config], config)
+			if len(self.whitelistConnections) > 0:
+				command.whitelistConnections(self.whitelistConnections)
+
+			newer.update(command.execute())
+
+		return newer
+
+	# Moves remote files the way they were moved locally in uploaded folders
+	#
+	# @return dict<file_path => list<connection name>> files already in place
+	def _applyMoves(self):
+		moved = {}
+
+		for folder in self.folders:
+			config = getConfigFile(folder)
+			if config is None or os.path.isdir(folder) is False:
+				continue
+
+			command = SyncCommandApplyMoves(folder, config, self.disregardIgnore)
+			if len(self.whitelistConnections) > 0:
+				command.whitelistConnections(self.whitelistConnections)
+
+			for file_path, names in command.execute().items():
+				moved[file_path] = moved.get(file_path, []) + names
+
+		return moved
+
+	# Uploads multiple files
+	#
+	# @type target: list<[file_path, config_file_path]>
+	# @type skip: dict<file_path => list<connection name>>
+	# @param skip: files not to be uploaded to given connections
+	def _upload(self, target, skip):
+		# only once it's sure that the upload happens
+		if self.onSave is False:
+			skip = dict(skip)
+			for file_path, names in self._applyMoves().items():
+				skip[file_path] = skip.get(file_path, []) + names
+
+		uploads = []
+		for file_path, config in target:
+			whitelist = self.whitelistConnections
+
+			if file_path in skip:
+				whitelist = [name for name in loadConfig(config)['connections'] if name not in skip[file_path] and (len(self.whitelistConnections) == 0 or name in self.whitelistConnections)]
+				if len(whitelist) == 0:
+					continue
+
+			uploads.append([file_path, config, whitelist])
+
+		if len(uploads) > 1 and self.onSave is False:
+			uploads = self._prepareFolders(uploads)
+
+		progress = Progress()
+		fillProgress(progress, [[file_path, config] for file_path, config, whitelist in uploads])
+
+		queue = createWorker()
+
+		for file_path, config, whitelist in uploads:
+			command = SyncCommandUpload(file_path, config, progress=progress, onSave=self.onSave, disregardIgnore=self.disregardIgnore, whitelistConnections=whitelist, forcedSave=self.forcedSave)
+			command.addOnFinish(self.getOnFinish())
+			self.addWhitelistConnections(command)
+			self.addPreScan(command)
+
+			if workerLimit > 1:
+				queue.addCommand(command, config)
+			else:
+				command.execute()
+
+	# Creates all remote folders before any upload starts so that
+	# parallel uploads don't fail on and race to create missing folders
+	#
+	# @type uploads: list<[file_path, config_file_path, whitelist]>
+	#
+	# @return list<[file_path, config_file_path, whitelist]> without folders that got created
+	def _prepareFolders(self, uploads):
+		grouped = {}
+		for file_path, config, whitelist in uploads:
+			if config is None:
+				continue
+
+			if config not in grouped:
+				grouped[config] = []
+
+			grouped[config].append(file_path)
+
+		prepared = []
+		for config in grouped:
+			command = SyncCommandPrepareFolders(grouped[config], config, self.disregardIgnore)
+			if len(self.whitelistConnections) > 0:
+				command.whitelistConnections(self.whitelistConnections)
+
+			if len(command.execute()) == len(command.config['connections']):
+				prepared.append(config)
+
+		return [upload for upload in uploads if upload[1] not in prepared or os.path.isdir(upload[0]) is False]
+
+
+class RemoteSyncDownCall(RemoteThread):
+	def __init__(self, file_path, config, disregardIgnore=False, forced=False, whitelistConnections=[]):
+		self.file_path = file_path
+		self.config = config
+		self.disregardIgnore = disregardIgnore
+		self.forced = forced
+		self.whitelistConnections = []
+		self.isDir = False
+		RemoteThread.__init__(self)
+
+	def setIsDir(self):
+		self.isDir = True
+
+	def run(self):
+		target = self.file_path
+
+		if isString(target) and self.config is None:
+			return False
+
+		elif isString(target):
+			queue = createWorker()
+
+			command = SyncCommandDownload(target, self.config, disregardIgnore=self.disregardIgnore, whitelistConnections=self.whitelistConnections)
+			command.addOnFinish(self.getOnFinish())
+			self.addWhitelistConnections(command)
+
+			if self.isDir:
+				command.setIsDir()
+
+			if self.forced:
+				command.setForced()
+
+			if workerLimit > 1:
+				command.setWorker(queue)
+				queue.addCommand(command, self.config)
+			else:
+				command.execute()
+		elif type(target) is list and len(target) > 0:
+			total = len(target)
+			progress = Progress(total)
+			queue = createWorker()
+
+			for file_path, config in target:
+				if os.path.isfile(file_path):
+					progress.add([file_path])
+
+				command = SyncCommandDownload(file_path, config, disregardIgnore=self.disregardIgnore, progress=progress, whitelistConnections=self.whitelistConnections)
+				command.addOnFinish(self.getOnFinish())
+				self.addWhitelistConnections(command)
+
+				if self.isDir:
+					command.setIsDir()
+
+				if self.forced:
+					command.setForced()
+
+				if workerLimit > 1:
+					command.setWorker(queue)
+					queue.addCommand(command, config)
+				else:
+					command.execute()
+
+
+class RemoteSyncRename(RemoteThread):
+	def __init__(self, file_path, config, new_name):
+		self.file_path = file_path
+		self.new_name = new_name
+		self.config = config
+		RemoteThread.__init__(self)
+
+	def run(self):
+		self.addWhitelistConnections(SyncCommandRename(self.file_path, self.config, self.new_name).addOnFinish(self.getOnFinish())).execute()
+
+
+class RemoteSyncCopy(RemoteThread):
+	def __init__(self, file_path, config_file_path, source, target):
+		self.file_path = file_path
+		self.config_file_path = config_file_path
+		self.source = source
+		self.target = target
+		RemoteThread.__init__(self)
+
+	def run(self):
+		SyncCommandCopy(self.file_path, self.config_file_path, self.source, self.target).addOnFinish(self.getOnFinish()).execute()
+
+
+class RemoteSyncCheck(RemoteThread):
+	def __init__(self, file_path, window, forced=False, whitelistConnections=[]):
+		self.file_path = file_path
+		self.window = window
+		self.forced = forced
+		self.whitelistConnections = whitelistConnections
+		RemoteThread.__init__(self)
+
+	def run(self):
+		performRemoteCheck(self.file_path, self.window, self.forced, self.whitelistConnections)
+
+
+class RemoteSyncDelete(RemoteThread):
+	def __init__(self, file_paths):
+		self.file_path = file_paths
+		RemoteThread.__init__(self)
+
+	def run(self):
+		target = self.file_path
+
+		if isString(target):
+			self.file_path = [ target ]
+
+		def sync(index):
+			if index is 0:
+				self.delete()
+			else:
+				printMessage("Deleting: cancelled")
+
+		yes = []
+		yes.append("Yes, delete the selected items [also remotely]")
+		for entry in self.file_path:
+			yes.append( getRootPath(entry, '/') )
+
+		no = []
+		no.append("No")
+		no.append("Cancel deletion")
+
+		for entry in self.file_path:
+			if entry == self.file_path[0]:
+				continue
+
+			no.append("")
+
+		adapter.showQuickPanel([yes, no], sync)
+
+	def delete(self):
+		target = self.file_path
+		progress = Progress()
+		fillProgress(progress, target)
+
+		for file_path in target:
+			command = SyncCommandDelete(file_path, getConfigFile(file_path), progress=progress, onSave=False, disregardIgnore=False, whitelistConnections=[])
+			self.addWhitelistConnections(command)
+			command.addOnFinish(self.getOnFinish())
+			command.execute()
+
+
+# ==== Save coalescing =====================================================================
+
+# Collapses repeated saves into a single upload of the latest content
+#
+# A save first goes through the overwrite check (RemotePresave), then waits
+# in the queue until no other save arrives for {delay} ms. Saves of a file
+# that's already being checked or waiting skip the check, saves of different
+# files under the same config are uploaded together by one RemoteSyncCall
+class SaveCoalescer(object):
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		# [ms], 0 = upload right away
+		self.delay = 0
+		# file_path => config_file_path, saves waiting for upload
+		self.pending = {}
+		# file_paths with the overwrite check in progress
+		self.checking = set()
+		self.generation = 0
+		self.firstPending = None
+
+	# @type delay: int|None
+	# @param delay: quiet period [ms] before the upload
+	def setDelay(self, delay):
+		self.delay = int(delay or 0)
+
+	# Whether a save of the file is already being checked or waiting
+	#
+	# @type file_path: string
+	#
+	# @return bool
+	def isPending(self, file_path):
+		with self.lock:
+			return file_path in self.pending or file_path in self.checking
+
+	# Marks the file as being checked for overwriting
+	#
+	# @type file_path: string
+	def hold(self, file_path):
+		with self.lock:
+			self.checking.add(file_path)
+
+	# Drops the file after the overwrite check got cancelled
+	#
+	# @type file_path: string
+	def release(self, file_path):
+		with self.lock:
+			self.checking.discard(file_path)
+
+	# Another save of a pending file, postpones its upload
+	#
+	# @type file_path: string
+	def resave(self, file_path):
+		metrics.increment(globalScope, 'saves_coalesced')
+
+		with self.lock:
+			if file_path not in self.pending:
+				# still being checked, gets queued afterwards
+				return
+
+		self._schedule()
+
+	# Queues a checked save for upload
+	#
+	# @type file_path: string
+	# @type config_file_path: string
+	def add(self, file_path, config_file_path):
+		with self.lock:
+			self.checking.discard(file_path)
+			self.pending[file_path] = config_file_path
+
+			if self.firstPending is None:
+				self.firstPending = time.time()
+
+		if self.delay <= 0:
+			self.flush()
+		else:
+			self._schedule()
+
+	def _schedule(self):
+		with self.lock:
+			self.generation += 1
+			generation = self.generation
+
+		adapter.setTimeout(lambda: self._expire(generation), self.delay)
+
+	def _expire(self, generation):
+		with self.lock:
+			if self.firstPending is None:
+				return
+
+			waited = (time.time() - self.firstPending) * 1000
+			if generation != self.generation and waited < coalesceMaxWait:
+				return
+
+		self.flush()
+
+	# Uploads all waiting saves, one RemoteSyncCall per config file
+	#
+	# @global preScan
+	def flush(self):
+		with self.lock:
+			pending = self.pending
+			self.pending = {}
+			self.firstPending = None
+
+		groups = {}
+		for file_path in pending:
+			groups.setdefault(pending[file_path], []).append(file_path)
+
+		for config_file_path in groups:
+			files = groups[config_file_path]
+			metrics.increment(globalScope, 'saves_uploaded', len(files))
+
+			if len(files) == 1:
+				command = RemoteSyncCall(files[0], config_file_path, True)
+			else:
+				command = RemoteSyncCall([[file_path, config_file_path] for file_path in files], None, True)
+
+			if config_file_path in preScan and preScan[config_file_path] is not None:
+				command.setPreScan(preScan[config_file_path])
+
+			command.start()
+
+
+# queue of saves to be uploaded
+saveCoalescer = SaveCoalescer()
+
+
+# ==== Offline queue =======================================================================
+
+# Opens the journal of pending operations, replays what's left from previous session
+#
+# @type enabled: bool
+# @type file_path: string|None
+# @param file_path: None = journalDefaultFile
+#
+# @global journal
+def configureJournal(enabled, file_path):
+	global journal
+
+	if journal is not None:
+		journal.close()
+		journal = None
+
+	if not enabled:
+		return
+
+	try:
+		journal = Journal(os.path.expanduser(file_path or journalDefaultFile))
+		pending = journal.load()
+	except Exception as e:
+		printMessage("Failed to open offline queue, disabling [Exception: " + stringifyException(e) + "]")
+		handleException(e)
+		journal = None
+		return
+
+	if pending > 0:
+		printMessage("Offline queue: " + str(pending) + " operation(s) left from previous session", status=True)
+		scheduleReplay(journalReplayDelay)
+
+
+# Whether an exception means the server couldn't be reached (and it makes sense to retry later)
+#
+# @type exception: Exception
+#
+# @return bool
+def isConnectivityError(exception):
+	if isinstance(exception, (socket.error, socket.timeout, EOFError, ConnectionClosedException, HostUnavailableException)):
+		return True
+
+	if type(exception).__name__ == 'error_temp':
+		return True
+
+	message = str(exception).lower()
+	for part in ['timed out', 'connection refused', 'connection reset', 'network is unreachable', 'no route to host', 'broken pipe']:
+		if message.find(part) != -1:
+			return True
+
+	return False
+
+
+# Records an operation to the offline queue
+#
+# @type type: string
+# @param type: 'upload', 'delete' or 'rename'
+# @type file_path: string
+# @type config_file_path: string
+# @type connections: list<string>
+# @type new_name: string|None
+#
+# @return int|None journal id, None when disabled
+#
+# @global journal
+def journalAdd(type, file_path, config_file_path, connections, new_name=None):
+	if journal is None:
+		return None
+
+	try:
+		return journal.add(type, file_path, config_file_path, connections, new_name)
+	except (IOError, OSError) as e:
+		printMessage("Failed to write offline queue [Exception: " + stringifyException(e) + "]")
+		return None
+
+
+# Finishes a journaled operation, keeps it queued for connections that were offline
+#
+# @type id: int|None
+# @type offline: list<string>
+# @param offline: names of connections that couldn't be reached
+# @type basename: string
+# @param basename: for the message
+#
+# @global journal
+def journalFinish(id, offline, basename=""):
+	if journal is None or id is None:
+		return
+
+	try:
+		if len(offline) > 0:
+			journal.update(id, offline)
+			printMessage("Offline: {" + basename + "} queued, will retry when connection returns", ','.join(offline), status=True)
+			setOffline()
+		else:
+			journal.complete(id)
+	except (IOError, OSError) as e:
+		printMessage("Failed to write offline queue [Exception: " + stringifyException(e) + "]")
+
+
+# Marks connectivity as lost, retries queued operations periodically
+#
+# @global journalOffline
+def setOffline():
+	global journalOffline
+
+	journalOffline = True
+
+	with journalLock:
+		if journalState['scheduled']:
+			return
+
+		delay = journalState['retryDelay']
+		journalState['retryDelay'] = min(journalRetryMax, delay * 2)
+
+	metrics.increment(globalScope, 'offline_events')
+
+	scheduleReplay(delay)
+
+
+# Replays the offline queue after a delay, unless already scheduled
+#
+# @type delay: int|float
+# @param delay: [s]
+def scheduleReplay(delay):
+	with journalLock:
+		if journalState['scheduled']:
+			return
+
+		journalState['scheduled'] = True
+
+	def replay():
+		with journalLock:
+			journalState['scheduled'] = False
+
+		RemoteReplay().start()
+
+	adapter.setTimeout(replay, int(delay * 1000))
+
+
+# Subscriber - a connection failed, retry queued operations later
+def onConnectionFailed(hash):
+	if journal is not None and len(journal.getPending()) > 0:
+		setOffline()
+
+
+# Subscriber - a connection succeeded, replay queued operations if any got stuck
+def onConnectionEstablished(hash):
+	if journalOffline and journal is not None and len(journal.getPending()) > 0:
+		with journalLock:
+			journalState['retryDelay'] = journalRetryMin
+
+		scheduleReplay(1)
+
+Pubsub.instance().subscribe('connectionFailed', onConnectionFailed)
+Pubsub.instance().subscribe('connectionEstablished', onConnectionEstablished)
+
+
+# Executes queued operations in order, stops at the first one that's still offline
+class RemoteReplay(RemoteThread):
+
+	running = threading.Lock()
+
+	def run(self):
+		global journalOffline
+
+		if journal is None or RemoteReplay.running.acquire(False) is False:
+			return
+
+		try:
+			journalOffline = False
+
+			for entry in journal.getPending():
+				if journal.isPending(entry['id']) is False:
+					continue
+
+				self.replay(entry)
+
+				if journal.isPending(entry['id']):
+					# still unreachable, keep the order
+					return
+
+			with journalLock:
+				journalState['retryDelay'] = journalRetryMin
+
+			metrics.increment(globalScope, 'offline_replays')
+		finally:
+			RemoteReplay.running.release()
+
+	# Executes a single queued operation
+	#
+	# @type entry: dict
+	def replay(self, entry):
+		file_path = entry['file_path']
+		config_file_path = entry['config_file_path']
+
+		if config_file_path is None or os.path.exists(config_file_path) is False:
+			journal.complete(entry['id'])
+			return
+
+		printMessage("Offline queue: replaying " + entry['type'] + " of {" + os.path.basename(file_path) + "}", onlyVerbose=True)
+
+		if entry['type'] == 'upload':
+			if os.path.exists(file_path) is False:
+				journal.complete(entry['id'])
+				return
+
+			command = SyncCommandUpload(file_path, config_file_path, whitelistConnections=entry['connections'])
+		elif entry['type'] == 'delete':
+			command = SyncCommandDelete(file_path, config_file_path, whitelistConnections=entry['connections'])
+		elif entry['type'] == 'rename':
+			if os.path.exists(file_path) is False:
+				journal.complete(entry['id'])
+				return
+
+			command = SyncCommandRename(file_path, config_file_path, entry['new_name'])
+			if command.closed is False:
+				command.whitelistConnections(entry['connections'])
+		else:
+			journal.complete(entry['id'])
+			return
+
+		# commands journal themselves when created, this one already is
+		if command.journalId is not None and command.journalId != entry['id']:
+			journal.complete(command.journalId)
+
+		if command.closed:
+			journal.complete(entry['id'])
+			return
+
+		command.setJournalId(entry['id'])
+		command.execute()
@@ -30,4 +30,9 @@
 # Doc comment syntax inspired by http://stackoverflow.com/a/487203/387503
 
 class FileNotFoundException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class TransferCancelledException(Exception):
+    pass
+class HostUnavailableException(Exception):
+    pass
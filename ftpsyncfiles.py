@@ -34,7 +34,6 @@ import datetime
 import fnmatch
 import os
 import re
-import sublime
 import sys
 import tempfile
 
@@ -33,14 +33,51 @@
 # ==== Libraries ===========================================================================
 
 # Python's built-in libraries
+import fnmatch
 import os
+import select
+import struct
 import sys
+import threading
+import time
 
 # FTPSync libraries
 if sys.version < '3':
-    from ftpsyncfiles import gatherMetafiles, getChangedFiles
+    from ftpsyncfiles import gatherMetafiles, getChangedFiles, fileToMetafile
 else:
-    from FTPSync.ftpsyncfiles import gatherMetafiles, getChangedFiles
+    from FTPSync.ftpsyncfiles import gatherMetafiles, getChangedFiles, fileToMetafile
+
+# inotify is reached through ctypes, only on Linux
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+
+# ==== Initialization and optimization =====================================================
+
+# inotify flags, see <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# events of interest for watched folders
+watchMask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event header: wd, mask, cookie, len
+eventHeader = struct.Struct('iIII')
+
+# how long [s] a watch may outlive its upload delay before it stops itself
+watchLifetimeMargin = 30
+
+# loaded libc or False when inotify is not usable
+libc = None
 
 
 # ==== Exceptions ==========================================================================
@@ -54,16 +91,210 @@ class NotPreparedException(Exception):
 
 # ==== Content =============================================================================
 
+# Returns libc with inotify functions or None if not available (non-Linux)
+#
+# @return ctypes.CDLL|None
+#
+# @global libc
+def getInotify():
+	global libc
+
+	if libc is None:
+		libc = False
+
+		if ctypes is not None and sys.platform.startswith('linux'):
+			try:
+				library = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+				if hasattr(library, 'inotify_init1') and hasattr(library, 'inotify_add_watch'):
+					library.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+					libc = library
+			except (OSError, AttributeError):
+				libc = False
+
+	if libc is False:
+		return None
+
+	return libc
+
+
+# Whether the event-driven watcher backend can be used
+#
+# @return bool
+def isEventWatchAvailable():
+	return getInotify() is not None
+
+
+# Starts an event-driven watch for after_save_watch folders
+#
+# @type root: string
+# @param root: folder of the config file
+# @type watch: list
+# @param watch: after_save_watch entries [ [ folder, pattern ], ... ]
+# @type delay: int
+# @param delay: upload_delay of the connection [s]
+#
+# @return InotifyWatch|None when not available
+def createEventWatch(root, watch, delay):
+	if isEventWatchAvailable() is False:
+		return None
+
+	try:
+		return InotifyWatch(root, watch, delay + watchLifetimeMargin)
+	except OSError:
+		return None
+
+
+# Event-driven watcher of after_save_watch folders using Linux inotify
+#
+# Accumulates paths of files written in the watched folders until closed,
+# so there's no need to scan and diff the whole folders before and after the delay
+class InotifyWatch(threading.Thread):
+
+	# @type root: string
+	# @param root: folder of the config file
+	# @type watch: list
+	# @param watch: after_save_watch entries [ [ folder, pattern ], ... ]
+	# @type lifetime: int
+	# @param lifetime: stops itself after this many seconds
+	def __init__(self, root, watch, lifetime):
+		threading.Thread.__init__(self)
+		self.daemon = True
+
+		self.library = getInotify()
+		self.fd = self.library.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+		self.started = time.time()
+		self.deadline = self.started + lifetime
+		self.running = True
+		self.overflowed = False
+		self.lock = threading.Lock()
+		self.changed = set()
+		# wd => (folder, pattern)
+		self.watches = {}
+		self.watch = []
+
+		for folder, pattern in watch:
+			folder = os.path.join(root, folder)
+			self.watch.append([folder, pattern])
+			self._addTree(folder, pattern)
+
+		self.start()
+
+	# Adds a watch for the folder and all its subfolders
+	def _addTree(self, folder, pattern):
+		for subroot, dirnames, filenames in os.walk(folder):
+			self._addFolder(subroot, pattern)
+
+	# Adds a watch for a single folder
+	def _addFolder(self, folder, pattern):
+		path = folder
+		if type(path) is not bytes:
+			path = path.encode('utf-8')
+
+		wd = self.library.inotify_add_watch(self.fd, path, watchMask)
+		if wd >= 0:
+			self.watches[wd] = (folder, pattern)
+
+	# Reads events until closed or expired
+	def run(self):
+		try:
+			while self.running and time.time() < self.deadline:
+				readable = select.select([self.fd], [], [], 0.2)[0]
+				if readable:
+					self._readEvents()
+		except (OSError, IOError, ValueError):
+			self.overflowed = True
+		finally:
+			self.running = False
+			try:
+				os.close(self.fd)
+			except OSError:
+				pass
+
+	# Parses pending inotify events
+	def _readEvents(self):
+		try:
+			data = os.read(self.fd, 65536)
+		except OSError:
+			return
+
+		offset = 0
+		while offset + eventHeader.size <= len(data):
+			wd, mask, cookie, length = eventHeader.unpack_from(data, offset)
+			offset += eventHeader.size
+			name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+			offset += length
+
+			if mask & IN_Q_OVERFLOW:
+				self.overflowed = True
+				continue
+
+			if mask & IN_IGNORED:
+				self.watches.pop(wd, None)
+				continue
+
+			if wd not in self.watches:
+				continue
+
+			folder, pattern = self.watches[wd]
+			path = os.path.join(folder, name)
+
+			if mask & IN_ISDIR:
+				# new folder - watch it and catch files created before the watch got added
+				if mask & (IN_CREATE | IN_MOVED_TO):
+					self._addTree(path, pattern)
+					for subroot, dirnames, filenames in os.walk(path):
+						for filename in fnmatch.filter(filenames, pattern):
+							self._record(os.path.join(subroot, filename))
+			elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and fnmatch.fnmatch(name, pattern):
+				self._record(path)
+
+	def _record(self, path):
+		with self.lock:
+			self.changed.add(path)
+
+	# Stops watching
+	def close(self):
+		self.running = False
+
+	# Returns files written in watched folders since the watch started
+	#
+	# If the event queue overflowed falls back to comparing modification times
+	#
+	# @return Metafile[]
+	def getChangedFiles(self):
+		with self.lock:
+			changed = set(self.changed)
+
+		if self.overflowed:
+			for folder, pattern in self.watch:
+				for path, metafile in gatherMetafiles(pattern, folder).items():
+					if metafile.getLastModified() >= self.started:
+						changed.add(metafile.getPath())
+
+		result = []
+		for path in changed:
+			if os.path.isfile(path):
+				result.append(fileToMetafile(path))
+
+		return result
+
+
 class FileWatcher(object):
 
-	def __init__(self, config_file_path, config):
+	def __init__(self, config_file_path, config, useEvents=True):
 		self.config_file_path = config_file_path
 		self.config = config
 		self.prepared = False
+		self.useEvents = useEvents
 		self.afterwatch = {
 			'before': {},
 			'after': {}
 		}
+		# connection name => InotifyWatch
+		self.eventWatches = {}
 
 
 	# Scans watched paths for watched files, creates metafiles
@@ -76,12 +307,21 @@ class FileWatcher(object):
 		if event is 'before' and name in self.afterwatch['before'] and len(self.afterwatch['before'][name]) > 0:
 			return
 
+		if event == 'before' and name in self.eventWatches:
+			return
+
 		root = os.path.dirname(self.config_file_path)
 		properties = self.config[name]
 		watch = properties['after_save_watch']
 		self.afterwatch[event][name] = {}
 
 		if type(watch) is list and len(watch) > 0 and properties['upload_delay'] > 0:
+			if event == 'before' and self.useEvents:
+				eventWatch = createEventWatch(root, watch, properties['upload_delay'])
+				if eventWatch is not None:
+					self.eventWatches[name] = eventWatch
+					return
+
 			for folder, filepattern in watch:
 				# adds contents to dict
 				self.afterwatch[event][name].update(gatherMetafiles(filepattern, os.path.join(root, folder)).items())
@@ -96,6 +336,10 @@ class FileWatcher(object):
 	# @type data: ???
 	# @param data: ???
 	def setScanned(self, event, name, data):
+		if isinstance(data, InotifyWatch):
+			self.eventWatches[name] = data
+			return
+
 		if type(self.afterwatch) is not dict:
 			self.afterwatch = {}
 
@@ -130,6 +374,17 @@ class FileWatcher(object):
 		if self.prepared is False:
 			raise NotPreparedException
 
+		if connectionName in self.eventWatches:
+			eventWatch = self.eventWatches.pop(connectionName)
+			eventWatch.close()
+			changed = eventWatch.getChangedFiles()
+
+			if self.config[connectionName]['debug_extras']['after_save_watch']:
+				print ("FTPSync <debug> dumping changed files (events)")
+				print ("COUNT: " + str(len(changed)))
+
+			return changed
+
 		self.afterwatch['after'][connectionName] = {}
 		self.scanWatched('after', connectionName)
 		if self.config[connectionName]['debug_extras']['after_save_watch']:
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import os
+import sys
+
+# FTPSync libraries
+if sys.version < '3':
+	from ftpsyncexceptions import FileNotFoundException
+else:
+	from FTPSync.ftpsyncexceptions import FileNotFoundException
+
+
+# ==== Initialization and optimization =====================================================
+
+# up to this many files in a folder are checked one by one (MLST or MDTM and SIZE)
+# rather than by LIST, LIST needs a data connection which costs more than a few plain commands
+singleCheckLimit = 2
+
+
+# ==== Content =============================================================================
+
+# Finds out remote modification time and size of many files at once
+#
+# Files are grouped by remote folder, each folder takes one LIST
+# (or MLST, MDTM and SIZE per file when there are only a few of them)
+class FreshnessCheck(object):
+
+	# @type connection: AbstractConnection
+	def __init__(self, connection):
+		self.connection = connection
+		# remote folder => list<file_path>
+		self.folders = {}
+		# file_path => Metafile|None
+		self.results = {}
+		# file paths checked using MLST or MDTM, precise to a second
+		self.precise = set()
+
+	# Adds a local file to be checked
+	#
+	# @type file_path: string
+	#
+	# @return self
+	def add(self, file_path):
+		folder = os.path.dirname(self.connection.getMappedPath(file_path, False))
+
+		if folder not in self.folders:
+			self.folders[folder] = []
+
+		self.folders[folder].append(file_path)
+
+		return self
+
+	# Checks all added files
+	#
+	# @return self
+	def run(self):
+		useSingleCheck = self._canUseSingleCheck()
+
+		for folder in self.folders:
+			files = self.folders[folder]
+
+			if useSingleCheck and len(files) <= singleCheckLimit:
+				for file_path in files:
+					self._checkFile(file_path)
+			else:
+				self._checkFolder(folder, files)
+
+		self.folders = {}
+
+		return self
+
+	def _canUseSingleCheck(self):
+		if hasattr(self.connection, 'getMetadata') is False:
+			return False
+
+		if self.connection.hasFeature('MLST'):
+			return True
+
+		return self.connection.hasFeature('MDTM') and self.connection.hasFeature('SIZE')
+
+	def _checkFile(self, file_path):
+		try:
+			self.results[file_path] = self.connection.getMetadata(file_path)
+			self.precise.add(file_path)
+		except FileNotFoundException:
+			self.results[file_path] = None
+
+	def _checkFolder(self, folder, files):
+		contents = {}
+
+		try:
+			for entry in self.connection.list(folder, True, inline=True) or []:
+				if entry.isDirectory() is False:
+					contents[entry.getName()] = entry
+		except FileNotFoundException:
+			pass
+
+		for file_path in files:
+			self.results[file_path] = contents.get(os.path.basename(file_path))
+
+	# Returns remote metadata of a checked file
+	#
+	# @type file_path: string
+	#
+	# @return Metafile|None when not found on the server
+	def getMetafile(self, file_path):
+		return self.results.get(file_path)
+
+	# Returns precision [s] of the remote modification time
+	#
+	# LIST shows minutes for recent files and only a date for older ones
+	#
+	# @type file_path: string
+	#
+	# @return int
+	def getPrecision(self, file_path):
+		if file_path in self.precise:
+			return 1
+
+		metafile = self.results.get(file_path)
+		if metafile is not None and metafile.getLastModifiedFormatted('%H:%M') == '00:00':
+			return 86400
+
+		return 60
+
+	# Whether the remote file is newer than given local one
+	#
+	# @type file_path: string
+	# @type compared_file: string|Metafile|None
+	# @param compared_file: defaults to file_path
+	#
+	# @return bool
+	def isNewerThan(self, file_path, compared_file=None):
+		metafile = self.results.get(file_path)
+		if metafile is None:
+			return False
+
+		return metafile.isNewerThan(compared_file or file_path)
+
+	# Whether the remote file size differs from the local one
+	#
+	# @type file_path: string
+	#
+	# @return bool
+	def isDifferentSizeThan(self, file_path):
+		metafile = self.results.get(file_path)
+		if metafile is None:
+			return False
+
+		return metafile.isDifferentSizeThan(file_path)
+
+	# Returns files whose remote version is newer and different
+	#
+	# @return list<string>
+	def getNewer(self):
+		return [file_path for file_path in sorted(self.results) if self.isNewerThan(file_path) and self.isDifferentSizeThan(file_path)]
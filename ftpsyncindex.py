@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import hashlib
+import os
+import sys
+
+# FTPSync libraries
+if sys.version < '3':
+	import lib2.simplejson as json
+
+	from ftpsyncfiles import replace
+else:
+	import FTPSync.lib3.simplejson as json
+
+	from FTPSync.ftpsyncfiles import replace
+
+
+# ==== Initialization and optimization =====================================================
+
+# where indexes of synced folders are kept
+indexFolder = os.path.join(os.path.expanduser('~'), '.ftpsync', 'index')
+
+
+# ==== Content =============================================================================
+
+# Returns what identifies a file or folder regardless of its name and location
+#
+# Inode where available, size and modification time of files otherwise (Python 2 on Windows)
+#
+# @type stat: os.stat_result
+# @type isDir: bool
+#
+# @return list|None
+def getIdentity(stat, isDir):
+	if stat.st_ino:
+		return [stat.st_dev, stat.st_ino]
+	elif isDir:
+		return None
+	else:
+		return [stat.st_size, stat.st_mtime]
+
+
+# Whether path lies in given folder
+#
+# @type path: string
+# @type folder: string
+#
+# @return bool
+def isInside(path, folder):
+	return path == folder or path.startswith(folder + '/')
+
+
+# Local state of a folder at the time of its last sync
+#
+# Comparing it with the current state tells which files and folders were renamed
+# or moved locally since, so that they can be moved on the server instead of uploaded
+class SyncIndex(object):
+
+	# @type root: string
+	# @param root: synced folder
+	# @type key: string
+	# @param key: distinguishes indexes of the same folder, e.g. per connection
+	# @type folder: string|None
+	# @param folder: None = indexFolder
+	def __init__(self, root, key, folder=None):
+		self.root = os.path.abspath(root)
+		name = hashlib.sha1((key + "|" + self.root).encode('utf-8')).hexdigest()
+		self.file_path = os.path.join(folder or indexFolder, name + '.json')
+		# relative path => [ isDir, identity, size, mtime ]
+		self.entries = None
+
+	# Loads the stored state
+	#
+	# @return bool whether there was any
+	def load(self):
+		self.entries = None
+
+		if os.path.exists(self.file_path) is False:
+			return False
+
+		try:
+			with open(self.file_path, 'r') as index:
+				entries = json.loads(index.read())
+		except (IOError, OSError, ValueError):
+			return False
+
+		if type(entries) is not dict:
+			return False
+
+		self.entries = entries
+		return True
+
+	# Returns the current state
+	#
+	# @type isIgnored: callback(file_path): bool
+	#
+	# @return dict
+	def scan(self, isIgnored=None):
+		entries = {}
+
+		for folder, dirnames, filenames in os.walk(self.root):
+			if isIgnored is not None:
+				dirnames[:] = [name for name in dirnames if isIgnored(os.path.join(folder, name)) is False]
+
+			for name, isDir in [(name, True) for name in dirnames] + [(name, False) for name in filenames]:
+				file_path = os.path.join(folder, name)
+				if isDir is False and isIgnored is not None and isIgnored(file_path):
+					continue
+
+				try:
+					stat = os.stat(file_path)
+				except OSError:
+					continue
+
+				relative = os.path.relpath(file_path, self.root).replace(os.sep, '/')
+				entries[relative] = [isDir, getIdentity(stat, isDir), stat.st_size, stat.st_mtime]
+
+		return entries
+
+	# Returns renames and moves made since the stored state, in order of execution
+	#
+	# Paths are relative to the root, sources are adjusted by preceding moves.
+	# Moving a folder covers its contents, contents renamed on top of that get a move of their own
+	#
+	# @type current: dict
+	# @param current: see scan
+	#
+	# @return list<(old path, new path)>
+	def findMoves(self, current):
+		if self.entries is None:
+			return []
+
+		previous = self.entries
+		vanished = [path for path in previous if path not in current]
+		appeared = {}
+		for path in current:
+			if path not in previous and current[path][1] is not None:
+				key = json.dumps(current[path][1])
+				# ambiguous identities are left for upload
+				appeared[key] = None if key in appeared else path
+
+		pairs = []
+		for path in vanished:
+			if previous[path][1] is None:
+				continue
+
+			target = appeared.get(json.dumps(previous[path][1]))
+			if target is None or current[target][0] != previous[path][0]:
+				continue
+
+			if previous[path][0]:
+				if self.__isSameFolder(path, target, current) is False:
+					continue
+			elif current[target][2] != previous[path][2] or current[target][3] != previous[path][3]:
+				# inode of a deleted file reused by a new one
+				continue
+
+			pairs.append((path, target))
+
+		# folders before files, targets' parents before their contents
+		pairs.sort(key=lambda pair: (previous[pair[0]][0] is False, pair[1].count('/'), pair[1]))
+
+		moves = []
+		for path, target in pairs:
+			source = path
+			for old, new in moves:
+				if isInside(source, old):
+					source = new + source[len(old):]
+
+			if source != target:
+				moves.append((source, target))
+
+		return moves
+
+	# Whether a folder's former contents are found at its new location
+	#
+	# @type path: string
+	# @type target: string
+	# @type current: dict
+	#
+	# @return bool
+	def __isSameFolder(self, path, target, current):
+		children = [child for child in self.entries if isInside(child, path) and child != path]
+
+		if len(children) == 0:
+			return True
+
+		for child in children:
+			moved = target + child[len(path):]
+			if moved in current and current[moved][1] == self.entries[child][1]:
+				return True
+
+		return False
+
+	# Stores given state
+	#
+	# @type entries: dict
+	# @param entries: see scan
+	def save(self, entries):
+		self.entries = entries
+
+		folder = os.path.dirname(self.file_path)
+		if os.path.exists(folder) is False:
+			os.makedirs(folder)
+
+		temporary = self.file_path + '.tmp'
+		with open(temporary, 'w') as index:
+			index.write(json.dumps(entries))
+
+		replace(temporary, self.file_path)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import os
+import sys
+import threading
+import time
+
+# FTPSync libraries
+if sys.version < '3':
+	import lib2.simplejson as json
+
+	from ftpsyncfiles import replace
+else:
+	import FTPSync.lib3.simplejson as json
+
+	from FTPSync.ftpsyncfiles import replace
+
+
+# ==== Initialization and optimization =====================================================
+
+# operations that can be journaled
+operations = ['upload', 'delete', 'rename']
+
+
+# ==== Content =============================================================================
+
+# Crash-safe queue of pending remote operations
+#
+# Operations are appended to a file as JSON lines ("add", "update", "done")
+# and flushed to disk before they're executed, so that whatever wasn't
+# finished - because of a crash, restart or lost connection - can be replayed
+#
+# Pending operations are coalesced when added:
+#  - a newer upload of a file replaces the older one
+#  - deleting a file drops pending uploads of it (and of its contents)
+class Journal(object):
+
+	# @type file_path: string
+	# @param file_path: journal file, created when needed
+	def __init__(self, file_path):
+		self.file_path = file_path
+		self.lock = threading.Lock()
+		self.handle = None
+		self.lastId = 0
+		# id => entry, in order of addition
+		self.entries = {}
+		self.order = []
+
+	# Reads pending operations left by a previous session and compacts the file
+	#
+	# @return int number of pending operations
+	def load(self):
+		with self.lock:
+			self._close()
+			self.entries = {}
+			self.order = []
+
+			if os.path.exists(self.file_path):
+				with open(self.file_path, 'r') as journal:
+					for line in journal:
+						self._apply(line)
+
+			self._rewrite()
+
+			return len(self.order)
+
+	def _apply(self, line):
+		try:
+			record = json.loads(line)
+		except ValueError:
+			# unfinished last line after a crash
+			return
+
+		id = record.get('id', 0)
+		self.lastId = max(self.lastId, id)
+
+		if record.get('op') == 'add' and record.get('type') in operations:
+			self.entries[id] = record['entry']
+			self.order.append(id)
+		elif record.get('op') == 'update' and id in self.entries:
+			self.entries[id]['connections'] = record['connections']
+		elif record.get('op') == 'done' and id in self.entries:
+			self.entries.pop(id)
+			self.order.remove(id)
+
+	# Records a new operation
+	#
+	# @type type: string
+	# @param type: see operations
+	# @type file_path: string
+	# @type config_file_path: string
+	# @type connections: list<string>
+	# @param connections: names of connections the operation applies to
+	# @type new_name: string|None
+	# @param new_name: for rename
+	#
+	# @return int id of the operation
+	def add(self, type, file_path, config_file_path, connections, new_name=None):
+		with self.lock:
+			for id in list(self.order):
+				if self._isSuperseded(self.entries[id], type, file_path):
+					self._record({ 'op': 'done', 'id': id })
+					self.entries.pop(id)
+					self.order.remove(id)
+
+			self.lastId += 1
+			entry = {
+				'id': self.lastId,
+				'type': type,
+				'file_path': file_path,
+				'config_file_path': config_file_path,
+				'connections': list(connections),
+				'new_name': new_name,
+				'time': time.time()
+			}
+
+			self._record({ 'op': 'add', 'id': self.lastId, 'type': type, 'entry': entry })
+			self.entries[self.lastId] = entry
+			self.order.append(self.lastId)
+
+			return self.lastId
+
+	def _isSuperseded(self, entry, type, file_path):
+		if entry['type'] != 'upload':
+			return False
+
+		if type == 'upload':
+			return entry['file_path'] == file_path
+
+		if type == 'delete':
+			return entry['file_path'] == file_path or entry['file_path'].startswith(os.path.join(file_path, ''))
+
+		return False
+
+	# Narrows an operation to connections that still need it
+	#
+	# @type id: int
+	# @type connections: list<string>
+	def update(self, id, connections):
+		with self.lock:
+			if id not in self.entries:
+				return
+
+			self.entries[id]['connections'] = list(connections)
+			self._record({ 'op': 'update', 'id': id, 'connections': list(connections) })
+
+	# Marks an operation as finished
+	#
+	# @type id: int
+	def complete(self, id):
+		with self.lock:
+			if id not in self.entries:
+				return
+
+			self.entries.pop(id)
+			self.order.remove(id)
+
+			# nothing pending, start over with an empty file
+			if len(self.order) == 0:
+				self._close()
+				self._rewrite()
+			else:
+				self._record({ 'op': 'done', 'id': id })
+
+	# Whether the operation is still pending
+	#
+	# @type id: int
+	#
+	# @return bool
+	def isPending(self, id):
+		with self.lock:
+			return id in self.entries
+
+	# Returns pending operations in order they were added
+	#
+	# @return list<dict>
+	def getPending(self):
+		with self.lock:
+			return [dict(self.entries[id]) for id in self.order]
+
+	# Closes the journal file
+	def close(self):
+		with self.lock:
+			self._close()
+
+	def _close(self):
+		if self.handle is not None:
+			try:
+				self.handle.close()
+			except (IOError, OSError):
+				pass
+
+			self.handle = None
+
+	def _record(self, record):
+		if self.handle is None:
+			directory = os.path.dirname(self.file_path)
+			if directory and os.path.exists(directory) is False:
+				os.makedirs(directory)
+
+			self.handle = open(self.file_path, 'a')
+
+		self.handle.write(json.dumps(record) + "\n")
+		self.handle.flush()
+		os.fsync(self.handle.fileno())
+
+	# Writes only pending operations
+	def _rewrite(self):
+		directory = os.path.dirname(self.file_path)
+		if directory and os.path.exists(directory) is False:
+			os.makedirs(directory)
+
+		temporary = self.file_path + '.tmp'
+		with open(temporary, 'w') as journal:
+			for id in self.order:
+				entry = self.entries[id]
+				journal.write(json.dumps({ 'op': 'add', 'id': id, 'type': entry['type'], 'entry': entry }) + "\n")
+
+			journal.flush()
+			os.fsync(journal.fileno())
+
+		replace(temporary, self.file_path)
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Doc comment syntax inspired by http://stackoverflow.com/a/487203/387503
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import os
+import sys
+import threading
+import time
+
+# FTPSync libraries
+if sys.version < '3':
+	import lib2.simplejson as json
+else:
+	import FTPSync.lib3.simplejson as json
+
+
+# ==== Initialization and optimization =====================================================
+
+# number of most recent samples kept per histogram for percentiles
+histogramSamples = 1024
+
+# scope of metrics not bound to a connection
+globalScope = 'global'
+
+
+# ==== Content =============================================================================
+
+# Distribution of observed values (durations in seconds, usually)
+class Histogram(object):
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0.0
+		self.min = None
+		self.max = None
+		self.samples = []
+
+	# Records a value
+	#
+	# @type value: float
+	def observe(self, value):
+		self.count += 1
+		self.total += value
+
+		if self.min is None or value < self.min:
+			self.min = value
+		if self.max is None or value > self.max:
+			self.max = value
+
+		self.samples.append(value)
+		if len(self.samples) > histogramSamples:
+			self.samples.pop(0)
+
+	# Returns average of all observed values
+	#
+	# @return float|None
+	def getAverage(self):
+		if self.count == 0:
+			return None
+
+		return self.total / self.count
+
+	# Returns percentile of recent values
+	#
+	# @type percent: int
+	# @param percent: 0 - 100
+	#
+	# @return float|None
+	def getPercentile(self, percent):
+		if len(self.samples) == 0:
+			return None
+
+		ordered = sorted(self.samples)
+		index = int(round((len(ordered) - 1) * percent / 100.0))
+
+		return ordered[index]
+
+	# @return dict
+	def toDict(self):
+		return {
+			'count': self.count,
+			'total': self.total,
+			'min': self.min,
+			'max': self.max,
+			'avg': self.getAverage(),
+			'p50': self.getPercentile(50),
+			'p95': self.getPercentile(95)
+		}
+
+
+# Measures duration of a block and records it into a histogram
+class Stopwatch(object):
+
+	def __init__(self, metrics, scope, name):
+		self.metrics = metrics
+		self.scope = scope
+		self.name = name
+		self.started = None
+
+	def __enter__(self):
+		self.started = time.time()
+		return self
+
+	def __exit__(self, type, value, traceback):
+		self.metrics.observe(self.scope, self.name, time.time() - self.started)
+		return False
+
+
+# In-process registry of counters and histograms, grouped by scope (usually connection)
+class Metrics(object):
+
+	_instance = None
+
+	@staticmethod
+	def instance():
+		if Metrics._instance is None:
+			Metrics._instance = Metrics()
+
+		return Metrics._instance
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.reset()
+
+	# Drops all recorded values
+	def reset(self):
+		with self.lock:
+			self.started = time.time()
+			self.counters = {}
+			self.histograms = {}
+
+	# Increments a counter
+	#
+	# @type scope: string
+	# @type name: string
+	# @type by: int|float
+	def increment(self, scope, name, by=1):
+		with self.lock:
+			if scope not in self.counters:
+				self.counters[scope] = {}
+
+			self.counters[scope][name] = self.counters[scope].get(name, 0) + by
+
+	# Records a value into a histogram
+	#
+	# @type scope: string
+	# @type name: string
+	# @type value: float
+	def observe(self, scope, name, value):
+		with self.lock:
+			if scope not in self.histograms:
+				self.histograms[scope] = {}
+
+			if name not in self.histograms[scope]:
+				self.histograms[scope][name] = Histogram()
+
+			self.histograms[scope][name].observe(value)
+
+	# Returns a context manager recording duration of the block
+	#
+	# @type scope: string
+	# @type name: string
+	#
+	# @return Stopwatch
+	def measure(self, scope, name):
+		return Stopwatch(self, scope, name)
+
+	# Returns a counter value
+	#
+	# @return int|float
+	def getCounter(self, scope, name):
+		with self.lock:
+			return self.counters.get(scope, {}).get(name, 0)
+
+	# Returns a histogram or None
+	#
+	# @return Histogram|None
+	def getHistogram(self, scope, name):
+		with self.lock:
+			return self.histograms.get(scope, {}).get(name)
+
+	# Returns all scopes with any recorded metric
+	#
+	# @return list<string>
+	def getScopes(self):
+		with self.lock:
+			return sorted(set(list(self.counters.keys()) + list(self.histograms.keys())))
+
+	# Returns all recorded values as plain dict
+	#
+	# @return dict
+	def snapshot(self):
+		with self.lock:
+			result = {
+				'time': time.time(),
+				'started': self.started,
+				'scopes': {}
+			}
+
+			for scope in set(list(self.counters.keys()) + list(self.histograms.keys())):
+				result['scopes'][scope] = {
+					'counters': dict(self.counters.get(scope, {})),
+					'histograms': {}
+				}
+
+				for name, histogram in self.histograms.get(scope, {}).items():
+					result['scopes'][scope]['histograms'][name] = histogram.toDict()
+
+			return result
+
+	# Appends a snapshot as a single JSON line to a file
+	#
+	# @type file_path: string
+	def export(self, file_path):
+		line = json.dumps(self.snapshot(), sort_keys=True)
+
+		directory = os.path.dirname(file_path)
+		if directory and os.path.exists(directory) is False:
+			os.makedirs(directory)
+
+		with open(file_path, 'a') as exported:
+			exported.write(line + "\n")
+
+	# Returns human readable summary, one list of lines per scope
+	#
+	# @return list<list<string>>
+	def getSummary(self):
+		summary = []
+
+		for scope in self.getScopes():
+			lines = [scope]
+
+			counters = {}
+			with self.lock:
+				counters = dict(self.counters.get(scope, {}))
+
+			for name in sorted(counters.keys()):
+				value = counters[name]
+				if name.startswith('bytes'):
+					value = formatBytes(value)
+
+				lines.append(name + ": " + str(value))
+
+			for hitName in sorted(counters.keys()):
+				if hitName.endswith('_hit'):
+					base = hitName[:-4]
+					total = counters[hitName] + counters.get(base + '_miss', 0)
+					lines.append(base + " hit rate: " + str(int(round(100.0 * counters[hitName] / total))) + " %")
+
+			for name in sorted(self.histograms.get(scope, {}).keys()):
+				histogram = self.getHistogram(scope, name)
+				lines.append(name + ": " + str(histogram.count) + "x, avg " + formatDuration(histogram.getAverage()) + ", p95 " + formatDuration(histogram.getPercentile(95)) + ", max " + formatDuration(histogram.max))
+
+			summary.append(lines)
+
+		return summary
+
+
+# Formats bytes for humans
+#
+# @type size: int
+#
+# @return string
+def formatBytes(size):
+	if size < 1024:
+		return str(size) + " B"
+
+	if size < 1024 * 1024:
+		return str(round(size / 1024.0, 2)) + " kB"
+
+	if size < 1024 * 1024 * 1024:
+		return str(round(size / 1024.0 / 1024, 2)) + " MB"
+
+	return str(round(size / 1024.0 / 1024 / 1024, 2)) + " GB"
+
+
+# Formats duration for humans
+#
+# @type seconds: float|None
+#
+# @return string
+def formatDuration(seconds):
+	if seconds is None:
+		return "-"
+
+	return str(round(seconds * 1000, 1)) + " ms"
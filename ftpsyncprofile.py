@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import gc
+import os
+import tempfile
+import threading
+import time
+
+# profilers are not available in every embedded Python
+try:
+	import cProfile
+except ImportError:
+	cProfile = None
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+
+# ==== Initialization and optimization =====================================================
+
+# default folder for profiles and memory reports
+profileFolder = os.path.join(tempfile.gettempdir(), 'FTPSync-profile')
+
+# minimal interval [s] between memory snapshots
+memorySnapshotInterval = 60
+
+# number of allocation sites listed in a memory report
+memoryReportLines = 25
+
+
+# ==== Content =============================================================================
+
+# Returns number of live objects of a class with given name
+#
+# @type className: string
+#
+# @return int
+def countInstances(className):
+	count = 0
+	for item in gc.get_objects():
+		if type(item).__name__ == className:
+			count += 1
+
+	return count
+
+
+# Opt-in cProfile and tracemalloc hooks for commands
+#
+# Each outermost profiled call (per thread) is written into its own .prof file,
+# calls nested in the same thread are part of the outer profile. Since Python 3.12
+# only one cProfile can be active in a process, commands running meanwhile
+# in other threads are not profiled.
+class Profiler(object):
+
+	_instance = None
+
+	@staticmethod
+	def instance():
+		if Profiler._instance is None:
+			Profiler._instance = Profiler()
+
+		return Profiler._instance
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.local = threading.local()
+		self.enabled = False
+		self.memory = False
+		self.folder = profileFolder
+		self.counter = 0
+		# whether a cProfile is running in any thread
+		self.profiling = False
+		self.lastSnapshot = 0
+		self.baseline = None
+		# label => callback returning a size
+		self.watched = {}
+
+	# Enables or disables profiling
+	#
+	# @type enabled: bool
+	# @param enabled: write cProfile .prof file per command
+	# @type memory: bool
+	# @param memory: write periodical tracemalloc reports
+	# @type folder: string|None
+	# @param folder: where to write, None = system temp folder
+	def configure(self, enabled, memory=False, folder=None):
+		with self.lock:
+			self.enabled = bool(enabled) and cProfile is not None
+			self.folder = folder or profileFolder
+
+			memory = bool(memory) and tracemalloc is not None
+			if memory and self.memory is False:
+				tracemalloc.start()
+				self.baseline = self._takeSnapshot()
+				self.lastSnapshot = time.time()
+			elif memory is False and self.memory:
+				tracemalloc.stop()
+				self.baseline = None
+
+			self.memory = memory
+
+	# Whether any profiling is active
+	#
+	# @return bool
+	def isEnabled(self):
+		return self.enabled or self.memory
+
+	# Registers a size reported in memory reports
+	#
+	# @type label: string
+	# @type callback: callback() returning int
+	def watch(self, label, callback):
+		self.watched[label] = callback
+
+	# Returns a replacement of a method running it under profiler
+	#
+	# Meant to be assigned to the instance, removes itself after the first call
+	# so that the reference cycle doesn't outlive the command
+	#
+	# @type instance: object
+	# @type methodName: string
+	#
+	# @return callable
+	def wrap(self, instance, methodName):
+		method = getattr(type(instance), methodName)
+		name = type(instance).__name__
+
+		def profiled(*args, **kwargs):
+			instance.__dict__.pop(methodName, None)
+			return self.run(name, method, instance, *args, **kwargs)
+
+		return profiled
+
+	# Runs a callable, profiled if it's the outermost one in the thread
+	#
+	# @type name: string
+	# @type callback: callable
+	#
+	# @return mixed whatever callback returns
+	def run(self, name, callback, *args, **kwargs):
+		if self.isEnabled() is False or getattr(self.local, 'active', False):
+			return callback(*args, **kwargs)
+
+		self.local.active = True
+		profile = self._startProfile()
+		started = time.time()
+
+		try:
+			return callback(*args, **kwargs)
+		finally:
+			self.local.active = False
+
+			if profile is not None:
+				profile.disable()
+
+				with self.lock:
+					self.profiling = False
+
+			try:
+				if profile is not None:
+					profile.dump_stats(self._getFilePath(name, started, 'prof'))
+
+				if self.memory:
+					self.snapshot()
+			except (IOError, OSError) as e:
+				print ("FTPSync > Failed to write profile [Exception: " + str(e) + "]")
+
+	# Starts a cProfile unless one is already running
+	#
+	# @return cProfile.Profile|None
+	def _startProfile(self):
+		with self.lock:
+			if self.enabled is False or self.profiling:
+				return None
+
+			self.profiling = True
+
+		profile = cProfile.Profile()
+
+		try:
+			profile.enable()
+		except ValueError:
+			# another profiling tool, e.g. a debugger
+			with self.lock:
+				self.profiling = False
+
+			return None
+
+		return profile
+
+	# Writes a memory report comparing with the state when enabled
+	#
+	# @type forced: bool
+	# @param forced: ignore memorySnapshotInterval
+	#
+	# @return string|None path of the report
+	def snapshot(self, forced=False):
+		with self.lock:
+			if self.memory is False:
+				return None
+
+			if forced is False and time.time() - self.lastSnapshot < memorySnapshotInterval:
+				return None
+
+			self.lastSnapshot = time.time()
+			baseline = self.baseline
+
+		current = self._takeSnapshot()
+		size, peak = tracemalloc.get_traced_memory()
+
+		lines = []
+		lines.append("traced: " + str(size) + " B, peak: " + str(peak) + " B")
+
+		for label in sorted(self.watched.keys()):
+			try:
+				lines.append(label + ": " + str(self.watched[label]()))
+			except Exception as e:
+				lines.append(label + ": failed [" + str(e) + "]")
+
+		lines.append("")
+		lines.append("growth since enabled:")
+		for stat in current.compare_to(baseline, 'lineno')[:memoryReportLines]:
+			lines.append(str(stat))
+
+		file_path = self._getFilePath('memory', self.lastSnapshot, 'txt')
+		with open(file_path, 'w') as report:
+			report.write("\n".join(lines) + "\n")
+
+		return file_path
+
+	# Takes a snapshot without allocations of the profilers themselves
+	def _takeSnapshot(self):
+		ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+		if cProfile is not None:
+			ignored.append(tracemalloc.Filter(False, cProfile.__file__))
+
+		return tracemalloc.take_snapshot().filter_traces(ignored)
+
+	def _getFilePath(self, name, started, extension):
+		with self.lock:
+			if os.path.exists(self.folder) is False:
+				os.makedirs(self.folder)
+
+			self.counter += 1
+			counter = self.counter
+
+		stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(started))
+		return os.path.join(self.folder, stamp + "-" + str(os.getpid()) + "-" + str(counter) + "-" + name + "." + extension)
@@ -31,25 +31,62 @@
 
 # Python's built-in libraries
 import math
+import threading
+import time
+
+
+# ==== Initialization and optimization =====================================================
+
+# minimal interval [s] between transfer rate samples
+rateSampleInterval = 0.5
+
+# weight of the newest sample in the smoothed transfer rate
+rateSmoothing = 0.3
 
 
 # ==== Content =============================================================================
 
 # Class implementing logic for progress bar
+#
+# Tracks both finished entries and transferred bytes, when sizes are known
+# the percentage is computed from bytes so that one large file weighs accordingly
 class Progress:
     def __init__(self, current=0):
         self.current = 0
-        self.entries = []
+        self.entries = set()
+        self.totalBytes = 0
+        self.transferredBytes = 0
+        self.rate = None
+        self.sampleTime = time.time()
+        self.sampleBytes = 0
+        self.lock = threading.Lock()
 
     # Add unfinished entries to progress bar
     #
     # @type  self: Progress
     # @type  entries: list
     # @param entries: list of unfinished entries, usually strings
-    def add(self, entries):
-        for entry in entries:
-            if entry not in self.entries:
-                self.entries.append(entry)
+    # @type  sizes: list|None
+    # @param sizes: sizes of the entries in bytes (items may be None if unknown)
+    def add(self, entries, sizes=None):
+        with self.lock:
+            for index, entry in enumerate(entries):
+                if entry in self.entries:
+                    continue
+
+                self.entries.add(entry)
+
+                if sizes is not None and sizes[index] is not None:
+                    self.totalBytes += int(sizes[index])
+
+
+    # Adds bytes expected to be transferred, eg. same file sent to multiple servers
+    #
+    # @type  self: Progress
+    # @type  size: integer
+    def addBytes(self, size):
+        with self.lock:
+            self.totalBytes += int(size)
 
 
     # Return number of items in the progress
@@ -67,10 +104,59 @@ class Progress:
     # @type  by: integer
     # @param by: number of finished items
     def progress(self, by=1):
-        self.current += int(by)
+        with self.lock:
+            self.current += int(by)
+
+            if self.current > self.getTotal():
+                self.current = self.getTotal()
+
+
+    # Records transferred bytes, to be called from transfer block callbacks
+    #
+    # @type  self: Progress
+    # @type  size: integer
+    # @param size: bytes transferred since the last call
+    def transferred(self, size):
+        with self.lock:
+            self.transferredBytes += int(size)
+
+            now = time.time()
+            elapsed = now - self.sampleTime
+            if elapsed >= rateSampleInterval:
+                sample = (self.transferredBytes - self.sampleBytes) / elapsed
+
+                if self.rate is None:
+                    self.rate = sample
+                else:
+                    self.rate = rateSmoothing * sample + (1 - rateSmoothing) * self.rate
+
+                self.sampleTime = now
+                self.sampleBytes = self.transferredBytes
+
+
+    # Returns smoothed transfer rate
+    #
+    # @type  self: Progress
+    #
+    # @return float bytes per second or None if not yet known
+    def getRate(self):
+        return self.rate
 
-        if self.current > self.getTotal():
-            self.current = self.getTotal()
+
+    # Returns estimated time to finish
+    #
+    # @type  self: Progress
+    #
+    # @return float seconds or None if not known
+    def getRemainingTime(self):
+        if not self.rate or self.totalBytes == 0:
+            return None
+
+        remaining = self.totalBytes - self.transferredBytes
+        if remaining < 0:
+            remaining = 0
+
+        return remaining / self.rate
 
 
     # Returns whether the process has been finished
@@ -90,16 +176,87 @@ class Progress:
     #
     # @return integer between 0 and 100 / division
     def getPercent(self, division=5):
-        if division is 0:
+        if division == 0:
             division = 1
 
-        total = self.getTotal()
-        if total is 0:
-            total = self.current
-        if total is 0:
-            total = 1
+        if self.totalBytes > 0 and self.isFinished() is False:
+            ratio = min(float(self.transferredBytes) / float(self.totalBytes), 1.0)
+        else:
+            total = self.getTotal()
+            if total == 0:
+                total = self.current
+            if total == 0:
+                total = 1
 
-        percent = int(math.ceil(float(self.current) / float(total) * 100))
+            ratio = float(self.current) / float(total)
+
+        percent = int(math.ceil(ratio * 100))
         percent = math.ceil(percent / division)
 
-        return percent
\ No newline at end of file
+        return percent
+
+
+# Coalesces status updates from transfer threads into repaints at a bounded rate
+#
+# Updates are only stored, a single repaint is scheduled per interval no matter
+# how many blocks got transferred in the meantime
+class ProgressReporter:
+
+    # @type  self: ProgressReporter
+    # @type  schedule: callback(callback, delay)
+    # @param schedule: schedules a callback on the UI thread after delay [ms]
+    # @type  show: callback(text)
+    # @param show: displays the message
+    # @type  interval: integer
+    # @param interval: minimal delay between repaints [ms]
+    def __init__(self, schedule, show, interval=100):
+        self.schedule = schedule
+        self.show = show
+        self.interval = interval
+        self.messages = {}
+        self.order = []
+        self.pending = False
+        self.lock = threading.Lock()
+
+
+    # Stores the newest message for a transfer and schedules a repaint if none is pending
+    #
+    # @type  self: ProgressReporter
+    # @type  key: mixed
+    # @param key: identification of the transfer or batch
+    # @type  message: string|callback
+    # @param message: message or a callback returning it, evaluated at repaint
+    def update(self, key, message):
+        with self.lock:
+            if key not in self.messages:
+                self.order.append(key)
+
+            self.messages[key] = message
+
+            if self.pending:
+                return
+
+            self.pending = True
+
+        self.schedule(self._repaint, self.interval)
+
+
+    # Shows all messages updated since the last repaint
+    #
+    # @type  self: ProgressReporter
+    def _repaint(self):
+        with self.lock:
+            messages = [self.messages[key] for key in self.order]
+            self.messages = {}
+            self.order = []
+            self.pending = False
+
+        texts = []
+        for message in messages:
+            if callable(message):
+                message = message()
+
+            texts.append(message)
+
+        if len(texts) > 0:
+            self.show(" | ".join(texts))
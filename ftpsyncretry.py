@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# Doc comment syntax inspired by http://stackoverflow.com/a/487203/387503
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import random
+import socket
+import sys
+import threading
+import time
+
+# FTPSync libraries
+if sys.version < '3':
+	from ftpsyncexceptions import HostUnavailableException
+else:
+	from FTPSync.ftpsyncexceptions import HostUnavailableException
+
+
+# ==== Initialization and optimization =====================================================
+
+# replies worth repeating on the same connection: can't open data connection,
+# transfer aborted, local error (450 is left out, servers use it for missing files too)
+transientCodes = ['425', '426', '451']
+
+# reply 421 - service not available, the server is closing the connection
+closingCode = '421'
+
+# messages of errors meaning the connection or the host is gone
+connectionMessages = ['connection refused', 'connection reset', 'connection aborted', 'network is unreachable', 'no route to host', 'broken pipe']
+
+# consecutive failures after which a host is considered down
+breakerThreshold = 3
+
+# [s] how long a down host is not contacted, doubles with every failed probe
+breakerCooldown = 10
+
+# [s] limit of the cooldown
+breakerCooldownMax = 300
+
+
+# ==== Content =============================================================================
+
+# Sorts an exception into one of:
+#  'transient' - worth repeating on the same connection (timeouts, 4xx replies)
+#  'connection' - the connection or host is gone, repeating on it won't help
+#  'fatal' - the server answered, e.g. with 5xx, or a local problem
+#
+# @type exception: Exception
+#
+# @return string
+def classifyError(exception):
+	if isinstance(exception, HostUnavailableException):
+		return 'connection'
+
+	message = str(exception)
+	lowered = message.lower()
+
+	if isinstance(exception, socket.timeout) or (sys.version >= '3' and type(exception) is TimeoutError) or lowered.find('imeout') != -1 or lowered.find('imed out') != -1:
+		return 'transient'
+
+	if type(exception).__name__ == 'error_temp':
+		if message[0:3] == closingCode:
+			return 'connection'
+		elif message[0:3] in transientCodes:
+			return 'transient'
+
+	if isinstance(exception, EOFError) or type(exception).__name__ == 'ConnectionClosedException':
+		return 'connection'
+
+	for part in connectionMessages:
+		if lowered.find(part) != -1:
+			return 'connection'
+
+	if isinstance(exception, socket.gaierror):
+		return 'connection'
+
+	# on Python 3 socket.error is any OSError, local ones included
+	if sys.version >= '3':
+		if isinstance(exception, ConnectionError):
+			return 'connection'
+	elif isinstance(exception, socket.error) and type(exception).__name__ not in ['SSLError', 'CertificateError']:
+		return 'connection'
+
+	return 'fatal'
+
+
+# Returns delay before a repeated attempt, exponential with jitter so that
+# threads failing together don't retry together
+#
+# @type attempt: int
+# @param attempt: 0 for the first retry
+# @type base: float
+# @param base: [s]
+# @type maximum: float
+# @param maximum: [s]
+#
+# @return float
+def backoffDelay(attempt, base, maximum):
+	delay = min(float(maximum), float(base) * (2 ** attempt))
+
+	return delay / 2 + random.uniform(0, delay / 2)
+
+
+# Remembers whether a host is reachable so that commands fail fast while it's down
+#
+# closed - commands pass, opens after threshold consecutive failures
+# open - commands are rejected until the cooldown passes
+# half-open - a single command probes the host, closes on success, opens on failure
+class CircuitBreaker(object):
+
+	def __init__(self, threshold=None, cooldown=None, cooldownMax=None):
+		self.lock = threading.Lock()
+		self.threshold = int(threshold or breakerThreshold)
+		self.cooldownMin = float(cooldown or breakerCooldown)
+		self.cooldownMax = float(cooldownMax or breakerCooldownMax)
+		self.cooldown = self.cooldownMin
+		self.failures = 0
+		self.openedUntil = None
+		self.probing = False
+
+	# Whether a command may be sent, raises otherwise
+	#
+	# @type host: string
+	# @param host: for the message
+	#
+	# @throws HostUnavailableException
+	def check(self, host):
+		with self.lock:
+			if self.openedUntil is None:
+				return
+
+			if self.probing is False and time.time() >= self.openedUntil:
+				self.probing = True
+				return
+
+			retryIn = max(0, int(self.openedUntil - time.time()))
+
+		raise HostUnavailableException("Host " + str(host) + " is unavailable, next attempt in " + str(retryIn) + "s")
+
+	# Whether commands are currently rejected
+	#
+	# @return bool
+	def isOpen(self):
+		with self.lock:
+			return self.openedUntil is not None
+
+	# Records a command that reached the server
+	def success(self):
+		with self.lock:
+			self.failures = 0
+			self.openedUntil = None
+			self.probing = False
+			self.cooldown = self.cooldownMin
+
+	# Records a failure to reach the server
+	#
+	# @return bool whether this failure opened the breaker
+	def failure(self):
+		with self.lock:
+			self.failures += 1
+
+			if self.probing:
+				self.probing = False
+				self.cooldown = min(self.cooldownMax, self.cooldown * 2)
+				self.openedUntil = time.time() + self.cooldown
+				return False
+
+			if self.openedUntil is None and self.failures >= self.threshold:
+				self.openedUntil = time.time() + self.cooldown
+				return True
+
+			return False
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2012 Jiri "NoxArt" Petruzelka
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# @author Jiri "NoxArt" Petruzelka | petruzelka@noxart.cz | @NoxArt
+# @copyright (c) 2012 Jiri "NoxArt" Petruzelka
+# @link https://github.com/NoxArt/SublimeText2-FTPSync
+
+# ==== Libraries ===========================================================================
+
+# Python's built-in libraries
+import os
+import sys
+import threading
+import time
+
+# FTPSync libraries
+if sys.version < '3':
+	import lib2.simplejson as json
+else:
+	import FTPSync.lib3.simplejson as json
+
+
+# ==== Initialization and optimization =====================================================
+
+# default size limit of a trace file before it gets rotated [bytes]
+traceMaxSize = 5 * 1024 * 1024
+
+# number of rotated trace files kept (file.1, file.2, ...)
+traceBackups = 2
+
+
+# ==== Content =============================================================================
+
+# Splits an FTP command call into a span name and its target path
+#
+# Raw commands like voidcmd("CWD /x") or storbinary("STOR /x", ...) are named
+# by the protocol verb, calls like cwd("/x") by the method name
+#
+# @type command: string
+# @param command: ftplib method name
+# @type args: list
+#
+# @return tuple(name:string, path:string|None)
+def describeCommand(command, args):
+	if len(args) == 0 or type(args[0]) not in (str, type(u'')):
+		return (command, None)
+
+	first = args[0]
+	verb = first.split(" ", 1)
+	if command in ('voidcmd', 'sendcmd', 'storbinary', 'storlines', 'retrbinary', 'retrlines', 'ntransfercmd', 'transfercmd'):
+		if len(verb) > 1:
+			return (verb[0].upper(), verb[1])
+
+		return (verb[0].upper(), None)
+
+	return (command, first)
+
+
+# Opt-in writer of timed spans in Chrome trace-event format
+#
+# The file starts with "[" and has one complete ("ph": "X") event per line
+# which chrome://tracing and Perfetto accept without a closing bracket
+class Tracer(object):
+
+	_instance = None
+
+	@staticmethod
+	def instance():
+		if Tracer._instance is None:
+			Tracer._instance = Tracer()
+
+		return Tracer._instance
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.file_path = None
+		self.maxSize = traceMaxSize
+		self.handle = None
+		self.pid = os.getpid()
+
+	# Enables tracing into the given file, None disables it
+	#
+	# @type file_path: string|None
+	# @type maxSize: int|None
+	# @param maxSize: file size [bytes] after which the file gets rotated
+	def configure(self, file_path, maxSize=None):
+		with self.lock:
+			self._close()
+			self.file_path = file_path
+
+			if maxSize is not None:
+				self.maxSize = int(maxSize)
+
+	# Whether spans are being recorded
+	#
+	# @return bool
+	def isEnabled(self):
+		return self.file_path is not None
+
+	# Returns current timestamp usable as span start
+	#
+	# @return float
+	def now(self):
+		return time.time()
+
+	# Writes a finished span
+	#
+	# @type name: string
+	# @type category: string
+	# @param category: groups spans, usually connection name
+	# @type started: float
+	# @param started: see now()
+	# @type finished: float
+	# @type args: dict
+	# @param args: arbitrary details displayed with the span
+	def record(self, name, category, started, finished, args=None):
+		if self.file_path is None:
+			return
+
+		event = {
+			'name': name,
+			'cat': category,
+			'ph': 'X',
+			'ts': int(started * 1000000),
+			'dur': int(max(0, finished - started) * 1000000),
+			'pid': self.pid,
+			'tid': threading.current_thread().ident,
+			'args': args or {}
+		}
+
+		line = json.dumps(event, sort_keys=True) + ",\n"
+
+		with self.lock:
+			try:
+				self._write(line)
+			except (IOError, OSError) as e:
+				print ("FTPSync > Failed to write trace, disabling [Exception: " + str(e) + "]")
+				self._close()
+				self.file_path = None
+
+	# Closes the trace file
+	def close(self):
+		with self.lock:
+			self._close()
+
+	def _close(self):
+		if self.handle is not None:
+			try:
+				self.handle.close()
+			except (IOError, OSError):
+				pass
+
+			self.handle = None
+
+	def _open(self):
+		directory = os.path.dirname(self.file_path)
+		if directory and os.path.exists(directory) is False:
+			os.makedirs(directory)
+
+		isNew = os.path.exists(self.file_path) is False or os.path.getsize(self.file_path) == 0
+		self.handle = open(self.file_path, 'a')
+
+		if isNew:
+			self.handle.write("[\n")
+
+	def _rotate(self):
+		self._close()
+
+		for index in range(traceBackups, 0, -1):
+			source = self.file_path
+			if index > 1:
+				source = self.file_path + "." + str(index - 1)
+
+			target = self.file_path + "." + str(index)
+			if os.path.exists(source):
+				if os.path.exists(target):
+					os.remove(target)
+				os.rename(source, target)
+
+	def _write(self, line):
+		if self.handle is None:
+			self._open()
+
+		if self.maxSize > 0 and self.handle.tell() + len(line) > self.maxSize:
+			self._rotate()
+			self._open()
+
+		self.handle.write(line)
+		self.handle.flush()
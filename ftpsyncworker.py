@@ -32,13 +32,18 @@
 # Python's built-in libraries
 import threading
 import sys
+import time
 from time import sleep
 
 # FTPSync libraries
 if sys.version < '3':
 	from ftpsynccommon import Types
+	from ftpsyncmetrics import Metrics, globalScope
+	from ftpsyncprofile import Profiler
 else:
 	from FTPSync.ftpsynccommon import Types
+	from FTPSync.ftpsyncmetrics import Metrics, globalScope
+	from FTPSync.ftpsyncprofile import Profiler
 
 # ==== Content =============================================================================
 
@@ -49,6 +54,7 @@ class RunningCommand(threading.Thread):
 		self.onFinish = onFinish
 		self.debug = bool(debug)
 		self.id = int(tid)
+		self.started = False
 		threading.Thread.__init__(self)
 
 	# Prints debug message if enabled
@@ -56,16 +62,28 @@ class RunningCommand(threading.Thread):
 		if self.debug:
 			print( "[command {0}]".format(self.id) + message )
 
-	# Runs command
+	# Runs command, profiled if enabled
 	def run(self):
+		try:
+			Profiler.instance().run(self.command.__class__.__name__, self._execute)
+		except Exception as e:
+			# the command has to run and finish even when profiling fails
+			if self.started:
+				raise
+
+			self._debugPrint("Profiling failed: " + str(e))
+			self._execute()
+
+	def _execute(self):
+		self.started = True
+
 		try:
 			self._debugPrint("Executing")
 			self.command.execute()
 		except Exception as e:
+			# transient errors were already retried by the connection, others would fail again
 			self._debugPrint(e)
-			self._debugPrint("Retrying")
-
-			self.command.execute()
+			raise
 		finally:
 			self._debugPrint("Ending")
 			while self.command.isRunning():
@@ -92,6 +110,12 @@ class Worker(object):
 		self.makeConnection = factory
 		self.makeConfig = loader
 		self.freeConnections = []
+		# id(command) => time it was queued
+		self.waitingSince = {}
+		self.metrics = Metrics.instance()
+		# callbacks remembering how many connections a server accepts
+		self.loadConnectionLimit = None
+		self.storeConnectionLimit = None
 
 		self.debug = False
 
@@ -112,13 +136,29 @@ class Worker(object):
 	def setConnectionFactory(self, factory):
 		self.makeConnection = factory
 
+	# Sets callbacks loading and storing how many connections a server accepts
+	#
+	# @type load: callback(config): int|None
+	# @type store: callback(config, int)
+	def setConnectionLimitStore(self, load, store):
+		self.loadConnectionLimit = load
+		self.storeConnectionLimit = store
+
+	# Returns learned limit of connections, None = not known
+	def __learnedLimit(self, config):
+		if self.loadConnectionLimit is None:
+			return None
+
+		return self.loadConnectionLimit(config)
+
 	# Adds a new connection to pool
 	def addConnection(self, connections):
 		self.connections.append(connections)
 
 	# Creates and adds a connection if limit allows
 	def fillConnection(self, config):
-		if len(self.connections) <= self.limit:
+		learned = self.__learnedLimit(config)
+		if len(self.connections) <= self.limit and (learned is None or len(self.connections) < learned):
 			connection = None
 
 			try:
@@ -126,6 +166,8 @@ class Worker(object):
 			except Exception as e:
 				if str(e).lower().find('too many connections') != -1:
 					self._debugPrint("FTPSync > Too many connections...")
+					if self.storeConnectionLimit is not None and len(self.connections) > 0:
+						self.storeConnectionLimit(config, len(self.connections))
 					sleep(1.5)
 				else:
 					self._debugPrint(e)
@@ -153,6 +195,7 @@ class Worker(object):
 
 	# Put the command to sleep
 	def __waitCommand(self, command):
+		self.waitingSince[id(command)] = time.time()
 		self.waitingCommands.append(command)
 
 	# Run the command
@@ -169,6 +212,11 @@ class Worker(object):
 			index = self.freeConnections.pop()
 			thread = RunningCommand(command, self.__onFinish, self.debug, self.threadId)
 
+			self.metrics.increment(globalScope, 'worker_commands')
+			queued = self.waitingSince.pop(id(command), None)
+			if queued is not None:
+				self.metrics.observe(globalScope, 'queue_wait', time.time() - queued)
+
 			self._debugPrint("FTPSync > Scheduling thread #{0}".format(self.threadId) + " " + self.__commandName(command) + " run, using connection {0}".format(index))
 
 			command.setConnection(self.connections[index - 1])
@@ -31,11 +31,13 @@
 
 # Python's built-in libraries
 import datetime
+import hashlib
 import locale
 import os
 import re
 import sys
 import time
+import zlib
 
 # import FTP library
 if sys.version < '3':
@@ -69,15 +71,23 @@ except ImportError:
 
 # FTPSync libraries
 if sys.version < '3':
+    from ftpsynccapabilities import Capabilities, getCapabilityKey
     from ftpsynccommon import Runtime, Types
     from ftpsyncfiles import Metafile, isTextFile, viaTempfile, relpath
+    from ftpsyncmetrics import Metrics
+    from ftpsynctrace import Tracer, describeCommand
     # exceptions
-    from ftpsyncexceptions import FileNotFoundException
+    from ftpsyncexceptions import FileNotFoundException, TransferCancelledException, HostUnavailableException
+    from ftpsyncretry import CircuitBreaker, classifyError, backoffDelay
 else:
+    from FTPSync.ftpsynccapabilities import Capabilities, getCapabilityKey
     from FTPSync.ftpsynccommon import Runtime, Types
     from FTPSync.ftpsyncfiles import Metafile, isTextFile, viaTempfile, relpath
+    from FTPSync.ftpsyncmetrics import Metrics
+    from FTPSync.ftpsynctrace import Tracer, describeCommand
     # exceptions
-    from FTPSync.ftpsyncexceptions import FileNotFoundException
+    from FTPSync.ftpsyncexceptions import FileNotFoundException, TransferCancelledException, HostUnavailableException
+    from FTPSync.ftpsyncretry import CircuitBreaker, classifyError, backoffDelay
 
 
 # ==== Initialization and optimization =====================================================
@@ -85,8 +95,13 @@ else:
 # storXX block size
 transferBlocksize = 8192
 
+# re.L is not allowed with str patterns since Python 3.6
+listParseFlags = re.M | re.I | re.U
+if sys.version < '3':
+    listParseFlags |= re.L
+
 # to extract data from FTP LIST http://stackoverflow.com/questions/2443007/ftp-list-format
-re_ftpListParse = re.compile("^([d-])([rxws-]{9})\s+\d+\s+\S+\s+\S+\s+(\d+)\s+(\w{1,3}\s+\d+\s+(?:\d+:\d+|\d{2,4}))\s+(.*?)$", re.M | re.I | re.U | re.L)
+re_ftpListParse = re.compile("^([d-])([rxws-]{9})\s+\d+\s+\S+\s+\S+\s+(\d+)\s+(\w{1,3}\s+\d+\s+(?:\d+:\d+|\d{2,4}))\s+(.*?)$", listParseFlags)
 
 # error code - first 3-digit number https://tools.ietf.org/html/rfc959#page-39
 re_errorCode = re.compile("[1-5]\d\d")
@@ -103,6 +118,15 @@ trailingSlash = re.compile("/\Z")
 # whitespace
 re_whitespace = re.compile("\s+")
 
+# MDTM reply
+re_mdtm = re.compile("(\d{14})(\.\d+)?\s*$")
+
+# HASH reply, e.g. 213 SHA-256 0-49 169cd22282da7f147cb491e559e9dd filename
+re_hashReply = re.compile("^213 (\S+) (\d+)-(\d+) ([0-9a-fA-F]+)")
+
+# symbolic permissions for an octal digit, see getPermissionsNumeric
+modeTriples = ['---', '--x', '-w-', '-wx', 'r--', 'r-x', 'rw-', 'rwx']
+
 # For FTP LIST entries with {last modified} timestamp earlier than 6 months, see http://stackoverflow.com/questions/2443007/ftp-list-format
 currentYear = int(time.strftime("%Y", time.gmtime()))
 
@@ -151,6 +175,11 @@ sslErrors = {
     'reuseRequired': 'SSL connection failed; session reuse required',
 }
 
+# commands moving data, a repeated attempt would continue from a half-read source
+# or write into an already half-written destination, so they are repeated only
+# when the caller can rewind both
+dataCommands = ['storbinary', 'storlines', 'retrbinary', 'retrlines', 'dir']
+
 # Default permissions for newly created folder
 defaultFolderPermissions = "755"
 
@@ -160,6 +189,18 @@ encoding = 'utf-8'
 # FTP time format, used for example for MFMT
 ftpTimeFormat = '%Y%m%d%H%M%S'
 
+# folders with at least this many entries are listed over a data connection,
+# long STAT replies hold up the control connection and some servers cut them
+statListLimit = 300
+
+# HASH algorithm names => hashlib names
+hashAlgorithms = {
+    'MD5': 'md5',
+    'SHA-1': 'sha1',
+    'SHA-256': 'sha256',
+    'SHA-512': 'sha512'
+}
+
 
 
 # ==== Exceptions ==========================================================================
@@ -173,6 +214,75 @@ class TargetAlreadyExists(Exception):
 
 # ==== Content =============================================================================
 
+# Reads a data connection as a file, for passing it as the upload source
+class SocketReader(object):
+
+    # @type self: SocketReader
+    # @type conn: socket
+    def __init__(self, conn):
+        self.conn = conn
+        self.transferred = 0
+
+    # @type self: SocketReader
+    # @type size: int
+    #
+    # @return bytes empty when the sender finished
+    def read(self, size=transferBlocksize):
+        data = self.conn.recv(size)
+        self.transferred += len(data)
+        return data
+
+
+# Reads a file deflated, for uploading in MODE Z
+class DeflateReader(object):
+
+    # @type self: DeflateReader
+    # @type source: file
+    # @type callback: callback(data)
+    # @param callback: called with every block read before it's compressed
+    def __init__(self, source, callback = None):
+        self.source = source
+        self.callback = callback
+        self.start = source.tell()
+        self.rewind()
+
+    # Starts over from where the source was when given
+    #
+    # @type self: DeflateReader
+    def rewind(self):
+        self.source.seek(self.start)
+        self.compressor = zlib.compressobj()
+        self.finished = False
+        # bytes read from the source
+        self.consumed = 0
+        # compressed bytes returned
+        self.transferred = 0
+
+    # @type self: DeflateReader
+    # @type size: int
+    #
+    # @return bytes empty when the whole source was compressed
+    def read(self, size=transferBlocksize):
+        data = b''
+
+        # the compressor may keep a whole block for itself
+        while not data and self.finished is False:
+            block = self.source.read(size)
+
+            if block:
+                self.consumed += len(block)
+                if self.callback is not None:
+                    self.callback(block)
+
+                data = self.compressor.compress(block)
+            else:
+                data = self.compressor.flush()
+                self.finished = True
+
+        self.transferred += len(data)
+        return data
+
+
 # Factory function - returns and instance of a proper class based on the configuration
 # currently differs between FTP(S) and SFTP
 #
@@ -230,6 +340,23 @@ class AbstractConnection:
     def _isAscii(self, file_path):
         return isTextFile(file_path, self.generic_config['ascii_extensions'])
 
+    # Returns whether the file is expected to only grow, so that it's worth
+    # trying to upload just its new end
+    #
+    # @type self: AbstractConnection
+    # @type file_path: string
+    def _isAppendable(self, file_path):
+        extensions = self.config.get('append_extensions')
+        return extensions is not None and isTextFile(file_path, extensions)
+
+    # Returns whether the file should be transferred compressed if the server allows
+    #
+    # @type self: AbstractConnection
+    # @type file_path: string
+    def _isCompressible(self, file_path):
+        setting = self.config.get('compress_transfers')
+        return setting is True or (setting == 'text' and self._isAscii(file_path))
+
 
 # FTP(S) connection
 #
@@ -241,6 +368,24 @@ class FTPSConnection(AbstractConnection):
 
     canEncrypt = {}
 
+    # host => whether STAT lists folders, None = not probed yet
+    statListing = {}
+
+    # host => set of folders too large for STAT listing
+    largeFolders = {}
+
+    # host => [ SSLContext, last TLS session ], shared by pooled connections
+    tlsSessions = {}
+
+    # host => CircuitBreaker, shared by pooled connections
+    breakers = {}
+
+    # "source host>target host" => whether FXP works between them, see copyTo
+    fxpPairs = {}
+
+    # host => remote path => [size, sha1 of the content] as uploaded in this session, see put
+    appendRecords = {}
+
     # Constructor
     #
     # @type self: FTPSConnection
@@ -252,8 +397,27 @@ class FTPSConnection(AbstractConnection):
         self.config = config
         self.generic_config = generic_config
         self.name = name
+        # config fingerprint computed on config load, see FTPSync.getConfigFingerprint
+        self.fingerprint = config.get('fingerprint')
+        self.metrics = Metrics.instance()
+        self.metricsScope = name + " [" + str(config['host']) + "]"
+        self.tracer = Tracer.instance()
+        # bytes moved over data connections, used for trace spans
+        self.traceBytes = 0
         self.isClosed = False
+        self.capabilities = Capabilities.instance()
+        self.capabilityKey = getCapabilityKey(config)
         self.feat = None
+        # whether MLST works despite being advertised, None = not tried yet
+        self.mlstWorks = self.capabilities.get(self.capabilityKey, 'mlstWorks')
+        # whether APPE is allowed, None = not tried yet
+        self.appendWorks = self.capabilities.get(self.capabilityKey, 'appendWorks')
+        # whether MODE Z is accepted despite being advertised, None = not tried yet
+        self.compressWorks = self.capabilities.get(self.capabilityKey, 'compressWorks')
+        # MODE of the data connections, S = stream, Z = deflated stream
+        self.transferMode = 'S'
+        # whether the current transfer is to be in MODE Z
+        self.compressing = False
         self.currentPath = "/"
 
         if self.config['tls'] is True:
@@ -261,8 +425,25 @@ class FTPSConnection(AbstractConnection):
         else:
             self.connection = ftplib.FTP()
 
+        if self.tracer.isEnabled():
+            self.connection.ntransfercmd = self._traceTransfer(self.connection.ntransfercmd)
+
+        if self.config.get('compress_transfers'):
+            self.connection.ntransfercmd = self._modeTransfer(self.connection.ntransfercmd)
+
         if self.config['host'] not in FTPSConnection.canEncrypt:
-            FTPSConnection.canEncrypt[self.config['host']] = None
+            FTPSConnection.canEncrypt[self.config['host']] = self.capabilities.get(self.capabilityKey, 'canEncrypt')
+
+        if self.config['host'] not in FTPSConnection.statListing:
+            FTPSConnection.statListing[self.config['host']] = self.capabilities.get(self.capabilityKey, 'statListing')
+            FTPSConnection.largeFolders[self.config['host']] = set()
+
+        if self.config['host'] not in FTPSConnection.appendRecords:
+            FTPSConnection.appendRecords[self.config['host']] = {}
+
+        if self.config['host'] not in FTPSConnection.breakers:
+            FTPSConnection.breakers[self.config['host']] = CircuitBreaker(self.generic_config.get('circuit_breaker_threshold'), self.generic_config.get('circuit_breaker_cooldown'))
+        self.breaker = FTPSConnection.breakers[self.config['host']]
 
 
     # Destructor, closes connection
@@ -278,44 +459,188 @@ class FTPSConnection(AbstractConnection):
     # @type self: FTPSConnection
     # @type command: string
     # @type args: list
-    def retryingCommand(self, command, args = []):
+    # @type attempts: int|None
+    # @param attempts: overrides ftp_retry_limit, 1 for commands that mustn't be repeated
+    # @type rewind: callback()|None
+    # @param rewind: resets source and destination before a repeated attempt,
+    #                data commands are repeated only with it
+    #
+    # @global dataCommands
+    def retryingCommand(self, command, args = [], attempts = None, rewind = None):
         if hasattr(self.connection, command):
             def call():
                 return getattr(self.connection, command)(*args)
 
-            retries = self.generic_config['ftp_retry_limit']
+            # closing is tried just once and even when the host is down
+            guarded = command not in ['quit', 'close']
+            repeatable = command not in dataCommands or rewind is not None
+            limit = self.generic_config['ftp_retry_limit'] if guarded and repeatable else 1
+            if attempts is not None:
+                limit = attempts
+            retries = limit
             exception = None
-            while retries > 0:
-                try:
-                    result = call()
-                    if retries < self.generic_config['ftp_retry_limit'] and self.generic_config['debug_verbose']:
-                        print ("FTPSync > Retry of " + command + " succeeded")
-                    return result
-                except Exception as e:
-                    if (sys.version >= '3' and type(e) is TimeoutError) or str(e).find('imeout') >= 0 or str(e).find('imed out') >= 0:
-                        print ("FTPSync > Command " + command + " timed out, retrying (" + str(retries) + " remaining)...")
-                        retries -= 1
-                        time.sleep(self.generic_config['ftp_retry_delay'])
-                        exception = e
-                        continue
+            traced = self.tracer.isEnabled()
+            if traced:
+                started = self.tracer.now()
+                transferred = self.traceBytes
+                error = None
 
-                    raise
-            
-            if retries == 0:
-                if exception is not None:
-                    print ("FTPSync > Retrying " + command + " failed: " + str(exception))
-                    raise exception
-                else:
-                    print ("FTPSync > Retrying " + command + " failed")
+            try:
+                # once per call, a probe of a down host includes its retries
+                if guarded:
+                    try:
+                        self.breaker.check(self.config['host'])
+                    except HostUnavailableException as e:
+                        self.metrics.increment(self.metricsScope, 'retries_avoided')
+                        if traced:
+                            error = e
+                        raise
+
+                while retries > 0:
+                    try:
+                        self.metrics.increment(self.metricsScope, 'commands')
+                        result = call()
+                        if guarded:
+                            self.breaker.success()
+                        if retries < limit and self.generic_config['debug_verbose']:
+                            print ("FTPSync > Retry of " + command + " succeeded")
+                        return result
+                    except Exception as e:
+                        kind = classifyError(e)
+
+                        if kind == 'transient' and retries > 1:
+                            delay = backoffDelay(limit - retries, self.generic_config['ftp_retry_delay'], self.generic_config.get('ftp_retry_delay_max', 30))
+                            print ("FTPSync > Command " + command + " failed (" + str(e) + "), retrying in " + str(round(delay, 1)) + "s (" + str(retries - 1) + " remaining)...")
+                            self.metrics.increment(self.metricsScope, 'retries')
+                            retries -= 1
+                            time.sleep(delay)
+                            exception = e
+                            if rewind is not None:
+                                rewind()
+                            continue
+
+                        if guarded:
+                            if kind == 'fatal':
+                                # the server answered
+                                self.breaker.success()
+                            else:
+                                self._hostFailed()
+
+                        if traced:
+                            error = e
+                        raise
+
+                if retries == 0:
+                    if exception is not None:
+                        print ("FTPSync > Retrying " + command + " failed: " + str(exception))
+                        if traced:
+                            error = exception
+                        raise exception
+                    else:
+                        print ("FTPSync > Retrying " + command + " failed")
+            finally:
+                if traced:
+                    name, path = describeCommand(command, args)
+                    self.tracer.record(name, self.metricsScope, started, self.tracer.now(), {
+                        'method': command,
+                        'path': path,
+                        'reply': self._getReplyCode(error),
+                        'retries': limit - retries,
+                        'bytes': self.traceBytes - transferred,
+                        'error': None if error is None else str(error)
+                    })
         else:
             raise Exception("FTPSync: No command " + command + " available")
 
 
+    # Records a failure to reach the host, commands fail fast once it seems down
+    #
+    # @type self: FTPSConnection
+    def _hostFailed(self):
+        if self.breaker.failure():
+            self.metrics.increment(self.metricsScope, 'circuit_opened')
+            print ("FTPSync > " + str(self.config['host']) + " seems to be down, failing its commands until it responds")
+
+
+    # Wraps ftplib's ntransfercmd to record data connection setup as a trace span
+    #
+    # @type self: FTPSConnection
+    # @type ntransfercmd: callback(cmd, rest)
+    #
+    # @return callback(cmd, rest)
+    def _traceTransfer(self, ntransfercmd):
+        def traced(cmd, rest = None):
+            started = self.tracer.now()
+            error = None
+
+            try:
+                return ntransfercmd(cmd, rest)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                name, path = describeCommand('ntransfercmd', [cmd])
+                self.tracer.record("data " + name, self.metricsScope, started, self.tracer.now(), {
+                    'method': 'ntransfercmd',
+                    'path': path,
+                    'passive': bool(self.config['passive']),
+                    'reply': self._getReplyCode(error),
+                    'error': None if error is None else str(error)
+                })
+
+        return traced
+
+
+    # Wraps ftplib's ntransfercmd to switch back to MODE S before data connections
+    # that are not to be compressed, e.g. listings
+    #
+    # @type self: FTPSConnection
+    # @type ntransfercmd: callback(cmd, rest)
+    #
+    # @return callback(cmd, rest)
+    def _modeTransfer(self, ntransfercmd):
+        def transfer(cmd, rest = None):
+            if self.compressing is False:
+                self._resetMode()
+
+            return ntransfercmd(cmd, rest)
+
+        return transfer
+
+
+    # Switches back to MODE S if the last transfer left the connection in MODE Z
+    #
+    # @type self: FTPSConnection
+    def _resetMode(self):
+        if self.transferMode == 'Z':
+            self.connection.voidcmd("MODE S")
+            self.transferMode = 'S'
+
+
+    # Returns reply code of the last command, taken from error if given
+    #
+    # @type self: FTPSConnection
+    # @type error: Exception|None
+    #
+    # @return string|None
+    def _getReplyCode(self, error = None):
+        if error is not None:
+            code = re_errorCode.search(str(error))
+            if code is not None:
+                return code.group(0)
+
+            return None
+
+        return getattr(self.connection, 'lastresp', None)
+
+
     # Connects to remote server
     #
     # @type self: FTPSConnection
     def connect(self):
-        self.retryingCommand('connect', [ self.config['host'], int(self.config['port']), int(self.config['timeout']) ])
+        with self.metrics.measure(self.metricsScope, 'connect_time'):
+            self.retryingCommand('connect', [ self.config['host'], int(self.config['port']), int(self.config['timeout']) ])
+        self.transferMode = 'S'
         self.retryingCommand('set_pasv', [ self.config['passive'] ])
 
 
@@ -334,18 +659,53 @@ class FTPSConnection(AbstractConnection):
     # @return bool whether the authentication happened or not
     def authenticate(self):
         if self.config['tls'] is True:
+            self._resumeTlsSession()
             self.retryingCommand('auth')
             self.retryingCommand('prot_p')
+            # after a reply has been read, TLS 1.3 sends session tickets late
+            self._storeTlsSession()
             return True
 
         return False
 
 
+    # Resumes TLS session of another connection to the same host
+    #
+    # Sessions can only be resumed within the same context so that is shared as well
+    #
+    # @type self: FTPSConnection
+    def _resumeTlsSession(self):
+        if hasattr(self.connection, 'get_context') is False:
+            return
+
+        shared = FTPSConnection.tlsSessions.get(self.config['host'])
+        if shared is not None:
+            self.connection.context = shared[0]
+            self.connection.session = shared[1]
+
+
+    # Remembers TLS session of the control connection for other connections
+    #
+    # @type self: FTPSConnection
+    def _storeTlsSession(self):
+        if hasattr(self.connection, 'get_context') is False:
+            return
+
+        session = getattr(self.connection.sock, 'session', None)
+        if session is not None:
+            FTPSConnection.tlsSessions[self.config['host']] = [self.connection.get_context(), session]
+
+        if getattr(self.connection.sock, 'session_reused', False):
+            self.metrics.increment(self.metricsScope, 'tls_resumed')
+            self._learn('tlsSessionReuse', True)
+
+
     # Logs into the remote server
     #
     # @type self: FTPSConnection
     def login(self):
-        self.retryingCommand('login', [ self.config['username'], self.config['password'] ])
+        with self.metrics.measure(self.metricsScope, 'login_time'):
+            self.retryingCommand('login', [ self.config['username'], self.config['password'] ])
 
 
     # Send an empty/keep-alive message to server
@@ -390,6 +750,7 @@ class FTPSConnection(AbstractConnection):
             'name': self.name,
             'config': self.config,
             'canEncrypt': self.encryptionSupported(),
+            'tlsSessionReuse': self.capabilities.get(self.capabilityKey, 'tlsSessionReuse'),
             'features': self.feat
         }
 
@@ -404,8 +765,8 @@ class FTPSConnection(AbstractConnection):
     # @param new_name: uploads a file under a different name
     # @type failed: bool
     # @param failed: retry flag
-    # @type blockCallback: callback
-    # @param blockCallback: callback called on every block transferred
+    # @type blockCallback: callback(size)
+    # @param blockCallback: callback called on every block transferred with its size in bytes
     def put(self, file_path, new_name = None, failed = False, blockCallback = None):
 
         def action():
@@ -418,35 +779,73 @@ class FTPSConnection(AbstractConnection):
             if os.path.isdir(file_path):
                 return self.__ensurePath(path, True)
 
+            appendable = failed is False and new_name is None and self.appendWorks is not False and self._isAppendable(file_path)
+            offset = 0
+            if appendable:
+                offset = self.__appendOffset(file_path, path)
+
             command = "STOR " + path
+            self.compressing = self.__compress(file_path)
             uploaded = open(file_path, "rb")
+            # size and hash of what the server got, to verify the next append
+            sent = [0, hashlib.sha1()]
 
             def perBlock(data):
+                self.metrics.increment(self.metricsScope, 'bytes_up', len(data))
+                self.traceBytes += len(data)
+
+                if appendable:
+                    sent[0] += len(data)
+                    sent[1].update(data)
+
                 if blockCallback is not None:
-                    blockCallback()
+                    blockCallback(len(data))
+
+            # a repeated STOR sends everything again
+            def restartSent():
+                sent[0] = 0
+                sent[1] = hashlib.sha1()
 
             try:
-                #self.connection.storbinary(command, uploaded, callback = perBlock)
-                self.retryingCommand('storbinary', [command, uploaded, transferBlocksize, perBlock])
+                if offset > 0 and self.__append(path, uploaded, offset, perBlock, sent):
+                    if blockCallback is not None:
+                        blockCallback(offset)
+                else:
+                    #self.connection.storbinary(command, uploaded, callback = perBlock)
+                    self.__store(command, uploaded, perBlock, restart = restartSent)
+
+                self.metrics.increment(self.metricsScope, 'files_up')
+
+                if appendable:
+                    FTPSConnection.appendRecords[self.config['host']][path] = [sent[0], sent[1].hexdigest()]
 
                 if self.config['default_upload_permissions'] is not None:
                     try:
                         self.chmod(path, self.config['default_upload_permissions'])
                     except Exception as e:
                         print("FTPSync > failed to set default permissions")
+            except TransferCancelledException:
+                # data connection got closed mid-transfer, consume the server's reply to it
+                try:
+                    self.connection.getresp()
+                except Exception:
+                    pass
+
+                raise
             except Exception as e:
                 if self.__isErrorCode(e, ['ok', 'passive', 'dataAccepted']) is True:
                     pass
                 elif self.__isErrorCode(e, 'fileUnavailible') and failed is False:
                     self.__ensurePath(path)
-                    self.put(file_path, new_name, True)
+                    self.put(file_path, new_name, True, blockCallback)
                 elif self.__isErrorCode(e, 'fileNotAllowed') and failed is False:
                     self.__ensurePath(path)
-                    self.put(file_path, new_name, True)
+                    self.put(file_path, new_name, True, blockCallback)
                 else:
                     raise
             finally:
                 uploaded.close()
+                self.compressing = False
 
             if self.config['set_remote_lastmodified'] and self.__hasFeat("MFMT") :
                 try:
@@ -467,12 +866,284 @@ class FTPSConnection(AbstractConnection):
         return self.__execute(action)
 
 
+    # Returns from where a file can be appended to instead of uploading it whole
+    #
+    # The remote file has to be shorter than the local one and its whole content
+    # has to match the start of the local file, see __isSameContent
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    # @type path: string
+    # @param path: remote path
+    #
+    # @return int 0 = the whole file needs to be uploaded
+    def __appendOffset(self, file_path, path):
+        size = os.path.getsize(file_path)
+
+        try:
+            self.retryingCommand('voidcmd', ["TYPE I"])
+            remote = int(self.retryingCommand('sendcmd', ["SIZE " + self.__encode(path)])[3:].strip())
+        except Exception as e:
+            if classifyError(e) == 'connection':
+                raise
+
+            return 0
+
+        if remote <= 0 or remote >= size or self.__isSameContent(file_path, path, remote) is False:
+            return 0
+
+        return remote
+
+
+    # Compares the remote file with the start of the local file
+    #
+    # Uses HASH or XCRC, otherwise trusts the remote file to be what was uploaded
+    # in this session if it still has the same size. Only comparing the end wouldn't
+    # notice edits before it.
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    # @type path: string
+    # @param path: remote path
+    # @type size: int
+    # @param size: of the remote file
+    #
+    # @return bool
+    def __isSameContent(self, file_path, path, size):
+        try:
+            feat = self.__getFeat("HASH")
+            algorithm = None
+            if feat is not None:
+                for name in feat[4:].strip().split(';'):
+                    if name.endswith('*'):
+                        algorithm = name[:-1].upper()
+
+            if algorithm in hashAlgorithms:
+                match = re_hashReply.search(self.retryingCommand('sendcmd', ["HASH " + self.__encode(path)]))
+                if match is None or match.group(1).upper() != algorithm or int(match.group(2)) != 0 or int(match.group(3)) != size - 1:
+                    return False
+
+                return match.group(4).lower() == self.__localDigest(file_path, size, hashAlgorithms[algorithm])
+
+            if self.hasFeature("XCRC"):
+                reply = self.retryingCommand('sendcmd', ["XCRC " + self.__encode(path)])
+                return int(reply.split()[-1], 16) == int(self.__localDigest(file_path, size, 'crc32'), 16)
+        except Exception as e:
+            if classifyError(e) == 'connection':
+                raise
+
+            if self.__isDebug():
+                print ("FTPSync > Checking content of " + path + " failed: " + str(e))
+
+            return False
+
+        record = FTPSConnection.appendRecords[self.config['host']].get(path)
+        if record is None or record[0] != size:
+            return False
+
+        return record[1] == self.__localDigest(file_path, size, 'sha1')
+
+
+    # Returns hex digest of the start of a local file
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    # @type size: int
+    # @param size: how many bytes to digest
+    # @type algorithm: string
+    # @param algorithm: hashlib name or crc32
+    #
+    # @return string
+    def __localDigest(self, file_path, size, algorithm):
+        crc = 0
+        if algorithm != 'crc32':
+            digest = hashlib.new(algorithm)
+
+        with open(file_path, "rb") as local:
+            remaining = size
+
+            while remaining > 0:
+                data = local.read(min(remaining, transferBlocksize * 8))
+                if not data:
+                    break
+
+                remaining -= len(data)
+                if algorithm == 'crc32':
+                    crc = zlib.crc32(data, crc)
+                else:
+                    digest.update(data)
+
+        if algorithm == 'crc32':
+            return "%08x" % (crc & 0xffffffff)
+
+        return digest.hexdigest()
+
+
+    # Uploads the local file's content past offset with APPE
+    #
+    # Tried just once as a repeated APPE could append the data twice
+    #
+    # @type self: FTPSConnection
+    # @type path: string
+    # @param path: remote path
+    # @type uploaded: file
+    # @type offset: int
+    # @type perBlock: callback(data)
+    # @type sent: list
+    # @param sent: [size, sha1] of what the server got, see put
+    #
+    # @return bool False when the whole file needs to be uploaded
+    def __append(self, path, uploaded, offset, perBlock, sent):
+        while sent[0] < offset:
+            data = uploaded.read(min(offset - sent[0], transferBlocksize * 8))
+            if not data:
+                break
+
+            sent[0] += len(data)
+            sent[1].update(data)
+
+        try:
+            self.__store("APPE " + path, uploaded, perBlock, 1)
+            self.metrics.increment(self.metricsScope, 'files_appended')
+
+            if self.appendWorks is not True:
+                self.appendWorks = True
+                self._learn('appendWorks', True)
+
+            return True
+        except TransferCancelledException:
+            raise
+        except Exception as e:
+            if self.__isErrorCode(e, ['ok', 'passive', 'dataAccepted']) is True:
+                return True
+
+            if classifyError(e) == 'connection':
+                raise
+
+            # not implemented or not allowed
+            if self._getReplyCode(e) in ['500', '502', '504', '532']:
+                self.appendWorks = False
+                self._learn('appendWorks', False)
+
+            print ("FTPSync > Appending to " + path + " failed (" + str(e) + "), uploading whole file")
+            self.metrics.increment(self.metricsScope, 'append_fallbacks')
+            uploaded.seek(0)
+            sent[0] = 0
+            sent[1] = hashlib.sha1()
+            return False
+
+
+    # Switches data connections to MODE Z for transferring the file if configured and supported
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    #
+    # @return bool whether the transfer is to be compressed
+    def __compress(self, file_path):
+        if self.compressWorks is False or self._isCompressible(file_path) is False:
+            return False
+
+        feat = self.__getFeat("MODE")
+        if feat is None or 'Z' not in feat.upper().split()[1:]:
+            return False
+
+        if self.transferMode != 'Z':
+            try:
+                self.retryingCommand('voidcmd', ["MODE Z"])
+            except Exception as e:
+                if classifyError(e) == 'connection':
+                    raise
+
+                self.compressWorks = False
+                self._learn('compressWorks', False)
+                return False
+
+            self.transferMode = 'Z'
+
+        return True
+
+
+    # Uploads using STOR or APPE, deflated when compressing
+    #
+    # @type self: FTPSConnection
+    # @type command: string
+    # @type uploaded: file
+    # @type perBlock: callback(data)
+    # @param perBlock: gets uncompressed blocks
+    # @type attempts: int|None
+    # @type restart: callback()|None
+    # @param restart: called before a repeated attempt, after the source was rewound
+    def __store(self, command, uploaded, perBlock, attempts = None, restart = None):
+        if self.compressing is False:
+            start = uploaded.tell()
+
+            def rewind():
+                uploaded.seek(start)
+                if restart is not None:
+                    restart()
+
+            return self.retryingCommand('storbinary', [command, uploaded, transferBlocksize, perBlock], attempts, rewind)
+
+        reader = DeflateReader(uploaded, perBlock)
+
+        def rewind():
+            reader.rewind()
+            if restart is not None:
+                restart()
+
+        result = self.retryingCommand('storbinary', [command, reader, transferBlocksize], attempts, rewind)
+        self.metrics.increment(self.metricsScope, 'bytes_saved_compression', reader.consumed - reader.transferred)
+
+        return result
+
+
+    # Downloads using RETR, inflated when compressing
+    #
+    # @type self: FTPSConnection
+    # @type command: string
+    # @type perBlock: callback(data)
+    # @param perBlock: gets uncompressed blocks
+    # @type method: string
+    # @param method: retrbinary or retrlines (never compressed)
+    # @type restart: callback()|None
+    # @param restart: empties the destination before a repeated attempt, None = not repeated
+    def __retrieve(self, command, perBlock, method = 'retrbinary', restart = None):
+        if self.compressing is False:
+            return self.retryingCommand(method, [command, perBlock], None, restart)
+
+        # decompressor, compressed bytes, uncompressed bytes
+        state = [zlib.decompressobj(), 0, 0]
+
+        def inflate(data):
+            state[1] += len(data)
+            data = state[0].decompress(data)
+
+            if data:
+                state[2] += len(data)
+                perBlock(data)
+
+        def rewind():
+            restart()
+            state[:] = [zlib.decompressobj(), 0, 0]
+
+        result = self.retryingCommand('retrbinary', [command, inflate], None, None if restart is None else rewind)
+
+        data = state[0].flush()
+        if data:
+            state[2] += len(data)
+            perBlock(data)
+
+        self.metrics.increment(self.metricsScope, 'bytes_saved_compression', state[2] - state[1])
+
+        return result
+
+
     # Downloads a file from remote server
     #
     # @type self: FTPSConnection
     # @type file_path: string
-    # @type blockCallback: callback
-    # @type blockCallback: callback called on every block transferred
+    # @type blockCallback: callback(size)
+    # @param blockCallback: callback called on every block transferred with its size in bytes
     def get(self, file_path, blockCallback):
 
         def action():
@@ -504,35 +1175,49 @@ class FTPSConnection(AbstractConnection):
                         else:
                             tempfile.write("\n".encode('utf-8'))
 
+                    self.metrics.increment(self.metricsScope, 'bytes_down', len(data))
+                    self.traceBytes += len(data)
+
                     if blockCallback is not None:
-                        blockCallback()
+                        blockCallback(len(data))
+
+                # start over, whatever arrived would be duplicated
+                def restart():
+                    tempfile.seek(0)
+                    tempfile.truncate()
 
                 try:
-                    self.retryingCommand(action, [command, perBlock])
+                    self.__retrieve(command, perBlock, action, restart)
+                    self.metrics.increment(self.metricsScope, 'files_down')
                 except Exception as e:
                     if self.__isErrorCode(e, ['ok', 'passive']) or str(e).find(ftpErrors['typeIsNow']) != -1:
-                        self.retryingCommand(action, [command, perBlock])
+                        restart()
+                        self.__retrieve(command, perBlock, action, restart)
                     elif self.__isErrorCode(e, 'fileUnavailible'):
                         raise FileNotFoundException
                     else:
                         raise
 
             existsLocally = os.path.exists(file_path)
+            self.compressing = isAscii is False and self.__compress(file_path)
 
-            if self.config['use_tempfile']:
-                viaTempfile(file_path, download, self.config['default_folder_permissions'], mode)
-            else:
-                with open(file_path, mode) as destination:
-                    download(destination)
+            try:
+                if self.config['use_tempfile']:
+                    viaTempfile(file_path, download, self.config['default_folder_permissions'], mode)
+                else:
+                    with open(file_path, mode) as destination:
+                        download(destination)
+            finally:
+                self.compressing = False
 
             if existsLocally is False or self.config['always_sync_local_permissions']:
                 try:
                     if self.config['default_local_permissions'] is not None and sys.platform != 'win32' and sys.platform != 'cygwin':
                         if self.config['default_local_permissions'] == "auto":
-                            metadata = self.list(file_path)
+                            metadata = self.getMetadata(file_path, permissions=True)
 
-                            if type(metadata) is list and len(metadata) > 0:
-                                os.chmod(file_path, int(metadata[0].getPermissionsNumeric(),8))
+                            if metadata.getPermissions() is not None:
+                                os.chmod(file_path, int(metadata.getPermissionsNumeric(),8))
                         else:
                             os.chmod(file_path, int(self.config['default_local_permissions'], 8))
                 except Exception as e:
@@ -580,6 +1265,118 @@ class FTPSConnection(AbstractConnection):
 
 
 
+    # Collects contents of a remote folder for removal by removeEntry
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    # @param file_path: local path of the folder
+    #
+    # @return (list<string>, list<string>) remote paths of files, of folders the deepest first
+    #
+    # @throws FileNotFoundException
+    def crawl(self, file_path):
+        files = []
+        folders = []
+
+        def walk(path):
+            folders.append(path)
+
+            for entry in self.list(path, True, inline=True):
+                if entry.isDirectory():
+                    walk(path + '/' + entry.getName())
+                else:
+                    files.append(path + '/' + entry.getName())
+
+        self.__execute(lambda: walk(trailingDot.sub("", self._getMappedPath(file_path))))
+        folders.sort(key=lambda path: path.count('/'), reverse=True)
+
+        return files, folders
+
+
+    # Removes a remote file or an empty folder, by absolute path without changing directory
+    #
+    # @type self: FTPSConnection
+    # @type path: string
+    # @param path: remote path, see crawl
+    # @type isDir: bool
+    #
+    # @return bool False when it was already gone
+    def removeEntry(self, path, isDir):
+        if isDir:
+            command = "RMD "
+        else:
+            command = "DELE "
+
+        try:
+            self.retryingCommand('voidcmd', [command + self.__encode(path)])
+            return True
+        except Exception as e:
+            if self.__isErrorCode(e, 'fileUnavailible') and (self.__isError(e, 'noFileOrDirectory') or self.__isError(e, 'fileNotExist')):
+                return False
+            else:
+                raise
+
+
+    # Creates missing remote folders (and their parents) parent-first, by absolute path
+    #
+    # The deepest folders are checked first as an existing folder implies its parents,
+    # below a folder that had to be created nothing can exist, so no check is needed
+    #
+    # @type self: FTPSConnection
+    # @type file_paths: list<string>
+    # @param file_paths: local paths of the folders
+    #
+    # @return int number of created folders
+    def ensureFolders(self, file_paths):
+        root = trailingSlash.sub("", self._postprocessPath(os.path.normpath(self.config['path'])))
+
+        paths = set()
+        for file_path in file_paths:
+            path = self._postprocessPath(os.path.normpath(self._getMappedPath(file_path)))
+
+            while len(path) > len(root) and path.find(root + '/') == 0:
+                paths.add(path)
+                path = path[:path.rfind('/')]
+
+        existing = set()
+        created = []
+
+        def ensure(path):
+            if path in existing or path not in paths:
+                return
+
+            parent = path[:path.rfind('/')]
+            if parent not in created:
+                try:
+                    self.retryingCommand('cwd', [path])
+
+                    while path in paths:
+                        existing.add(path)
+                        path = path[:path.rfind('/')]
+
+                    return
+                except Exception as e:
+                    if self.__isErrorCode(e, 'fileUnavailible') is False:
+                        raise
+
+                ensure(parent)
+
+            self.retryingCommand('mkd', [self.__encode(path)])
+            self.metrics.increment(self.metricsScope, 'folders_created')
+            existing.add(path)
+            created.append(path)
+
+        def action():
+            for path in sorted(paths, key=lambda path: path.count('/'), reverse=True):
+                ensure(path)
+
+            self.cwd(self.config['path'])
+
+        self.__execute(action)
+
+        return len(created)
+
+
     # Deletes a file purely from remote server
     #
     # @type self: FTPSConnection
@@ -678,6 +1475,192 @@ class FTPSConnection(AbstractConnection):
                 raise
 
 
+    # Moves a remote file or folder elsewhere on the server, nothing is transferred
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    # @param file_path: local path of the original
+    # @type new_file_path: string
+    # @param new_file_path: local path of the target
+    #
+    # @throws FileNotFoundException when the original is not on the server
+    def move(self, file_path, new_file_path):
+        source = self._getMappedPath(file_path)
+        target = self._getMappedPath(new_file_path)
+
+        def action():
+            self.__ensurePath(os.path.dirname(target), True)
+
+            try:
+                self.retryingCommand('rename', [self.__encode(source), self.__encode(target)])
+            except Exception as e:
+                if self.__isErrorCode(e, 'fileUnavailible') or self.__isError(e, 'noFileOrDirectory'):
+                    raise FileNotFoundException
+                else:
+                    raise
+
+        return self.__execute(action)
+
+
+    # Copies a remote file or folder to another server
+    #
+    # Nothing touches local disk: with FXP the target server connects to the source one
+    # directly, where either refuses it the data are relayed through memory
+    #
+    # @type self: FTPSConnection
+    # @type target: FTPSConnection
+    # @type file_path: string
+    # @param file_path: local path, mapped for each connection
+    #
+    # @return int number of copied files
+    #
+    # @throws FileNotFoundException
+    def copyTo(self, target, file_path):
+        source = self._getMappedPath(file_path)
+        destination = target._getMappedPath(file_path)
+
+        def action():
+            if self.getMetadata(source, True).isDirectory():
+                return self.__copyFolder(target, source, destination)
+
+            target.__ensurePath(os.path.dirname(destination), True)
+            self.__copyFile(target, source, destination)
+            return 1
+
+        return self.__execute(action)
+
+
+    # Copies a remote folder with all contents to another server
+    #
+    # @type self: FTPSConnection
+    # @type target: FTPSConnection
+    # @type source: string
+    # @type destination: string
+    #
+    # @return int number of copied files
+    def __copyFolder(self, target, source, destination):
+        target.__ensurePath(destination, True)
+        copied = 0
+
+        for entry in self.list(source, True):
+            if entry.isDirectory():
+                copied += self.__copyFolder(target, source + '/' + entry.getName(), destination + '/' + entry.getName())
+            else:
+                self.__copyFile(target, source + '/' + entry.getName(), destination + '/' + entry.getName())
+                copied += 1
+
+        return copied
+
+
+    # Copies a single remote file to another server, FXP first
+    #
+    # @type self: FTPSConnection
+    # @type target: FTPSConnection
+    # @type source: string
+    # @type destination: string
+    def __copyFile(self, target, source, destination):
+        pair = str(self.config['host']) + ">" + str(target.config['host'])
+
+        # data connections of FXP can't be encrypted without SSCN, which ftplib doesn't do
+        if self.config['tls'] is False and target.config['tls'] is False and FTPSConnection.fxpPairs.get(pair) is not False:
+            try:
+                self.__fxpFile(target, source, destination)
+                FTPSConnection.fxpPairs[pair] = True
+                self.metrics.increment(self.metricsScope, 'fxp_copies')
+                return
+            except Exception as e:
+                if isinstance(e, (ftplib.error_perm, ftplib.error_proto, ftplib.error_temp)) is False:
+                    raise
+
+                print ("FTPSync > FXP from " + str(self.config['host']) + " to " + str(target.config['host']) + " refused (" + str(e) + "), relaying instead")
+                FTPSConnection.fxpPairs[pair] = False
+
+        self.__relayFile(target, source, destination)
+
+
+    # Lets the target server download a file from the source server directly
+    #
+    # Same as ftplib.ftpcp, but leaves both connections usable when either server refuses
+    #
+    # @type self: FTPSConnection
+    # @type target: FTPSConnection
+    # @type source: string
+    # @type destination: string
+    def __fxpFile(self, target, source, destination):
+        self.retryingCommand('voidcmd', ["TYPE I"])
+        target.retryingCommand('voidcmd', ["TYPE I"])
+
+        # the servers exchange data directly, neither may expect it deflated
+        self._resetMode()
+        target._resetMode()
+
+        host, port = ftplib.parse227(self.retryingCommand('sendcmd', ["PASV"]))
+        target.connection.sendport(host, port)
+
+        # RFC 959: the target has to listen before the source sends
+        reply = target.connection.sendcmd("STOR " + target.__encode(destination))
+        if reply[:3] not in ['125', '150']:
+            raise ftplib.error_proto(reply)
+
+        try:
+            reply = self.connection.sendcmd("RETR " + self.__encode(source))
+            if reply[:3] not in ['125', '150']:
+                raise ftplib.error_proto(reply)
+        except Exception:
+            # the target waits for data that won't come
+            target.__abortQuietly()
+            raise
+
+        try:
+            self.connection.voidresp()
+        finally:
+            target.connection.voidresp()
+
+
+    # Streams a remote file into another server through memory
+    #
+    # @type self: FTPSConnection
+    # @type target: FTPSConnection
+    # @type source: string
+    # @type destination: string
+    def __relayFile(self, target, source, destination):
+        self.retryingCommand('voidcmd', ["TYPE I"])
+        conn = self.connection.transfercmd("RETR " + self.__encode(source))
+
+        relayed = False
+        try:
+            reader = SocketReader(conn)
+            target.connection.storbinary("STOR " + target.__encode(destination), reader, transferBlocksize)
+            relayed = True
+        finally:
+            conn.close()
+
+            # the source still owes a reply for the RETR, leaving it unread
+            # would hand it to whatever command comes next
+            if relayed is False:
+                try:
+                    self.connection.voidresp()
+                except (ftplib.error_reply, ftplib.error_temp, ftplib.error_perm):
+                    pass
+
+        self.connection.voidresp()
+
+        self.traceBytes += reader.transferred
+        target.traceBytes += reader.transferred
+        self.metrics.increment(self.metricsScope, 'relay_copies')
+        self.metrics.increment(self.metricsScope, 'bytes_relayed', reader.transferred)
+
+
+    # Cancels a pending transfer, used after a failed FXP attempt
+    #
+    # @type self: FTPSConnection
+    def __abortQuietly(self):
+        try:
+            self.connection.abort()
+        except Exception:
+            pass
+
+
     # Aborts command and calls on{Command}Abort if available
     #
     # @type self: FTPSConnection
@@ -748,6 +1731,159 @@ class FTPSConnection(AbstractConnection):
                 raise
 
 
+    # Returns whether the server advertises a feature in FEAT
+    #
+    # @type self: FTPSConnection
+    # @type feat: string
+    # @param feat: name without parameters, e.g. MLST
+    #
+    # @return bool
+    def hasFeature(self, feat):
+        return self.__getFeat(feat.upper()) is not None
+
+
+    # Returns modification time and size of a file using MDTM and SIZE
+    #
+    # Unlike LIST needs no data connection
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    # @type mapped: bool
+    # @param mapped: whether it's remote path (True) or not
+    #
+    # @return Metafile
+    #
+    # @throws FileNotFoundException
+    def getTimeAndSize(self, file_path, mapped=False):
+
+        def action():
+            if mapped:
+                path = file_path
+            else:
+                path = self._getMappedPath(file_path)
+
+            path = self.__encode(path)
+
+            try:
+                self._makePassive()
+                modified = self.retryingCommand('sendcmd', ["MDTM " + path])
+                # some servers refuse SIZE in ASCII mode
+                self.retryingCommand('voidcmd', ["TYPE I"])
+                size = self.retryingCommand('sendcmd', ["SIZE " + path])
+            except Exception as e:
+                if self.__isErrorCode(e, 'fileUnavailible'):
+                    raise FileNotFoundException
+                else:
+                    raise
+
+            match = re_mdtm.search(modified.strip())
+            lastModified = None
+            if match is not None:
+                lastModified = self.__parseFactTime(match.group(1))
+
+            normpath = self.getNormpath(path)
+            return Metafile(os.path.basename(normpath), False, lastModified, size[3:].strip(), os.path.dirname(normpath))
+
+        return self.__execute(action)
+
+
+    # Returns metadata of a single file
+    #
+    # Uses MLST or MDTM and SIZE over the control connection when the server
+    # supports them, LIST as the last resort
+    #
+    # @type self: FTPSConnection
+    # @type file_path: string
+    # @type mapped: bool
+    # @param mapped: whether it's remote path (True) or not
+    # @type permissions: bool
+    # @param permissions: permissions are needed, MDTM and SIZE can't tell them
+    #
+    # @return Metafile
+    #
+    # @throws FileNotFoundException
+    def getMetadata(self, file_path, mapped=False, permissions=False):
+        if mapped:
+            path = file_path
+        else:
+            path = self._getMappedPath(file_path)
+
+        mlst = self.__getFeat("MLST")
+        if mlst is not None and self.mlstWorks is not False and (permissions is False or mlst.lower().find('unix.mode') != -1):
+            metadata = self.__mlst(path)
+
+            if metadata is not None:
+                return metadata
+
+        if permissions is False and self.__hasFeat("MDTM") and self.__hasFeat("SIZE"):
+            return self.getTimeAndSize(path, True)
+
+        metadata = self.list(path, True)
+        if type(metadata) is not list or len(metadata) == 0:
+            raise FileNotFoundException
+
+        return metadata[0]
+
+
+    # Returns metadata of a single file using MLST
+    #
+    # @type self: FTPSConnection
+    # @type path: string
+    # @param path: remote path
+    #
+    # @return Metafile|None when MLST turned out not to work
+    #
+    # @throws FileNotFoundException
+    def __mlst(self, path):
+
+        def action():
+            try:
+                self._makePassive()
+                response = self.retryingCommand('sendcmd', ["MLST " + self.__encode(path)])
+            except Exception as e:
+                if self.__isErrorCode(e, 'fileUnavailible'):
+                    raise FileNotFoundException
+                elif isinstance(e, ftplib.error_perm):
+                    self.mlstWorks = False
+                    self._learn('mlstWorks', False)
+                    return None
+                else:
+                    raise
+
+            for line in response.split("\n"):
+                if line[0:1] != ' ':
+                    continue
+
+                facts = {}
+                for fact in line.strip().split(' ', 1)[0].split(';'):
+                    if fact.find('=') != -1:
+                        key, value = fact.split('=', 1)
+                        facts[key.lower()] = value
+
+                if 'type' not in facts:
+                    continue
+
+                self.mlstWorks = True
+                self._learn('mlstWorks', True)
+                normpath = self.getNormpath(path)
+
+                lastModified = None
+                if 'modify' in facts:
+                    lastModified = self.__parseFactTime(facts['modify'][0:14])
+
+                permissions = None
+                if 'unix.mode' in facts:
+                    permissions = ''.join([modeTriples[int(digit)] for digit in facts['unix.mode'][-3:]])
+
+                return Metafile(os.path.basename(normpath), facts['type'].lower() in ['dir', 'cdir', 'pdir'], lastModified, facts.get('size'), os.path.dirname(normpath), permissions)
+
+            self.mlstWorks = False
+            self._learn('mlstWorks', False)
+            return None
+
+        return self.__execute(action)
+
+
     # Returns a list of content of a given path
     #
     # @type self: FTPSConnection
@@ -756,9 +1892,11 @@ class FTPSConnection(AbstractConnection):
     # @param mapped: whether it's remote path (True) or not
     # @type all: bool
     # @param all: whether include . and ..
+    # @type inline: bool
+    # @param inline: list over the control connection (STAT) if the server allows
     #
     # @return list<Metafile>|False
-    def list(self, file_path, mapped=False,all=False):
+    def list(self, file_path, mapped=False,all=False, inline=False):
 
         def action():
             if mapped:
@@ -773,24 +1911,27 @@ class FTPSConnection(AbstractConnection):
 
             contents = []
             result = []
+            started = time.time()
 
-            try:
-                self.retryingCommand('retrlines', ["LIST -a " + path, lambda data: contents.append(data)])
-            except Exception as e:
-                if self.__isErrorCode(e, ['ok', 'passive']) or str(e).find(ftpErrors['typeIsNow']) != -1:
-                    self.retryingCommand('retrlines', ["LIST -a " + path, lambda data: contents.append(data)])
-                elif str(e).find('No such file'):
-                    raise FileNotFoundException
-                else:
-                    try:
-                        self.retryingCommand('dir', [path, lambda data: contents.append(data)])
-                    except Exception as e:
-                        if self.__isErrorCode(e, ['ok', 'passive']) or str(e).find(ftpErrors['typeIsNow']) != -1:
-                            self.retryingCommand('retrlines', ["LIST -a " + path, lambda data: contents.append(data)])
-                        elif str(e).find('No such file'):
-                            raise FileNotFoundException
-                        else:
-                            raise
+            def collect(data):
+                contents.append(data)
+                self.traceBytes += len(data)
+
+            # a repeated listing starts over
+            def restart():
+                del contents[:]
+
+            listed = inline and self.__statList(path, contents)
+
+            if listed is False:
+                self.__dataList(path, collect, restart)
+
+                # STAT answered but listed nothing while LIST did
+                if inline and len(contents) > 0 and FTPSConnection.statListing[self.config['host']] is None and path not in FTPSConnection.largeFolders[self.config['host']]:
+                    FTPSConnection.statListing[self.config['host']] = False
+                    self._learn('statListing', False)
+
+            self.metrics.observe(self.metricsScope, 'list_latency', time.time() - started)
 
             for content in contents:
                 try:
@@ -819,6 +1960,89 @@ class FTPSConnection(AbstractConnection):
         return self.__execute(action)
 
 
+    # Lists a folder over a data connection (LIST)
+    #
+    # @type self: FTPSConnection
+    # @type path: string
+    # @param path: encoded remote path
+    # @type collect: callback(line)
+    # @type restart: callback()
+    # @param restart: drops collected lines before a repeated attempt
+    def __dataList(self, path, collect, restart):
+        try:
+            self.retryingCommand('retrlines', ["LIST -a " + path, collect], None, restart)
+        except Exception as e:
+            if self.__isErrorCode(e, ['ok', 'passive']) or str(e).find(ftpErrors['typeIsNow']) != -1:
+                restart()
+                self.retryingCommand('retrlines', ["LIST -a " + path, collect], None, restart)
+            elif str(e).find('No such file'):
+                raise FileNotFoundException
+            else:
+                try:
+                    restart()
+                    self.retryingCommand('dir', [path, collect], None, restart)
+                except Exception as e:
+                    if self.__isErrorCode(e, ['ok', 'passive']) or str(e).find(ftpErrors['typeIsNow']) != -1:
+                        restart()
+                        self.retryingCommand('retrlines', ["LIST -a " + path, collect], None, restart)
+                    elif str(e).find('No such file'):
+                        raise FileNotFoundException
+                    else:
+                        raise
+
+
+    # Lists a folder over the control connection (STAT), no data connection needed
+    #
+    # Whether the host supports it is found out with the first use and remembered,
+    # large folders are left to LIST
+    #
+    # @type self: FTPSConnection
+    # @type path: string
+    # @param path: encoded remote path
+    # @type contents: list<string>
+    # @param contents: gets the listing lines
+    #
+    # @return bool whether listed
+    #
+    # @global statListLimit
+    def __statList(self, path, contents):
+        host = self.config['host']
+
+        if FTPSConnection.statListing[host] is False or path in FTPSConnection.largeFolders[host]:
+            return False
+
+        try:
+            response = self.retryingCommand('sendcmd', ["STAT -a " + path])
+        except Exception as e:
+            if self.__isErrorCode(e, 'fileUnavailible'):
+                raise FileNotFoundException
+            elif isinstance(e, ftplib.error_perm):
+                FTPSConnection.statListing[host] = False
+                self._learn('statListing', False)
+                return False
+            else:
+                raise
+
+        lines = []
+        for line in response.split("\n")[1:-1]:
+            line = line.strip()
+            if re_ftpListParse.search(line) is not None:
+                lines.append(line)
+
+        if len(lines) == 0:
+            return False
+
+        FTPSConnection.statListing[host] = True
+        self._learn('statListing', True)
+        self.metrics.increment(self.metricsScope, 'stat_lists')
+
+        if len(lines) >= statListLimit:
+            FTPSConnection.largeFolders[host].add(path)
+
+        contents.extend(lines)
+        return True
+
+
     # Closes a connection
     #
     # @type self: FTPSConnection
@@ -912,16 +2136,31 @@ class FTPSConnection(AbstractConnection):
     #
     # @type self: FTPSConnection
     def __loadFeat(self):
+        cached = self.capabilities.get(self.capabilityKey, 'feat')
+        if cached is not None:
+            self.feat = list(cached)
+            return
+
         try:
             feats = self.retryingCommand('sendcmd', ["FEAT"]).split("\n")
             self.feat = []
             for feat in feats:
                 if feat[0] != '2':
                     self.feat.append( feat.strip() )
+            self._learn('feat', self.feat)
         except Exception as e:
             self.feat = []
 
 
+    # Remembers a capability of the server for next sessions
+    #
+    # @type self: FTPSConnection
+    # @type name: string
+    # @type value: mixed
+    def _learn(self, name, value):
+        self.capabilities.set(self.capabilityKey, name, value)
+
+
     # Returns whether server supports a certain feature
     #
     # @type self: FTPSConnection
@@ -932,6 +2171,23 @@ class FTPSConnection(AbstractConnection):
         return (feat in self.feat)
 
 
+    # Returns FEAT line of a feature with parameters, e.g. MLST type*;size*;modify*;
+    #
+    # @type self: FTPSConnection
+    # @type feat: string
+    #
+    # @return string|None
+    def __getFeat(self, feat):
+        if self.feat is None:
+            self.__loadFeat()
+
+        for line in self.feat:
+            if line.split(' ')[0].upper() == feat:
+                return line
+
+        return None
+
+
     # Executes an action while handling common errors
     #
     # @type self: FTPSConnection
@@ -943,6 +2199,7 @@ class FTPSConnection(AbstractConnection):
             if self.config['tls'] and FTPSConnection.canEncrypt[self.config['host']] is None:
                 if Runtime.getCaller(1) in ['get', 'put', 'delete']:
                     FTPSConnection.canEncrypt[self.config['host']] = True
+                    self._learn('canEncrypt', True)
 
         result = None
         try:
@@ -964,12 +2221,10 @@ class FTPSConnection(AbstractConnection):
             elif self.__isError(e, 'disconnected') is True:
                 self.close()
                 raise
-            # timeout - retry
-            elif self.__isError(e, 'timeout') is True:
-                return callback()
             # SSL not enabled
             elif str(e).find(sslErrors['reuseRequired']) != -1:
                 FTPSConnection.canEncrypt[self.config['host']] = False
+                self._learn('canEncrypt', False)
                 raise
             # other exception
             else:
@@ -1009,6 +2264,18 @@ class FTPSConnection(AbstractConnection):
         return time.mktime(struct)
 
 
+    # Parses time from MDTM or MLST (YYYYMMDDHHMMSS)
+    #
+    # Read the same way as LIST times and MFMT writes them, so that they compare
+    #
+    # @type self: FTPSConnection
+    # @type: time_val: string
+    #
+    # @return unix timestamp
+    def __parseFactTime(self, time_val):
+        return time.mktime(time.strptime(time_val, ftpTimeFormat)) + int(self.config['time_offset'])
+
+
     # Unix timestamp to FTP time
     #
     # @type self: FTPSConnection
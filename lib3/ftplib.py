@@ -656,6 +656,9 @@ except ImportError:
         print("SSL module import failed")
 
 if sslImported:
+    # TLS sessions can be resumed (Python 3.6+)
+    _session_reuse = hasattr(ssl, 'SSLSession')
+
     class FTP_TLS(FTP):
         '''A FTP subclass which adds TLS support to FTP as described
         in RFC-4217.
@@ -688,8 +691,15 @@ if sslImported:
         >>> ftps.quit()
         '221 Goodbye.'
         >>>
+
+        Data connections resume the TLS session of the control connection
+        when supported, as servers requiring session reuse expect. Setting
+        session (with the context it came from) before auth() resumes it
+        on the control connection too.
         '''
-        ssl_version = ssl.PROTOCOL_TLSv1
+        # negotiates the highest version both sides support
+        ssl_version = getattr(ssl, 'PROTOCOL_TLS_CLIENT',
+                              getattr(ssl, 'PROTOCOL_TLS', ssl.PROTOCOL_SSLv23))
 
         def __init__(self, host='', user='', passwd='', acct='', keyfile=None,
                      certfile=None, context=None,
@@ -703,9 +713,34 @@ if sslImported:
             self.keyfile = keyfile
             self.certfile = certfile
             self.context = context
+            self.session = None
             self._prot_p = False
             FTP.__init__(self, host, user, passwd, acct, timeout, source_address)
 
+        def get_context(self):
+            '''Return the SSLContext, created on demand if sessions can be resumed.'''
+            if self.context is None and _session_reuse:
+                self.context = ssl.SSLContext(self.ssl_version)
+                # certificates aren't verified, as with ssl.wrap_socket
+                self.context.check_hostname = False
+                self.context.verify_mode = ssl.CERT_NONE
+                if self.certfile is not None:
+                    self.context.load_cert_chain(self.certfile, self.keyfile)
+            return self.context
+
+        def _wrap_socket(self, sock, session=None):
+            context = self.get_context()
+            if context is None:
+                return ssl.wrap_socket(sock, self.keyfile, self.certfile,
+                                       ssl_version=self.ssl_version)
+            if session is not None and _session_reuse:
+                try:
+                    return context.wrap_socket(sock, session=session)
+                except ValueError:
+                    # session of another context
+                    pass
+            return context.wrap_socket(sock)
+
         def login(self, user='', passwd='', acct='', secure=True):
             if secure and not isinstance(self.sock, ssl.SSLSocket):
                 self.auth()
@@ -715,16 +750,12 @@ if sslImported:
             '''Set up secure control connection by using TLS/SSL.'''
             if isinstance(self.sock, ssl.SSLSocket):
                 raise ValueError("Already using TLS")
-            if self.ssl_version == ssl.PROTOCOL_TLSv1:
-                resp = self.voidcmd('AUTH TLS')
-            else:
+            if self.ssl_version in (getattr(ssl, 'PROTOCOL_SSLv2', None),
+                                    getattr(ssl, 'PROTOCOL_SSLv3', None)):
                 resp = self.voidcmd('AUTH SSL')
-            if self.context is not None:
-                self.sock = self.context.wrap_socket(self.sock)
             else:
-                self.sock = ssl.wrap_socket(self.sock, self.keyfile,
-                                            self.certfile,
-                                            ssl_version=self.ssl_version)
+                resp = self.voidcmd('AUTH TLS')
+            self.sock = self._wrap_socket(self.sock, self.session)
             self.file = self.sock.makefile(mode='r', encoding=self.encoding)
             return resp
 
@@ -763,11 +794,10 @@ if sslImported:
         def ntransfercmd(self, cmd, rest=None):
             conn, size = FTP.ntransfercmd(self, cmd, rest)
             if self._prot_p:
-                if self.context is not None:
-                    conn = self.context.wrap_socket(conn)
-                else:
-                    conn = ssl.wrap_socket(conn, self.keyfile, self.certfile,
-                                           ssl_version=self.ssl_version)
+                session = None
+                if _session_reuse:
+                    session = self.sock.session
+                conn = self._wrap_socket(conn, session)
             return conn, size
 
         def retrbinary(self, cmd, callback, blocksize=8192, rest=None):